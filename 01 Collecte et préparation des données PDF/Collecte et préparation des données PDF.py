@@ -8,7 +8,12 @@ import fitz  # PyMuPDF
 # --- chemins ---
 ROOT = Path(__file__).resolve().parent
 PDF_PATH = ROOT / "Landon-Hotel.pdf"        # mets ton PDF ici (même dossier que ce script)
-OUT_PATH = ROOT / "pdf_text.txt"            # sortie attendue
+OUT_PATH = ROOT / "pdf_text.txt"            # sortie attendue (texte nettoyé)
+RAW_PATH = ROOT / "pdf_text.raw.txt"        # extraction brute, avant nettoyage
+INDEX_DIR = ROOT / "vector_index"           # vectors.npy + vectors_meta.json (index dense)
+
+# bm25.py / vector_index.py / boilerplate.py sont partagés avec l'app Flask
+sys.path.insert(0, str(ROOT.parent / "04 Flask"))
 
 def extract_text_from_pdf(pdf_path: Path) -> str:
     doc = fitz.open(pdf_path)
@@ -19,7 +24,49 @@ def extract_text_from_pdf(pdf_path: Path) -> str:
     doc.close()
     return "\n".join(parts)
 
+def clean_text(raw: str) -> str:
+    """En-têtes/pieds répétés, texte espacé, césures, sommaires → texte compact + bilan en tokens."""
+    from boilerplate import strip_boilerplate
+    from context_budget import count_tokens
+
+    text, report = strip_boilerplate(raw)
+    before, after = count_tokens(raw), count_tokens(text)
+    print(f"🧹 Nettoyage : {before:,} → {after:,} tokens ({(after - before) / max(1, before):+.1%})")
+    print(f"   {report.furniture_lines} lignes d'en-tête/pied, {report.letter_spaced} lignes espacées, "
+          f"{report.toc_entries} entrées de sommaire regroupées, {report.joined_lines} lignes recollées, "
+          f"{report.pages_dropped} page(s) vide(s) retirée(s)")
+    return text
+
+def build_index(text: str) -> None:
+    """Découpe le texte en chunks et persiste l'index vectoriel (embedder local, hors-ligne)."""
+    from bm25 import chunk_text
+    from vector_index import build_vector_index
+
+    chunks = chunk_text(text, doc=OUT_PATH.stem)
+    build_vector_index(chunks, INDEX_DIR)
+    print(f"🧭 Index vectoriel → {INDEX_DIR} ({len(chunks)} chunks)")
+
 def main():
+    # --index-only : reconstruit l'index à partir du pdf_text.txt existant (sans relire le PDF)
+    if "--index-only" in sys.argv[1:]:
+        if not OUT_PATH.exists():
+            print(f"❌ Texte introuvable : {OUT_PATH}")
+            sys.exit(1)
+        build_index(OUT_PATH.read_text(encoding="utf-8"))
+        return
+
+    # --clean-only : relance le nettoyage sur l'extraction brute existante (sans relire le PDF)
+    if "--clean-only" in sys.argv[1:]:
+        src = RAW_PATH if RAW_PATH.exists() else OUT_PATH
+        if not src.exists():
+            print(f"❌ Texte introuvable : {src}")
+            sys.exit(1)
+        text = clean_text(src.read_text(encoding="utf-8"))
+        OUT_PATH.write_text(text, encoding="utf-8")
+        print(f"✅ Texte nettoyé → {OUT_PATH}")
+        build_index(text)
+        return
+
     if not PDF_PATH.exists():
         print(f"❌ PDF introuvable : {PDF_PATH}")
         print("   ➜ Vérifie le nom/chemin du fichier ou modifie PDF_PATH.")
@@ -33,13 +80,16 @@ def main():
         print("⚠️  Aucun texte extrait. Le PDF est peut-être scanné (images).")
         print("   ➜ On pourra ajouter l’OCR plus tard si besoin.")
     else:
+        RAW_PATH.write_text(text, encoding="utf-8")
+        text = clean_text(text)
         OUT_PATH.write_text(text, encoding="utf-8")
-        print(f"✅ Extraction OK → {OUT_PATH}")
+        print(f"✅ Extraction OK → {OUT_PATH} (brut : {RAW_PATH.name})")
         print(f"   Caractères : {len(text):,}")
         # Aperçu
         preview = text.strip().splitlines()
         print("--- APERÇU ---")
         print("\n".join(preview[:10]))  # affiche ~10 premières lignes
+        build_index(text)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,167 @@
+# ingest.py
+# Ingestion parallèle et incrémentale de PDF (PyMuPDF) :
+#  - pages extraites par lots dans un pool de processus,
+#  - cache par page indexé par hash du contenu (seules les pages modifiées sont ré-extraites),
+#  - sortie structurée JSONL (doc, page, chemin de titres, offsets des blocs) + texte à plat.
+#
+# Usage :
+#   python ingest.py                       # tous les *.pdf du dossier
+#   python ingest.py a.pdf b.pdf --workers 8 --out corpus/
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import fitz  # PyMuPDF
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_OUT = ROOT / "corpus"
+CACHE_DIR_NAME = ".page_cache"
+EXTRACTOR_VERSION = "1"          # à incrémenter si le format des pages en cache change
+HEADING_RATIO = 1.25             # taille de police ≥ 1.25 × corps de texte → titre
+HEADING_MAX_CHARS = 80
+
+
+# --- Travail d'un worker : un lot de pages d'un PDF ---
+def page_hash(page: "fitz.Page") -> str:
+    h = hashlib.sha256()
+    h.update(EXTRACTOR_VERSION.encode())
+    h.update(repr(tuple(page.rect)).encode())
+    h.update(page.read_contents())
+    for xref in sorted(x[0] for x in page.get_fonts()):
+        h.update(str(xref).encode())
+    return h.hexdigest()
+
+
+def extract_page(page: "fitz.Page") -> Dict:
+    """Blocs de texte de la page avec taille de police max (pour détecter les titres)."""
+    blocks = []
+    for b in page.get_text("dict")["blocks"]:
+        if b.get("type") != 0:
+            continue
+        lines, size = [], 0.0
+        for ln in b["lines"]:
+            text = "".join(sp["text"] for sp in ln["spans"])
+            if text.strip():
+                lines.append(text)
+                size = max([size] + [sp["size"] for sp in ln["spans"] if sp["text"].strip()])
+        if lines:
+            blocks.append({"text": "\n".join(lines), "size": round(size, 2),
+                           "bbox": [round(v, 1) for v in b["bbox"]]})
+    return {"blocks": blocks}
+
+
+def extract_range(pdf_path: str, first: int, last: int, cache_dir: str) -> List[Tuple[int, str, Dict, bool]]:
+    """Pages [first, last) : (n° page, hash, contenu, trouvé en cache ?)."""
+    out = []
+    cache = Path(cache_dir)
+    with fitz.open(pdf_path) as doc:
+        for i in range(first, last):
+            page = doc.load_page(i)
+            digest = page_hash(page)
+            cached = cache / f"{digest}.json"
+            if cached.exists():
+                out.append((i, digest, json.loads(cached.read_text(encoding="utf-8")), True))
+                continue
+            content = extract_page(page)
+            tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(content, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(cached)
+            out.append((i, digest, content, False))
+    return out
+
+
+# --- Assemblage (processus principal) ---
+def body_size(pages: List[Dict]) -> float:
+    sizes = [b["size"] for p in pages for b in p["blocks"] for _ in range(len(b["text"]))]
+    return statistics.median(sizes) if sizes else 0.0
+
+
+def build_records(doc_id: str, pages: List[Dict]) -> Tuple[str, List[Dict]]:
+    """Texte à plat (pages séparées par une ligne vide) + un enregistrement par bloc."""
+    body = body_size(pages)
+    path: List[Tuple[float, str]] = []      # pile (taille, titre)
+    records, parts, offset = [], [], 0
+    for page_no, page in enumerate(pages, start=1):
+        for block_no, b in enumerate(page["blocks"]):
+            text = b["text"]
+            one_line = " ".join(text.split())
+            if body and b["size"] >= body * HEADING_RATIO and len(one_line) <= HEADING_MAX_CHARS:
+                while path and path[-1][0] <= b["size"]:
+                    path.pop()
+                path.append((b["size"], one_line))
+            records.append({
+                "doc": doc_id, "page": page_no, "block": block_no,
+                "heading_path": [t for _, t in path],
+                "start": offset, "end": offset + len(text),
+                "size": b["size"], "bbox": b["bbox"], "text": text,
+            })
+            parts.append(text + "\n")
+            offset += len(text) + 1
+        parts.append("\n")
+        offset += 1
+    return "".join(parts), records
+
+
+def ingest(pdfs: List[Path], out_dir: Path, workers: int, pages_per_task: int) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir = out_dir / CACHE_DIR_NAME
+    cache_dir.mkdir(exist_ok=True)
+
+    tasks = []
+    for pdf in pdfs:
+        with fitz.open(pdf) as d:
+            n = d.page_count
+        for first in range(0, n, pages_per_task):
+            tasks.append((str(pdf), first, min(n, first + pages_per_task)))
+
+    t0 = time.perf_counter()
+    results: Dict[str, Dict[int, Dict]] = {str(p): {} for p in pdfs}
+    hits = total = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(extract_range, pdf, a, b, str(cache_dir)): pdf for pdf, a, b in tasks}
+        for fut in as_completed(futures):
+            pdf = futures[fut]
+            for i, _digest, content, hit in fut.result():
+                results[pdf][i] = content
+                hits += hit
+                total += 1
+
+    for pdf in pdfs:
+        doc_id = pdf.stem
+        pages = [results[str(pdf)][i] for i in sorted(results[str(pdf)])]
+        text, records = build_records(doc_id, pages)
+        (out_dir / f"{doc_id}.txt").write_text(text, encoding="utf-8")
+        with (out_dir / f"{doc_id}.jsonl").open("w", encoding="utf-8") as f:
+            for r in records:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        print(f"✅ {pdf.name} → {out_dir / (doc_id + '.jsonl')} ({len(pages)} pages, {len(records)} blocs)")
+
+    dt = time.perf_counter() - t0
+    print(f"⏱️  {total} pages en {dt:.2f}s — {hits} depuis le cache, {total - hits} extraites")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Ingestion parallèle et incrémentale de PDF.")
+    ap.add_argument("pdfs", nargs="*", type=Path, help="PDF à ingérer (défaut : *.pdf du dossier)")
+    ap.add_argument("--out", type=Path, default=DEFAULT_OUT, help="dossier de sortie (JSONL + .txt + cache)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--pages-per-task", type=int, default=8)
+    args = ap.parse_args()
+
+    pdfs = [p.resolve() for p in (args.pdfs or sorted(ROOT.glob("*.pdf")))]
+    missing = [p for p in pdfs if not p.exists()]
+    if not pdfs or missing:
+        print(f"❌ PDF introuvable : {missing or ROOT / '*.pdf'}")
+        sys.exit(1)
+    ingest(pdfs, args.out.resolve(), args.workers, max(1, args.pages_per_task))
+
+
+if __name__ == "__main__":
+    main()
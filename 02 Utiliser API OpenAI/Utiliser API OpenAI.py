@@ -33,29 +33,12 @@ if not TXT_PATH:
 print(f"📄 Contexte: {TXT_PATH}")
 text = TXT_PATH.read_text(encoding="utf-8")
 
-def pick_context(question: str, doc: str, max_chars: int = 4000) -> str:
-    q = (question or "").lower()
-    keys = []
-    if "service" in q or "équipement" in q or "amenit" in q:
-        keys = ["OUR SERVICES", "AMENITIES"]
-    elif "logo" in q:
-        keys = ["LOGO SYSTEM", "OUR LOGO", "LOGO"]
-    elif "couleur" in q or "color" in q:
-        keys = ["COLOR SYSTEM", "OUR COLORS"]
-    elif "typograph" in q or "police" in q or "font" in q:
-        keys = ["TYPOGRAPHY SYSTEM", "OUR PRIMARY TYPEFACE", "OUR ACCENT TYPEFACE"]
-    elif "valeur" in q or "slogan" in q or "mission" in q or "vision" in q:
-        keys = ["OUR VALUES", "OUR SLOGAN", "MISSION STATEMENT", "VISION STATEMENT"]
+# --- Sélecteur de contexte partagé avec l'app Flask (04 Flask/retrievers.py, stratégie "window_4k") ---
+sys.path.insert(0, str(PROJECT / "04 Flask"))
+from retrievers import WINDOW_02, window_context  # noqa: E402
 
-    if keys:
-        up = doc.upper()
-        for k in keys:
-            i = up.find(k)
-            if i != -1:
-                start = max(0, i - max_chars // 4)
-                end = min(len(doc), i + max_chars // 2)
-                return doc[start:end]
-    return doc[:max_chars]
+def pick_context(question: str, doc: str, max_chars: int = 4000) -> str:
+    return window_context(doc, question, max_chars, WINDOW_02)
 
 client = OpenAI()
 
@@ -1,6 +1,7 @@
 # 03 Intégrer LangChain/Intégrer LangChain.py
 from dotenv import load_dotenv
 import os
+import sys
 from pathlib import Path
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
@@ -24,95 +25,18 @@ if not TXT_PATH:
 
 FULL_DOC = TXT_PATH.read_text(encoding="utf-8")
 
-# --- Sélecteur de contexte: prend un extrait pertinent en fonction de la question ---
+# --- Retriever BM25 partagé avec l'app Flask (04 Flask/bm25.py) ---
+sys.path.insert(0, str(ROOT / "04 Flask"))
+from bm25 import BM25Index  # noqa: E402
+
+BM25 = BM25Index.from_text(FULL_DOC, doc=TXT_PATH.stem)
+
+# --- Sélecteur de contexte par fenêtre, partagé avec l'app (stratégie "window_15k" de retrievers.py) ---
+from retrievers import WINDOW_03, window_context  # noqa: E402
+
 def select_context(question: str, doc: str, max_chars: int = 15000) -> str:
-    """
-    Retourne un extrait pertinent du doc en fonction de la question.
-    Amélioration: pour la typographie, on concatène 3 blocs (Primary / Accent / Usage).
-    """
-    q = (question or "").lower()
-    UP = doc.upper()
-
-    def find_idx(anchor: str) -> int:
-        return UP.find(anchor.upper())
-
-    def slice_around(idx: int, before: int = 1500, after: int = 4500) -> str:
-        if idx < 0:
-            return ""
-        start = max(0, idx - before)
-        end = min(len(doc), idx + after)
-        return doc[start:end]
-
-    # --- Cas typographie : on assemble plusieurs sections ---
-    if any(k in q for k in ["typograph", "police", "font", "typo"]):
-        anchors = [
-            "TYPOGRAPHY SYSTEM",
-            "OUR PRIMARY TYPEFACE",
-            "BRANDON GROTESQUE",
-            "OUR ACCENT TYPEFACE",
-            "ESSONNES",
-            "TYPOGRAPHY USAGE",
-        ]
-        parts = []
-        for a in anchors:
-            idx = find_idx(a)
-            chunk = slice_around(idx)
-            if chunk:
-                parts.append(chunk)
-        if parts:
-            joined = "\n\n---\n\n".join(parts)
-            # borne de sécurité si très long
-            return joined[:max_chars]
-
-    # --- Thèmes généraux (services, logo, couleurs, etc.) ---
-    themes = [
-        (["service", "commodit", "amenit", "équipement"], [
-            "OUR SERVICES & AMENITIES", "OUR SERVICES", "AMENITIES"
-        ]),
-        (["logo", "logotype", "logomark", "marque"], [
-            "LOGO SYSTEM", "OUR LOGO", "LOGOTYPE", "OUR LOGOTYPE",
-            "LOGOMARK", "OUR LOGOMARK", "LOGO LOCK-UP", "LOGO USAGE",
-            "SECONDARY SUBMARKS", "LOGO COMPONENTS & CONSTRUCTION"
-        ]),
-        (["couleur", "color"], [
-            "COLOR SYSTEM", "OUR COLORS", "COLOR CODES", "BACKGROUND COLORS",
-            "WEB ACCESSIBLE COLORS", "COLOR USAGE"
-        ]),
-        (["graphique", "icône", "icone", "pattern", "motif", "bannière", "banniere"], [
-            "SUPPORTING GRAPHICS", "OUR ICONS", "OUR PATTERNS", "BANNER GRAPHIC"
-        ]),
-        (["photo", "photograph"], [
-            "PHOTOGRAPHY", "STYLE", "COMPOSITION", "LIGHTING", "COLOR"
-        ]),
-        (["valeur", "mission", "vision", "slogan", "purpose"], [
-            "OUR VALUES", "MISSION STATEMENT", "VISION STATEMENT",
-            "OUR SLOGAN", "BRAND FOUNDATION"
-        ]),
-        (["papier", "facture", "newsletter", "sales sheet", "stationery", "devis", "invoice"], [
-            "BRANDED MATERIALS", "STATIONERY", "NEWSLETTER", "INVOICE", "SALES SHEET"
-        ]),
-    ]
-
-    def first_anchor_idx(anchors):
-        for a in anchors:
-            i = find_idx(a)
-            if i != -1:
-                return i
-        return -1
-
-    for keys, anchors in themes:
-        if any(k in q for k in keys):
-            i = first_anchor_idx(anchors)
-            if i != -1:
-                return slice_around(i, before=max_chars // 4, after=max_chars // 2)
-
-    # Fallbacks
-    for fb in ["BRANDON GROTESQUE", "OUR COLORS", "OUR SERVICES", "PHOTOGRAPHY"]:
-        i = find_idx(fb)
-        if i != -1:
-            return slice_around(i, before=max_chars // 4, after=max_chars // 2)
-
-    return doc[:max_chars]
+    """Extrait du doc autour des ancres du thème de la question (typographie : plusieurs blocs)."""
+    return window_context(doc, question, max_chars, WINDOW_03)
 
 
 # --- Règles système (tes règles, en message system) ---
@@ -141,8 +65,15 @@ prompt = ChatPromptTemplate.from_messages([
 llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
 chain = prompt | llm  # LCEL: prompt → LLM
 
+def retrieve_context(question: str, max_chars: int = 6000) -> str:
+    """Top-k chunks BM25 dans le budget ; sinon, ancien sélecteur par thèmes."""
+    chunks = BM25.select(question, k=6, max_chars=max_chars)
+    if not chunks:
+        return select_context(question, FULL_DOC)
+    return "\n\n---\n\n".join(c.text for c in chunks)
+
 def ask(question: str) -> str:
-    ctx = select_context(question, FULL_DOC)
+    ctx = retrieve_context(question)
     resp = chain.invoke({"context": ctx, "question": question})
     return getattr(resp, "content", str(resp))
 
@@ -0,0 +1,202 @@
+# answer_cache.py
+# Cache de réponses à 2 niveaux : LRU en mémoire + table SQLite (SQLAlchemy), avec TTL.
+# SQLAlchemy (~0,2 s d'import) n'est chargé qu'au premier accès à la table.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional
+
+from textnorm import normalize_question
+
+
+@lru_cache(maxsize=1)
+def schema():
+    """(module sqlalchemy, métadonnées, table answers)."""
+    import sqlalchemy as sa
+
+    metadata = sa.MetaData()
+    answers = sa.Table(
+        "answers",
+        metadata,
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("answer", sa.Text, nullable=False),
+        sa.Column("created_at", sa.Float, nullable=False),
+        sa.Column("last_hit", sa.Float, nullable=False, index=True),
+        sa.Column("hits", sa.Integer, nullable=False, default=0),
+    )
+    return sa, metadata, answers
+
+
+def sha(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """get/put par clé ; compteurs de hits/misses exposés par stats()."""
+
+    def __init__(self, db_url: str, ttl: float = 7 * 24 * 3600,
+                 max_memory: int = 512, max_rows: int = 50_000, recount_every: int = 1000):
+        self.ttl = ttl
+        self.max_memory = max_memory
+        self.max_rows = max_rows
+        # nombre de lignes tenu en mémoire : COUNT(*) seulement au-delà du plafond, ou toutes les
+        # recount_every écritures (les autres workers écrivent dans la même table) ; les entrées
+        # expirées sont purgées juste avant chaque recomptage
+        self.recount_every = recount_every
+        self._rows: Optional[int] = None
+        self._puts_since_count = 0
+        self.db_url = db_url
+        self._engine = None
+        self._engine_lock = threading.Lock()
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits_memory": 0, "hits_db": 0, "misses": 0, "puts": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(question: str, context: str, model: str, system_prompt: str) -> str:
+        """Question normalisée + hash du contexte + modèle + hash du prompt système."""
+        return sha("\x1f".join([normalize_question(question), sha(context), model, sha(system_prompt)]))
+
+    @property
+    def engine(self):
+        """Moteur SQLAlchemy créé (et table créée) au premier accès."""
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    sa, metadata, _ = schema()
+                    engine = sa.create_engine(self.db_url, future=True)
+                    metadata.create_all(engine)
+                    self._engine = engine
+        return self._engine
+
+    def after_fork(self) -> None:
+        """Processus forké : ne pas réutiliser les connexions SQL du parent."""
+        if self._engine is not None:
+            self._engine.dispose(close=False)
+        self._lock = threading.Lock()
+        self._engine_lock = threading.Lock()
+        self._rows = None
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    # --- Niveau 1 : mémoire ---
+    def _mem_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._mem.get(key)
+            if item is None:
+                return None
+            answer, expires = item
+            if expires < time.time():
+                del self._mem[key]
+                return None
+            self._mem.move_to_end(key)
+            return answer
+
+    def _mem_put(self, key: str, answer: str, expires: float) -> None:
+        with self._lock:
+            self._mem[key] = (answer, expires)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_memory:
+                self._mem.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    # --- API ---
+    def get(self, key: str) -> Optional[str]:
+        answer = self._mem_get(key)
+        if answer is not None:
+            self._count("hits_memory")
+            return answer
+
+        now = time.time()
+        sa, _, answers = schema()
+        with self.engine.begin() as conn:
+            row = conn.execute(sa.select(answers.c.answer, answers.c.created_at)
+                               .where(answers.c.key == key)).first()
+            if row is None or row.created_at + self.ttl < now:
+                if row is not None:
+                    conn.execute(sa.delete(answers).where(answers.c.key == key))
+                    self._add_rows(-1)
+                self._count("misses")
+                return None
+            conn.execute(answers.update().where(answers.c.key == key)
+                         .values(last_hit=now, hits=answers.c.hits + 1))
+        self._mem_put(key, row.answer, row.created_at + self.ttl)
+        self._count("hits_db")
+        return row.answer
+
+    def has(self, key: str) -> bool:
+        """Entrée valide présente, sans toucher aux compteurs hits/misses (pré-calcul)."""
+        if self._mem_get(key) is not None:
+            return True
+        sa, _, answers = schema()
+        with self.engine.connect() as conn:
+            created = conn.execute(sa.select(answers.c.created_at).where(answers.c.key == key)).scalar()
+        return created is not None and created + self.ttl >= time.time()
+
+    def put(self, key: str, answer: str) -> None:
+        now = time.time()
+        self._mem_put(key, answer, now + self.ttl)
+        sa, _, answers = schema()
+        with self.engine.begin() as conn:
+            replaced = conn.execute(sa.delete(answers).where(answers.c.key == key)).rowcount or 0
+            conn.execute(answers.insert().values(key=key, answer=answer, created_at=now, last_hit=now, hits=0))
+            if self._over_cap(conn, 1 - replaced):
+                self._evict(conn)
+        self._count("puts")
+
+    # --- Plafond de lignes (verrou non requis : une estimation suffit) ---
+    def _add_rows(self, n: int) -> None:
+        if self._rows is not None:
+            self._rows = max(0, self._rows + n)
+
+    def _over_cap(self, conn, added: int) -> bool:
+        """Vrai si la table dépasse max_rows ; COUNT(*) seulement quand l'estimation l'exige."""
+        self._add_rows(added)
+        self._puts_since_count += 1
+        if self._rows is None or self._rows > self.max_rows or self._puts_since_count >= self.recount_every:
+            sa, _, answers = schema()
+            self._purge(conn)
+            self._rows = conn.execute(sa.select(sa.func.count()).select_from(answers)).scalar_one()
+            self._puts_since_count = 0
+        return self._rows > self.max_rows
+
+    def _evict(self, conn) -> None:
+        """Éviction LRU côté disque jusqu'à 90 % du plafond : les écritures suivantes ne recomptent pas."""
+        sa, _, answers = schema()
+        n = self._rows - (self.max_rows - self.max_rows // 10)
+        oldest = sa.select(answers.c.key).order_by(answers.c.last_hit).limit(n)
+        res = conn.execute(sa.delete(answers).where(answers.c.key.in_(oldest)))
+        self._add_rows(-(res.rowcount or 0))
+        self._count("evictions", res.rowcount or 0)
+
+    def _purge(self, conn) -> int:
+        sa, _, answers = schema()
+        res = conn.execute(sa.delete(answers).where(answers.c.created_at < time.time() - self.ttl))
+        self._add_rows(-(res.rowcount or 0))
+        return res.rowcount or 0
+
+    def purge_expired(self) -> int:
+        """Supprime les entrées expirées (démarrage ; ensuite à chaque recomptage dans put)."""
+        with self.engine.begin() as conn:
+            return self._purge(conn)
+
+    def clear(self) -> None:
+        """Vide les deux niveaux (benchmarks, changement de prompt)."""
+        with self._lock:
+            self._mem.clear()
+        sa, _, answers = schema()
+        with self.engine.begin() as conn:
+            conn.execute(sa.delete(answers))
+        self._rows = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            out = dict(self.counters)
+            out["memory_entries"] = len(self._mem)
+        total = out["hits_memory"] + out["hits_db"] + out["misses"]
+        out["hit_rate"] = round((out["hits_memory"] + out["hits_db"]) / total, 4) if total else 0.0
+        return out
@@ -1,15 +1,38 @@
 # Version 07
+import time
+T_START = time.perf_counter()  # mesure du démarrage à froid (STARTUP, /health)
 from dotenv import load_dotenv
 import os
+import threading
+import json
 from pathlib import Path
-from flask import Flask, request, jsonify, render_template
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+from typing import Dict, List, Optional, Tuple
+from flask import Flask, Response, g, request, jsonify, render_template, stream_with_context
 import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from vector_index import VectorIndex
+from answer_cache import AnswerCache
+from llm_runtime import LLMRuntime, Saturated
+from singleflight import FlightTimeout, SingleFlight
+from context_budget import Assembled, count_tokens
+from corpus import CorpusManager
+from retrieval import ROUTES, Retrieval, build_retrieval, route_themes
+from traffic import DeadlineExceeded, RateLimited, TrafficController, retryable
+from sessions import ConversationStore
+from query_log import Prewarmer, QueryLog
+from retrievers import WINDOW_02, WINDOW_03, Retriever, ShadowEvaluator, WindowRetriever
+from textnorm import normalize_question, tokenize
+from metrics import CONTENT_TYPE, TOKEN_BUCKETS, Registry, usage_of
+import snapshot
 
 load_dotenv()
-if not os.getenv("OPENAI_API_KEY"):
-    raise RuntimeError("OPENAI_API_KEY manquante dans .env")
+# langchain / openai / SQLAlchemy ne sont importés qu'au premier usage (get_llm, warm_up) :
+# /health répond sans eux, et sans OPENAI_API_KEY (les appels LLM renvoient alors 503)
+STARTUP = {"imports_ms": round((time.perf_counter() - T_START) * 1000, 1)}
+
+class LLMNotConfigured(RuntimeError):
+    """OPENAI_API_KEY absente : seules les réponses locales (intentions, cache) sont possibles."""
 
 ROOT = Path(__file__).resolve().parents[1]
 CANDIDATES = [
@@ -22,111 +45,177 @@ if not TXT_PATH:
     tried = "\n- ".join(str(p) for p in CANDIDATES)
     raise FileNotFoundError("Impossible de trouver pdf_text.txt. Emplacements testés:\n- " + tried)
 
-FULL_DOC = TXT_PATH.read_text(encoding="utf-8")
-UPPER = FULL_DOC.upper()
-
-def select_context(question: str, doc: str, max_chars: int = 15000) -> str:
-    q = (question or "").lower()
-    UP = doc.upper()
-
-    def find_idx(anchor: str) -> int:
-        return UP.find(anchor.upper())
-
-    def slice_around(idx: int, before: int = 1500, after: int = 4500) -> str:
-        if idx < 0:
-            return ""
-        start = max(0, idx - before)
-        end = min(len(doc), idx + after)
-        return doc[start:end]
-
-    if any(k in q for k in ["typograph", "police", "font", "typo"]):
-        anchors = [
-            "TYPOGRAPHY SYSTEM","OUR PRIMARY TYPEFACE","BRANDON GROTESQUE",
-            "OUR ACCENT TYPEFACE","ESSONNES","TYPOGRAPHY USAGE",
-        ]
-        parts = []
-        for a in anchors:
-            chunk = slice_around(find_idx(a))
-            if chunk:
-                parts.append(chunk)
-        if parts:
-            return ("\n\n---\n\n".join(parts))[:max_chars]
-
-    themes = [
-        # 1. Services & équipements
-        (["service","commodit","amenit","équipement"],
-         ["OUR SERVICES & AMENITIES","OUR SERVICES","AMENITIES"]),
-        
-        # 2. Logo / identité visuelle
-        (["logo","logotype","logomark","marque"],
-         ["LOGO SYSTEM","OUR LOGO","LOGOTYPE","OUR LOGOTYPE",
-          "LOGOMARK","OUR LOGOMARK","LOGO LOCK-UP","LOGO USAGE",
-          "SECONDARY SUBMARKS","LOGO COMPONENTS & CONSTRUCTION"]),
-        
-        # 3. Couleurs
-        (["couleur","color"],
-         ["COLOR SYSTEM","OUR COLORS","COLOR CODES","BACKGROUND COLORS",
-          "WEB ACCESSIBLE COLORS","COLOR USAGE"]),
-        
-        # 4. Graphiques / icônes / motifs / bannières
-        (["graphique","icône","icone","pattern","motif","bannière","banniere"],
-         ["SUPPORTING GRAPHICS","OUR ICONS","OUR PATTERNS","BANNER GRAPHIC"]),
-         
-         # 5. Photographie
-        (["photo","photograph"],["PHOTOGRAPHY","STYLE","COMPOSITION","LIGHTING","COLOR"]),
-        
-        # 6. Valeurs / mission / vision / slogan
-        (["valeur","mission","vision","slogan","purpose"],
-         ["OUR VALUES","MISSION STATEMENT","VISION STATEMENT","OUR SLOGAN","BRAND FOUNDATION"]),
-        
-         # 7. Matériel imprimé / documents
-        (["papier","facture","newsletter","sales sheet","stationery","devis","invoice"],
-         ["BRANDED MATERIALS","STATIONERY","NEWSLETTER","INVOICE","SALES SHEET"]),
-        
-        # 8. Typographie
-        (["typographie", "typo", "font", "fonts", "police", "polices"],
-        ["TYPOGRAPHY SYSTEM", "OUR PRIMARY TYPEFACE", "OUR ACCENT TYPEFACE", "TYPOGRAPHY USAGE"]),
-
-        # 9. Personnalité de marque
-        (["personnalité", "personnalite", "brand personality", "personality"],
-        ["OUR BRAND PERSONALITY", "BRAND CHARACTERISTICS"]),
-
-        # 10. Voix & ton
-        (["voix", "ton", "tone", "voice", "style verbal", "style d'écriture", "style d'ecriture", "style ecriture"],
-        ["OUR VOICE & TONE", "OUR VERBAL STYLE"]),
-
-        # 11. Style visuel (look & feel)
-        (["look", "feel", "style visuel", "visuel", "apparence"],
-        ["OUR LOOK & FEEL", "OUR VISUAL STYLE"]),
-
-        # 12. Clients / cible
-        (["client", "clients", "customer", "customers", "cible", "audience"],
-        ["OUR CUSTOMERS"]),
-
-        # 13. Localisation
-        (["localisation", "emplacement", "où", "ou", "situé", "situe", "adresse", "quartier",
-        "lieu", "location", "située", "situee", "se trouve"],
-        ["WEST END, LONDON", "The Landon Hotel – West End", "123 Oxford Street", "LOCAL SIGHTS"]),
-
-        # 14. Tarification / prix
-        (["tarif", "tarifs", "tarification", "prix", "coût", "cout", "frais",
-        "combien", "price", "prices", "pricing", "rate", "rates", "fee", "fees"],
-        ["INVOICE", "NEWSLETTER & INVOICE", "Room Charge", "Room Tax", "Occupancy Tax"]),
-    ]
-
-    for keys, anchors in themes:
-        if any(k in q for k in keys):
-            for a in anchors:
-                i = UPPER.find(a.upper())
-                if i != -1:
-                    return slice_around(i, before=max_chars//4, after=max_chars//2)
-
-    for fb in ["BRANDON GROTESQUE","OUR COLORS","OUR SERVICES","PHOTOGRAPHY"]:
-        i = UPPER.find(fb.upper())
-        if i != -1:
-            return slice_around(i, before=max_chars//4, after=max_chars//2)
-
-    return doc[:max_chars]
+MODEL_NAME = "gpt-4o-mini"
+
+# --- Métriques (GET /metrics, format texte Prometheus) ---
+METRICS = Registry()
+STAGE_SECONDS = METRICS.histogram("chatbot_stage_seconds", "Durée de chaque étape du pipeline", ["stage"])
+REQUEST_SECONDS = METRICS.histogram("chatbot_request_seconds", "Durée des requêtes HTTP (jusqu'aux en-têtes)",
+                                    ["endpoint"])
+REQUESTS = METRICS.counter("chatbot_requests_total", "Requêtes HTTP par route et statut", ["endpoint", "status"])
+ERRORS = METRICS.counter("chatbot_errors_total", "Erreurs par type", ["kind"])
+LLM_TOKENS = METRICS.counter("chatbot_llm_tokens_total", "Tokens rapportés par l'API OpenAI", ["kind"])
+CONTEXT_TOKENS = METRICS.histogram("chatbot_context_tokens", "Tokens de contexte par question",
+                                   buckets=TOKEN_BUCKETS)
+CONTEXT_DROPPED = METRICS.counter("chatbot_context_dropped_total", "Intervalles écartés faute de budget")
+INTENTS = METRICS.counter("chatbot_intents_total", "Messages traités sans LLM par le routeur d'intentions",
+                          ["intent"])
+RETRIEVAL = METRICS.counter("chatbot_retrieval_total", "Sélections de contexte par retriever effectif",
+                            ["retriever"])
+
+# nombre de thèmes retenus par question (section_spans)
+ROUTE_MAX_THEMES = int(os.getenv("ROUTE_MAX_THEMES", "3"))
+
+# --- Corpus : pdf_text.txt + dossiers de documents extraits (CORPUS_DIR), rechargés à chaud ---
+CORPUS_SOURCES = [TXT_PATH] + [Path(p) for p in os.getenv("CORPUS_DIR", "").split(os.pathsep) if p]
+# instantané binaire de l'index (snapshot.py) : chargé en un mmap au démarrage ; CORPUS_SNAPSHOT=off pour couper
+SNAPSHOT_PATH = os.getenv("CORPUS_SNAPSHOT") or str(Path(__file__).resolve().parent / "corpus.snapshot")
+SNAPSHOT_CODE = [Path(__file__).resolve().parent / f for f in
+                 ("app.py", "retrieval.py", "sections.py", "bm25.py", "intents.py", "keyword_matcher.py", "textnorm.py", "snapshot.py")]
+_t = time.perf_counter()
+CORPUS = CorpusManager(CORPUS_SOURCES, build_retrieval,
+                       poll_interval=float(os.getenv("CORPUS_POLL", "2")),
+                       snapshot=None if SNAPSHOT_PATH == "off" else Path(SNAPSHOT_PATH),
+                       snapshot_version=snapshot.code_version(SNAPSHOT_CODE)).start()
+STARTUP.update(corpus_ms=round((time.perf_counter() - _t) * 1000, 1), snapshot=CORPUS.snapshot_status)
+
+def section_spans(r: Retrieval, question: str, docs: Optional[List[str]] = None):
+    """Routage par thèmes → intervalles (doc, start, end, score) des sections, par pertinence ;
+    [] si aucun thème n'est reconnu (le retriever passe alors la main à BM25)."""
+    ranked = route_themes(question)
+    out = []
+    for doc_id in (docs or r.docs):
+        themes, _ = r.routes[doc_id]
+        # sections des meilleurs thèmes présents dans ce document ; les thèmes sont entrelacés
+        # (1re section de chacun, puis 2e…) pour que chacun ait sa part du budget
+        groups, seen = [], set()
+        for g in [g for g in ranked if themes[g]][:ROUTE_MAX_THEMES]:
+            spans = [s for s in r.sections[doc_id].spans(themes[g]) if s not in seen]
+            seen.update(spans)
+            groups.append(spans)
+        out += [(doc_id, start, end, -float(i * len(groups) + t))
+                for t, spans in enumerate(groups) for i, (start, end) in enumerate(spans)]
+    return out
+
+def fallback_spans(r: Retrieval, question: str, docs: Optional[List[str]] = None):
+    """Dernier recours : la section fixe de FALLBACK_ANCHORS de chaque document."""
+    out = []
+    for doc_id in (docs or r.docs):
+        out += [(doc_id, start, end, 0.0) for start, end in r.sections[doc_id].spans(r.routes[doc_id][1])]
+    return out
+
+# --- Retrievers ---
+# "sections" (défaut) = routage par thèmes, BM25 pour les questions hors thèmes ;
+# "bm25" = top-k chunks (index inversé) ; "vector" = index dense construit à l'étape 01 (mmap,
+# partagé entre workers) ; "window_4k" / "window_15k" = fenêtres fixes des scripts 02 / 03.
+# BM25 seul est moins pertinent que les thèmes sur les questions de référence (test_retrieval.py) :
+# il ne repasse en défaut que s'il les retrouve aussi bien.
+CONTEXT_RETRIEVER = os.getenv("CONTEXT_RETRIEVER", "sections")
+BM25_TOP_K = int(os.getenv("BM25_TOP_K", "8"))
+# budget de tokens du CONTEXTE (compté avec tiktoken), rempli par ordre de pertinence
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+# --- Index vectoriel (optionnel : généré par l'étape 01) ---
+VECTOR_DIR = Path(os.getenv("VECTOR_INDEX_DIR") or TXT_PATH.parent / "vector_index")
+VECTORS = VectorIndex.load(VECTOR_DIR) if VectorIndex.exists(VECTOR_DIR) else None
+
+def expand_query(question: str) -> str:
+    """Les mots-clés FR des thèmes servent de synonymes : on ajoute les ancres (EN) du doc."""
+    extra = []
+    for g in sorted(route_themes(question)):
+        extra += ROUTES[g][1]
+    return " ".join([question or ""] + extra)
+
+def bm25_spans(r: Retrieval, question: str, docs: Optional[List[str]] = None):
+    return [(c.doc, c.start, c.end, score) for c, score in r.bm25.search(expand_query(question), k=BM25_TOP_K, docs=docs)]
+
+def bm25_spans_batch(r: Retrieval, questions: List[str], docs: Optional[List[str]] = None):
+    """Un seul passage de scoring vectorisé pour N questions."""
+    return [[(c.doc, c.start, c.end, score) for c, score in hits]
+            for hits in r.bm25.search_batch([expand_query(q) for q in questions], k=BM25_TOP_K, docs=docs)]
+
+def vector_spans(r: Retrieval, hits, docs: Optional[List[str]] = None):
+    # l'index a pu être construit sur un autre texte : on vérifie les offsets
+    return [(c["doc"], c["start"], c["end"], score) for c, score in hits
+            if (docs is None or c["doc"] in docs)
+            and r.docs.get(c["doc"], "")[c["start"]:c["end"]].strip() == c["text"]]
+
+def vector_search(r: Retrieval, question: str, docs: Optional[List[str]] = None):
+    return vector_spans(r, VECTORS.search(expand_query(question), k=BM25_TOP_K), docs)
+
+def vector_search_batch(r: Retrieval, questions: List[str], docs: Optional[List[str]] = None):
+    return [vector_spans(r, hits, docs)
+            for hits in VECTORS.search_batch([expand_query(q) for q in questions], k=BM25_TOP_K)]
+
+# repli en chaîne : thèmes → BM25 → section fixe (jamais de contexte vide)
+BM25 = Retriever("bm25", bm25_spans, bm25_spans_batch, fallback=Retriever("anchors", fallback_spans))
+SECTIONS = Retriever("sections", section_spans, fallback=BM25)
+RETRIEVERS: Dict[str, Retriever] = {
+    "sections": SECTIONS,
+    "bm25": BM25,
+    "window_4k": WindowRetriever("window_4k", 4000, WINDOW_02),
+    "window_15k": WindowRetriever("window_15k", 15000, WINDOW_03),
+}
+if VECTORS is not None:
+    RETRIEVERS["vector"] = Retriever("vector", vector_search, vector_search_batch, fallback=SECTIONS)
+if CONTEXT_RETRIEVER == "vector" and VECTORS is None:
+    print(f"⚠️  Index vectoriel absent ({VECTOR_DIR}) → repli sur les sections.")
+elif CONTEXT_RETRIEVER not in RETRIEVERS:
+    print(f"⚠️  CONTEXT_RETRIEVER={CONTEXT_RETRIEVER} inconnu ({', '.join(RETRIEVERS)}) → sections.")
+PRIMARY = RETRIEVERS.get(CONTEXT_RETRIEVER, SECTIONS)
+CONTEXT_RETRIEVER = PRIMARY.name
+
+def context_spans(r: Retrieval, question: str, docs: Optional[List[str]] = None):
+    """Intervalles candidats (doc, start, end, score) selon le retriever configuré."""
+    used, spans = PRIMARY.search(r, question, docs)
+    RETRIEVAL.inc(used)
+    return spans
+
+def context_spans_batch(r: Retrieval, questions: List[str], docs: Optional[List[str]] = None):
+    """Comme context_spans, pour N questions (scoring groupé si la stratégie le permet)."""
+    out = []
+    for used, spans in PRIMARY.search_batch(r, questions, docs):
+        RETRIEVAL.inc(used)
+        out.append(spans)
+    return out
+
+def scope(docs) -> Optional[List[str]]:
+    """Documents demandés (str ou liste de str) ∩ corpus ; None = tout le corpus, [] = inconnus.
+    ValueError si "doc" n'est ni une chaîne ni une liste de chaînes."""
+    if docs is None or docs == "" or docs == []:
+        return None
+    if isinstance(docs, str):
+        docs = [docs]
+    if not isinstance(docs, list) or not all(isinstance(d, str) for d in docs):
+        raise ValueError("\"doc\" doit être une chaîne ou une liste de chaînes.")
+    return [d for d in docs if d in CORPUS.current.docs]
+
+def request_scope(data: dict) -> Tuple[Optional[List[str]], Optional[str]]:
+    """(documents, message d'erreur pour un 400) à partir du corps JSON."""
+    try:
+        docs = scope(data.get("doc"))
+    except ValueError as e:
+        return None, str(e)
+    return docs, ("Document inconnu." if docs == [] else None)
+
+def build_context(question: str, budget: int = CONTEXT_TOKEN_BUDGET,
+                  docs: Optional[List[str]] = None, trace_id: Optional[str] = None) -> Assembled:
+    """Contexte dédoublonné, rempli par pertinence jusqu'au budget de tokens.
+    `trace_id` : question du trafic réel, candidate au mode shadow."""
+    r = CORPUS.current  # une seule lecture : la requête reste sur cette version du corpus
+    built = PRIMARY.fill(r, context_spans(r, question, docs), budget, MODEL_NAME)
+    if trace_id is not None:
+        SHADOW.submit(r, question, docs, PRIMARY, built, trace_id)
+    return built
+
+def build_contexts(questions: List[str], budget: int = CONTEXT_TOKEN_BUDGET,
+                   docs: Optional[List[str]] = None) -> List[Assembled]:
+    r = CORPUS.current
+    return [PRIMARY.fill(r, spans, budget, MODEL_NAME) for spans in context_spans_batch(r, questions, docs)]
+
+def select_context(question: str, budget: int = CONTEXT_TOKEN_BUDGET,
+                   docs: Optional[List[str]] = None) -> str:
+    return build_context(question, budget, docs).text
 
 system_rules = """You are "Mr. Landon", the hotel manager persona for Landon Hotel.
 You ONLY discuss Landon Hotel topics (brand, services, amenities, visual identity, etc.), grounded in the provided document.
@@ -144,41 +233,728 @@ Rules:
 - Base every factual detail strictly on CONTEXTE.
 """
 
-prompt = ChatPromptTemplate.from_messages([
-    ("system", system_rules),
-    ("user", "CONTEXTE:\n{context}\n\nQUESTION:\n{question}")
-])
+_lazy_lock = threading.Lock()
+_prompt = None
+
+def get_prompt():
+    global _prompt
+    if _prompt is None:
+        with _lazy_lock:
+            if _prompt is None:
+                from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+                _prompt = ChatPromptTemplate.from_messages([
+                    ("system", system_rules),
+                    MessagesPlaceholder("history", optional=True),  # mémoire de la session (absente au 1er message)
+                    ("user", "CONTEXTE:\n{context}\n\nQUESTION:\n{question}")
+                ])
+    return _prompt
+
+# --- Client HTTP partagé (keep-alive, pool borné) + boucle async pour les appels LLM ---
+LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "32"))
+RUNTIME = LLMRuntime(
+    max_inflight=LLM_MAX_INFLIGHT,
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "256")),
+    queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", "30")),
+    retry_after=int(os.getenv("LLM_RETRY_AFTER", "5")),
+)
+
+# --- Contrôle du trafic OpenAI : quota RPM/TPM, tentatives sur 429/5xx, échéance, hedging ---
+TRAFFIC = TrafficController(
+    rpm=float(os.getenv("OPENAI_RPM", "500")),
+    tpm=float(os.getenv("OPENAI_TPM", "200000")),
+    deadline=float(os.getenv("LLM_DEADLINE", "30")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+    hedge=os.getenv("LLM_HEDGE", "0") == "1",
+)
+# tokens de réponse réservés d'avance dans le seau TPM (corrigé ensuite avec l'usage réel)
+LLM_EXPECTED_COMPLETION = int(os.getenv("LLM_EXPECTED_COMPLETION", "300"))
+
+_llm = None
+
+def get_llm():
+    """Client ChatOpenAI, construit (et langchain_openai importé) au premier appel LLM."""
+    global _llm
+    if _llm is None:
+        if not os.getenv("OPENAI_API_KEY"):
+            raise LLMNotConfigured("OPENAI_API_KEY manquante dans .env")
+        with _lazy_lock:
+            if _llm is None:
+                import httpx
+                from langchain_openai import ChatOpenAI
+                limits = httpx.Limits(max_connections=LLM_MAX_INFLIGHT, max_keepalive_connections=LLM_MAX_INFLIGHT)
+                _llm = ChatOpenAI(
+                    model=MODEL_NAME,
+                    temperature=0,
+                    stream_usage=True,  # usage (tokens) aussi renvoyé en fin de flux
+                    include_response_headers=True,  # x-ratelimit-* → recalage des seaux
+                    max_retries=0,  # les tentatives sont gérées par TRAFFIC (gigue + échéance)
+                    timeout=float(os.getenv("LLM_ATTEMPT_TIMEOUT", "20")),
+                    http_client=httpx.Client(limits=limits),
+                    http_async_client=httpx.AsyncClient(limits=limits),
+                )
+    return _llm
+
+def warm_up() -> None:
+    """Charge d'avance ce que le 1er appel LLM chargerait (imports lourds, tiktoken, SQLite)."""
+    t0 = time.perf_counter()
+    get_prompt()
+    retryable()
+    count_tokens("warm-up", MODEL_NAME)
+    ANSWER_CACHE.purge_expired()   # crée aussi la table ; les lignes expirées ne s'accumulent pas
+    try:
+        get_llm()
+    except LLMNotConfigured as e:
+        print(f"⚠️  {e} : réponses locales seulement (intentions, cache)")
+    STARTUP["warm_up_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+def estimate_tokens(messages) -> int:
+    return count_tokens(messages.to_string(), MODEL_NAME) + LLM_EXPECTED_COMPLETION
+
+def observe(message, estimated: int) -> None:
+    """Sur la boucle LLM : en-têtes de quota et usage réel → seaux du TRAFFIC."""
+    TRAFFIC.observe_headers((getattr(message, "response_metadata", None) or {}).get("headers"))
+    usage = usage_of(message)
+    if usage:
+        TRAFFIC.settle(estimated, sum(usage))
+
+async def invoke_llm(messages, estimated: int):
+    resp = await get_llm().ainvoke(messages)
+    observe(resp, estimated)
+    return resp
+
+async def stream_llm(messages, estimated: int):
+    async for chunk in get_llm().astream(messages):
+        observe(chunk, estimated)
+        yield chunk
+
+# --- Cache de réponses (temperature=0 + contexte déterministe → même réponse) ---
+ANSWER_CACHE = AnswerCache(
+    os.getenv("ANSWER_CACHE_URL") or f"sqlite:///{Path(__file__).resolve().parent / 'answer_cache.sqlite3'}",
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600))),
+    max_memory=int(os.getenv("ANSWER_CACHE_MEMORY", "512")),
+    max_rows=int(os.getenv("ANSWER_CACHE_ROWS", "50000")),
+)
+
+METRICS.gauges("chatbot_cache", "Cache de réponses", lambda: ANSWER_CACHE.stats())
+METRICS.gauges("chatbot_llm_runtime", "Boucle LLM (admission)", lambda: RUNTIME.stats())
+METRICS.gauges("chatbot_traffic", "Quota et tentatives OpenAI", lambda: TRAFFIC.stats())
+METRICS.gauges("chatbot_corpus", "Corpus chargé", lambda: CORPUS.stats())
+
+def prepare(question: str, info: Optional[dict] = None, docs: Optional[List[str]] = None,
+            history: str = "", query: Optional[str] = None):
+    """Contexte + clé de cache pour une question ; `info` reçoit les tokens de contexte.
+    `query` : texte de recherche s'il diffère de la question (relance courte d'une conversation)."""
+    with STAGE_SECONDS.time("select_context"):
+        built = build_context(query or question, docs=docs, trace_id=(info or {}).get("trace_id"))
+    CONTEXT_TOKENS.observe(built.tokens)
+    if built.dropped:
+        CONTEXT_DROPPED.inc(n=built.dropped)
+    if info is not None:
+        info["context_tokens"] = built.tokens
+        if QUERY_LOG_ON:
+            info["sections"] = matched_sections(built.spans)
+    if history and info is not None:
+        info["history_tokens"] = count_tokens(history, MODEL_NAME)
+    # historique = relance uniquement (conversation()) ; il fait alors partie du prompt, donc de la clé
+    return built.text, AnswerCache.make_key(question, built.text, MODEL_NAME, system_rules + history)
+
+def cache_get(key: str) -> Optional[str]:
+    with STAGE_SECONDS.time("cache_lookup"):
+        return ANSWER_CACHE.get(key)
+
+def render_prompt(question: str, ctx: str, history: str = ""):
+    with STAGE_SECONDS.time("prompt"):
+        from langchain_core.messages import SystemMessage
+        return get_prompt().invoke({"context": ctx, "question": question,
+                              "history": [SystemMessage(content=history)] if history else []})
+
+def record_usage(message, info: Optional[dict] = None) -> None:
+    usage = usage_of(message)
+    if usage:
+        LLM_TOKENS.inc("prompt", n=usage[0])
+        LLM_TOKENS.inc("completion", n=usage[1])
+        if info is not None:
+            info["usage"] = usage
+
+# --- Single-flight : les questions identiques en vol partagent un seul appel LLM ---
+FLIGHTS = SingleFlight(timeout=float(os.getenv("SINGLEFLIGHT_TIMEOUT", "60")))
+METRICS.gauges("chatbot_singleflight", "Coalescence des questions en vol", lambda: FLIGHTS.stats())
+
+def complete(question: str, ctx: str, key: str, history: str = "", info: Optional[dict] = None) -> str:
+    get_llm()  # import / construction dans le thread de la requête, pas sur la boucle LLM
+    messages = render_prompt(question, ctx, history)
+    est = estimate_tokens(messages)
+    with STAGE_SECONDS.time("llm"):
+        resp = RUNTIME.run(lambda: TRAFFIC.call(lambda: invoke_llm(messages, est), est))
+    if info is not None:
+        info["source"] = "llm"   # cette requête a fait l'appel (les doublons en vol restent "shared")
+    record_usage(resp, info)
+    ans = getattr(resp, "content", str(resp))
+    ANSWER_CACHE.put(key, ans)
+    return ans
+
+# --- Mémoire de conversation : par session (cookie ou "session_id"), bornée et résumée ---
+# CONVERSATION_MEMORY=0 pour revenir à des questions indépendantes
+CONVERSATION_MEMORY = os.getenv("CONVERSATION_MEMORY", "1") == "1"
+SESSION_COOKIE = "landon_sid"
+MEMORY = ConversationStore(
+    lambda text: count_tokens(text, MODEL_NAME),
+    ttl=float(os.getenv("SESSION_TTL", "1800")),
+    max_sessions=int(os.getenv("SESSION_MAX", "10000")),
+    max_chars=int(os.getenv("SESSION_MAX_CHARS", "20000000")),
+    history_budget=int(os.getenv("SESSION_HISTORY_TOKENS", "600")),
+    summary_budget=int(os.getenv("SESSION_SUMMARY_TOKENS", "250")),
+)
+# relance (« et pour le logo ? », « et en anglais ? ») : au plus FOLLOWUP_MAX_WORDS mots, ouverte par
+# un connecteur ou un pronom de reprise (thème ou non), ou sans sujet propre (ni thème ni mot du corpus) ;
+# la recherche du contexte se fait alors avec la question précédente
+FOLLOWUP_MAX_WORDS = int(os.getenv("FOLLOWUP_MAX_WORDS", "6"))
+# débuts de relance, sous forme normalisée (normalize_question : « Ça » → « ca », « celle-ci » → « celle ci »)
+FOLLOWUP_LEADS = (
+    "et", "mais", "aussi", "sinon", "alors", "ca", "cela", "celui ci", "celle ci", "ceux ci",
+    "celles ci", "le meme", "la meme", "les memes", "pareil", "idem",
+    "and", "but", "also", "what about", "how about", "same", "it", "that", "this one", "those",
+)
+METRICS.gauges("chatbot_sessions", "Mémoire de conversation", lambda: MEMORY.stats())
+
+def session_id(data: dict) -> Optional[str]:
+    """Id fourni (corps JSON, en-tête X-Session-Id ou cookie), sinon un nouveau ; None si mémoire coupée."""
+    if not CONVERSATION_MEMORY:
+        return None
+    sid = str(data.get("session_id") or request.headers.get("X-Session-Id")
+              or request.cookies.get(SESSION_COOKIE) or "").strip()[:64]
+    return sid or MEMORY.new_id()
+
+def is_followup(question: str) -> bool:
+    """Question courte qui reprend la précédente : ouverte par un connecteur ou un pronom de reprise
+    (« Et pour le logo ? », même avec un thème), ou sans sujet propre (ni thème, ni mot du corpus).
+    Le nombre de mots est compté avant le retrait des mots vides (« Quelles sont vos couleurs ? » = 4)."""
+    words = normalize_question(question).split()
+    if not words or len(words) > FOLLOWUP_MAX_WORDS:
+        return False
+    if any(words[:len(lead.split())] == lead.split() for lead in FOLLOWUP_LEADS):
+        return True
+    if route_themes(question):
+        return False
+    vocab = CORPUS.current.bm25.vocab
+    return not any(t in vocab for t in tokenize(question))
+
+def conversation(sid: Optional[str], question: str) -> Tuple[str, Optional[str]]:
+    """(historique pour le prompt, requête de recherche) ; ("", None) sauf pour une relance.
+    Une question autonome part sans historique : même prompt, donc même clé de cache, que
+    pour un 1er message (cache, single-flight et pré-calcul restent efficaces)."""
+    if sid is None:
+        return "", None
+    history, last = MEMORY.history(sid)
+    if last and is_followup(question):
+        return history, f"{last} {question}"
+    return "", None
+
+def remember(sid: Optional[str], question: str, answer: str) -> None:
+    if sid is not None and answer:
+        MEMORY.record(sid, question, answer)
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-chain = prompt | llm
+# --- Routeur d'intentions : politesses et hors-sujet traités localement (INTENT_ROUTER=0 pour couper) ---
+INTENT_ROUTER = os.getenv("INTENT_ROUTER", "1") == "1"
 
-def answer_question(question: str) -> str:
-    ctx = select_context(question, FULL_DOC)
-    resp = chain.invoke({"context": ctx, "question": question})
-    return getattr(resp, "content", str(resp))
+def route_intent(question: str, info: Optional[dict] = None) -> Optional[str]:
+    """Réponse toute prête (gabarit) si le message n'a pas besoin du LLM, sinon None."""
+    if not INTENT_ROUTER:
+        return None
+    with STAGE_SECONDS.time("intent"):
+        intent = CORPUS.current.intents.classify(question)
+    if intent is None:
+        return None
+    INTENTS.inc(intent.name)
+    if info is not None:
+        info.update(intent=intent.name, context_tokens=0)
+    return intent.reply
+
+def answer_question(question: str, info: Optional[dict] = None, docs: Optional[List[str]] = None,
+                    sid: Optional[str] = None) -> str:
+    routed = route_intent(question, info)
+    if routed is not None:
+        return routed
+    history, query = conversation(sid, question)
+    ctx, key = prepare(question, info, docs, history, query)
+    cached = cache_get(key)
+    if info is not None:
+        info["source"] = "cache" if cached is not None else "shared"
+    ans = cached if cached is not None else FLIGHTS.do(key, lambda: complete(question, ctx, key, history, info))
+    remember(sid, question, ans)
+    return ans
+
+def stream_answer(question: str, info: Optional[dict] = None, docs: Optional[List[str]] = None,
+                  sid: Optional[str] = None):
+    """Fragments de réponse ; les doublons concurrents suivent le même flux amont."""
+    routed = route_intent(question, info)
+    if routed is not None:
+        yield routed
+        return
+    history, query = conversation(sid, question)
+    ctx, key = prepare(question, info, docs, history, query)
+    cached = cache_get(key)
+    if info is not None:
+        info["source"] = "cache" if cached is not None else "shared"
+    if cached is not None:
+        remember(sid, question, cached)
+        yield cached
+        return
+    parts = []
+    for piece in FLIGHTS.stream(key, lambda: generate_answer(question, ctx, key, history, info)):
+        parts.append(piece)
+        yield piece
+    # flux allé au bout : l'échange entre dans la mémoire de la session
+    remember(sid, question, "".join(parts))
+
+def generate_answer(question: str, ctx: str, key: str, history: str = "", info: Optional[dict] = None):
+    """Générateur de fragments (llm.astream) ; la réponse complète est mise en cache."""
+    get_llm()
+    messages = render_prompt(question, ctx, history)
+    est = estimate_tokens(messages)
+    if info is not None:
+        info["source"] = "llm"
+    parts, t0 = [], time.perf_counter()
+    for chunk in RUNTIME.iterate(lambda: TRAFFIC.stream(lambda: stream_llm(messages, est), est)):
+        record_usage(chunk, info)  # le dernier fragment porte l'usage (stream_usage=True)
+        piece = getattr(chunk, "content", "") or ""
+        if piece:
+            if not parts:
+                STAGE_SECONDS.observe(time.perf_counter() - t0, "llm_first_token")
+            parts.append(piece)
+            yield piece
+    STAGE_SECONDS.observe(time.perf_counter() - t0, "llm")
+    # seulement si le flux est allé au bout (pas d'annulation côté client)
+    ANSWER_CACHE.put(key, "".join(parts))
+
+# --- Lots de questions : contexte en une passe, appels LLM en parallèle (bornés) ---
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_RETRIES = int(os.getenv("BATCH_RETRIES", "2"))
+
+def answer_one(question: str, ctx: str, key: str) -> str:
+    """Réponse d'un élément de lot ; en cas de saturation, on patiente puis on réessaie."""
+    for attempt in range(BATCH_RETRIES + 1):
+        try:
+            return FLIGHTS.do(key, lambda: complete(question, ctx, key))
+        except (Saturated, RateLimited) as e:
+            if attempt == BATCH_RETRIES:
+                raise
+            time.sleep(e.retry_after)
+
+def answer_batch(questions: List[str], docs: Optional[List[str]] = None, ordered: bool = True):
+    """Résultats (dict par question, avec `index`) dans l'ordre d'entrée ou au fil de l'eau."""
+    # questions identiques (après normalisation) : un seul calcul, réponse recopiée
+    groups: Dict[str, List[int]] = {}
+    for i, q in enumerate(questions):
+        groups.setdefault(normalize_question(q), []).append(i)
+    uniq = [questions[idx[0]] for idx in groups.values()]
+
+    # politesses / hors-sujet : réponses locales, pas de contexte à construire
+    ready, tokens = {}, {}
+    for u, question in enumerate(uniq):
+        info = {}
+        reply = route_intent(question, info)
+        if reply is not None:
+            ready[u] = {"ok": True, "response": reply, "cached": False, "intent": info["intent"]}
+            tokens[u] = 0
+    todo = [u for u in range(len(uniq)) if u not in ready]
+    with STAGE_SECONDS.time("select_context_batch"):
+        built = build_contexts([uniq[u] for u in todo], docs=docs) if todo else []
+
+    pending = {}
+    pool = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix="batch")
+    try:
+        for u, b in zip(todo, built):
+            question = uniq[u]
+            tokens[u] = b.tokens
+            CONTEXT_TOKENS.observe(b.tokens)
+            key = AnswerCache.make_key(question, b.text, MODEL_NAME, system_rules)
+            cached = cache_get(key)
+            if cached is not None:
+                ready[u] = {"ok": True, "response": cached, "cached": True}
+            else:
+                pending[pool.submit(answer_one, question, b.text, key)] = u
+
+        def results_of(u: int):
+            item = {"context_tokens": tokens[u], **ready.pop(u)}
+            for i in groups[normalize_question(uniq[u])]:
+                yield {"index": i, "question": questions[i], **item}
+
+        def collect(done) -> None:
+            for fut in done:
+                u = pending.pop(fut)
+                try:
+                    ready[u] = {"ok": True, "response": fut.result(), "cached": False}
+                except Saturated:
+                    ready[u] = {"ok": False, "error": "Saturé, réessayez plus tard."}
+                except RateLimited:
+                    ready[u] = {"ok": False, "error": "Quota OpenAI atteint, réessayez plus tard."}
+                except (FlightTimeout, DeadlineExceeded):
+                    ready[u] = {"ok": False, "error": "Délai dépassé."}
+                except LLMNotConfigured:
+                    ready[u] = {"ok": False, "error": "OPENAI_API_KEY manquante."}
+                except Exception:
+                    ERRORS.inc("batch")
+                    traceback.print_exc()
+                    ready[u] = {"ok": False, "error": "Erreur interne."}
+
+        if not ordered:
+            for u in list(ready):
+                yield from results_of(u)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+                for u in list(ready):
+                    yield from results_of(u)
+            return
+
+        # ordre d'entrée : on émet dès que le prochain index attendu est prêt
+        order = sorted(range(len(uniq)), key=lambda u: groups[normalize_question(uniq[u])][0])
+        emitted = {}
+        nxt = 0
+        for u in order:
+            while u not in ready:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            for item in results_of(u):
+                emitted[item["index"]] = item
+            while nxt in emitted:
+                yield emitted.pop(nxt)
+                nxt += 1
+    finally:
+        # client parti : les questions pas encore lancées sont abandonnées
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# --- Journal des questions (SQLite, écrit par lots en tâche de fond) + pré-calcul des plus fréquentes ---
+# QUERY_LOG=0 pour couper ; PREWARM_TOP=0 pour ne rien pré-calculer
+QUERY_LOG_ON = os.getenv("QUERY_LOG", "1") == "1"
+QUERY_LOG = QueryLog(
+    os.getenv("QUERY_LOG_URL") or f"sqlite:///{Path(__file__).resolve().parent / 'query_log.sqlite3'}",
+    batch_size=int(os.getenv("QUERY_LOG_BATCH", "200")),
+    flush_interval=float(os.getenv("QUERY_LOG_FLUSH", "1")),
+)
+# champs de `info` gardés pour le journal, pas renvoyés au client
+LOG_ONLY = ("sections", "source", "usage")
+
+def public(info: dict) -> dict:
+    return {k: v for k, v in info.items() if k not in LOG_ONLY}
+
+def matched_sections(spans) -> List[str]:
+    """Intervalles du contexte → toutes les sections qu'ils recouvrent ("doc:01,doc:1.1"), sans doublons."""
+    r = CORPUS.current
+    out = []
+    for doc, start, end in spans:
+        index = r.sections.get(doc)
+        secs = index.overlapping(start, end) if index else []
+        for label in [f"{doc}:{sec.id}" for sec in secs] or [doc]:
+            if label not in out:
+                out.append(label)
+    return out
+
+def log_query(question: str, docs: Optional[List[str]], info: dict, status: int, latency: float) -> None:
+    """Une ligne par question /chatbot (ou /chatbot/stream) ; ne fait qu'empiler : pas d'E/S ici."""
+    if not QUERY_LOG_ON:
+        return
+    prompt_tokens, completion_tokens = info.get("usage") or (None, None)
+    QUERY_LOG.log(question=question, docs=",".join(docs) if docs else None,
+                  sections=",".join(info.get("sections", ())) or None,
+                  source="error" if status >= 400 else "intent" if "intent" in info else info.get("source"),
+                  status=status, latency_ms=round(latency * 1000, 1),
+                  context_tokens=info.get("context_tokens"), history_tokens=info.get("history_tokens", 0),
+                  prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, trace_id=info.get("trace_id"))
+
+def prewarm_one(question: str) -> bool:
+    """Réponse mise en cache telle qu'un 1er message de session la chercherait ; False si déjà là."""
+    built = build_context(question)
+    key = AnswerCache.make_key(question, built.text, MODEL_NAME, system_rules)
+    if ANSWER_CACHE.has(key):
+        return False
+    answer_one(question, built.text, key)
+    return True
+
+PREWARM = Prewarmer(QUERY_LOG, prewarm_one, top=int(os.getenv("PREWARM_TOP", "50")),
+                    window=float(os.getenv("PREWARM_WINDOW_DAYS", "7")) * 86400)
+CORPUS.listeners.append(lambda: PREWARM.trigger("corpus"))
+METRICS.gauges("chatbot_query_log", "Journal des questions", lambda: QUERY_LOG.stats())
+METRICS.gauges("chatbot_prewarm", "Pré-calcul des questions fréquentes", lambda: PREWARM.stats())
+
+# --- Mode shadow : stratégies de contexte candidates rejouées hors du chemin de la requête ---
+# SHADOW_RETRIEVERS=sections,window_15k (ou "all") ; comparaison : python query_log.py --retrievers
+SHADOW_NAMES = [n.strip() for n in os.getenv("SHADOW_RETRIEVERS", "").split(",") if n.strip()]
+if SHADOW_NAMES == ["all"]:
+    SHADOW_NAMES = list(RETRIEVERS)
+SHADOW_SECONDS = METRICS.histogram("chatbot_shadow_seconds", "Sélection du contexte par stratégie (shadow)",
+                                   ["strategy"])
+SHADOW_TOKENS = METRICS.histogram("chatbot_shadow_context_tokens", "Tokens de contexte par stratégie (shadow)",
+                                  ["strategy"], buckets=TOKEN_BUCKETS)
+SHADOW_OVERLAP = METRICS.histogram("chatbot_shadow_overlap", "Recouvrement (Jaccard) avec le contexte servi",
+                                   ["strategy"], buckets=[0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0])
+
+def record_shadow(row: dict) -> None:
+    SHADOW_SECONDS.observe(row["latency_ms"] / 1000, row["strategy"])
+    SHADOW_TOKENS.observe(row["context_tokens"], row["strategy"])
+    SHADOW_OVERLAP.observe(row["overlap"], row["strategy"])
+    if QUERY_LOG_ON:
+        QUERY_LOG.log_shadow(**row)
+
+SHADOW = ShadowEvaluator(
+    {n: RETRIEVERS[n] for n in SHADOW_NAMES if n in RETRIEVERS and n != PRIMARY.name},
+    record_shadow,
+    budget=CONTEXT_TOKEN_BUDGET,
+    model=MODEL_NAME,
+    sample=float(os.getenv("SHADOW_SAMPLE", "1")),
+    max_pending=int(os.getenv("SHADOW_MAX_PENDING", "64")),
+)
+if SHADOW.enabled:
+    print(f"🔬 Mode shadow : {PRIMARY.name} sert, {', '.join(SHADOW.candidates)} mesurés "
+          f"({SHADOW.sample:.0%} des questions)")
+METRICS.gauges("chatbot_shadow", "Mode shadow (questions rejouées)", lambda: SHADOW.stats())
+
+def read_question(data: dict) -> Optional[str]:
+    """Question du corps JSON ; None si absente, vide ou pas une chaîne."""
+    question = data.get("question")
+    return (question.strip() or None) if isinstance(question, str) else None
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def busy(e: Saturated):
+    ERRORS.inc("saturated")
+    return (jsonify({"ok": False, "error": "Beaucoup de demandes en cours, réessayez dans quelques secondes.",
+                     "trace_id": g.trace_id}),
+            503, {"Retry-After": str(e.retry_after)})
+
+def rate_limited(e: RateLimited):
+    ERRORS.inc("rate_limited")
+    return (jsonify({"ok": False, "error": "Trop de demandes vers OpenAI, réessayez dans quelques secondes.",
+                     "trace_id": g.trace_id}),
+            429, {"Retry-After": str(e.retry_after)})
+
+def timeout_error():
+    ERRORS.inc("timeout")
+    return jsonify({"ok": False, "error": "Délai dépassé, réessayez.", "trace_id": g.trace_id}), 504
+
+def not_configured():
+    ERRORS.inc("not_configured")
+    return jsonify({"ok": False, "error": "Service LLM non configuré (OPENAI_API_KEY).", "trace_id": g.trace_id}), 503
+
+def internal_error():
+    ERRORS.inc("internal")
+    print(f"❌ trace_id={g.trace_id}")
+    traceback.print_exc()
+    return jsonify({"ok": False, "error": "Erreur interne.", "trace_id": g.trace_id}), 500
+
+# --- Mode multi-processus (serve.py) : appelé dans chaque worker juste après le fork ---
+WORKER_ID = 0
+
+def post_fork(worker: int, workers: int) -> None:
+    """Recrée ce que fork n'hérite pas (thread de la boucle LLM, connexions SQL) ; le corpus et les
+    index chargés par le maître restent partagés en copy-on-write."""
+    global WORKER_ID
+    WORKER_ID = worker
+    RUNTIME.after_fork()
+    ANSWER_CACHE.after_fork()
+    QUERY_LOG.after_fork()
+    SHADOW.after_fork()
+    TRAFFIC.share(1 / workers)  # la clé API (RPM/TPM) est commune à tous les workers
+    if worker == 0:
+        PREWARM.trigger("démarrage")  # un seul worker : le cache SQLite est commun
 
 app = Flask(__name__)
 
+# --- Trace par requête (X-Trace-Id fourni par le client, sinon généré) + métriques HTTP ---
+@app.before_request
+def start_trace():
+    g.t0 = time.perf_counter()
+    g.trace_id = (request.headers.get("X-Trace-Id") or "").strip()[:64] or uuid.uuid4().hex[:16]
+
+@app.after_request
+def end_trace(resp):
+    endpoint = request.endpoint or "unknown"
+    REQUEST_SECONDS.observe(time.perf_counter() - g.t0, endpoint)
+    REQUESTS.inc(endpoint, str(resp.status_code))
+    resp.headers["X-Trace-Id"] = g.trace_id
+    query = g.pop("query", None)
+    if query is not None:
+        log_query(*query, status=resp.status_code, latency=time.perf_counter() - g.t0)
+    sid = g.get("session_id")
+    if sid and request.cookies.get(SESSION_COOKIE) != sid:
+        resp.set_cookie(SESSION_COOKIE, sid, max_age=int(MEMORY.ttl), httponly=True, samesite="Lax")
+    return resp
+
 @app.get("/")
 def index():
     return render_template("index.html")
 
 @app.get("/health")
 def health():
-    return jsonify({"status": "ok"})
+    return jsonify({"status": "ok", "cache": ANSWER_CACHE.stats(), "llm": RUNTIME.stats(),
+                    "traffic": TRAFFIC.stats(), "singleflight": FLIGHTS.stats(), "corpus": CORPUS.stats(),
+                    "sessions": MEMORY.stats(), "query_log": QUERY_LOG.stats(), "prewarm": PREWARM.stats(),
+                    "retriever": {"primary": PRIMARY.name, "shadow": SHADOW.stats()},
+                    "worker": {"id": WORKER_ID, "pid": os.getpid()},
+                    "startup": STARTUP})
+
+@app.get("/metrics")
+def metrics():
+    return Response(METRICS.render(), content_type=CONTENT_TYPE)
+
+@app.get("/corpus")
+def corpus():
+    r = CORPUS.current
+    return jsonify({"ok": True, "version": CORPUS.version,
+                    "docs": [{"id": d, "chars": len(t), "sections": len(r.sections[d].order)}
+                             for d, t in sorted(r.docs.items())]})
 
 @app.post("/chatbot")
 def chatbot():
     try:
         data = request.get_json(force=True, silent=True) or {}
-        question = (data.get("question") or "").strip()
+        question = read_question(data)
         if not question:
-            return jsonify({"ok": False, "error": "Question vide."}), 400
-        ans = answer_question(question)
-        return jsonify({"ok": True, "response": ans})
+            return jsonify({"ok": False, "error": "Question vide ou invalide."}), 400
+        docs, error = request_scope(data)
+        if error:
+            return jsonify({"ok": False, "error": error}), 400
+        g.session_id = session_id(data)
+        info = {"trace_id": g.trace_id}
+        if g.session_id:
+            info["session_id"] = g.session_id
+        g.query = (question, docs, info)  # journalisé par end_trace, avec le statut et la durée
+        ans = answer_question(question, info, docs, g.session_id)
+        with STAGE_SECONDS.time("serialize"):
+            return jsonify({"ok": True, "response": ans, **public(info)})
+    except Saturated as e:
+        return busy(e)
+    except RateLimited as e:
+        return rate_limited(e)
+    except (FlightTimeout, DeadlineExceeded):
+        return timeout_error()
+    except LLMNotConfigured:
+        return not_configured()
     except Exception:
-        traceback.print_exc()
-        return jsonify({"ok": False, "error": "Erreur interne."}), 500
+        return internal_error()
+
+@app.post("/chatbot/reset")
+def chatbot_reset():
+    """Oublie la conversation de la session (bouton « nouvelle conversation »)."""
+    data = request.get_json(force=True, silent=True) or {}
+    sid = str(data.get("session_id") or request.headers.get("X-Session-Id")
+              or request.cookies.get(SESSION_COOKIE) or "").strip()[:64]
+    if sid:
+        MEMORY.reset(sid)
+    return jsonify({"ok": True})
+
+@app.post("/chatbot/batch")
+def chatbot_batch():
+    """N questions → une ligne JSON par réponse (application/x-ndjson), puis un résumé."""
+    data = request.get_json(force=True, silent=True) or {}
+    questions = data.get("questions")
+    if not isinstance(questions, list) or not questions:
+        return jsonify({"ok": False, "error": "\"questions\" doit être une liste non vide."}), 400
+    if len(questions) > BATCH_MAX_QUESTIONS:
+        return jsonify({"ok": False, "error": f"Au plus {BATCH_MAX_QUESTIONS} questions par lot."}), 400
+    bad = [i for i, q in enumerate(questions) if not isinstance(q, str) or not q.strip()]
+    if bad:
+        return jsonify({"ok": False, "error": "Question vide ou invalide dans le lot (chaîne attendue).",
+                        "indexes": bad[:20]}), 400
+    questions = [q.strip() for q in questions]
+    docs, error = request_scope(data)
+    if error:
+        return jsonify({"ok": False, "error": error}), 400
+    ordered = data.get("order", "input") != "completed"
+    trace_id = g.trace_id
+
+    def generate():
+        t0, errors = time.perf_counter(), 0
+        results = answer_batch(questions, docs, ordered)
+        try:
+            for item in results:
+                errors += not item["ok"]
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True, "count": len(questions),
+                              "unique": len(set(map(normalize_question, questions))), "errors": errors,
+                              "elapsed_ms": round((time.perf_counter() - t0) * 1000), "trace_id": trace_id}) + "\n"
+        except Exception:
+            ERRORS.inc("batch")
+            print(f"❌ trace_id={trace_id}")
+            traceback.print_exc()
+            yield json.dumps({"done": False, "ok": False, "error": "Erreur interne.", "trace_id": trace_id}) + "\n"
+        finally:
+            results.close()
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/chatbot/stream")
+def chatbot_stream():
+    data = request.get_json(force=True, silent=True) or {}
+    question = read_question(data)
+    if not question:
+        return jsonify({"ok": False, "error": "Question vide ou invalide."}), 400
+    docs, error = request_scope(data)
+    if error:
+        return jsonify({"ok": False, "error": error}), 400
+
+    g.session_id = session_id(data)
+    info = {"trace_id": g.trace_id}
+    if g.session_id:
+        info["session_id"] = g.session_id
+    g.query = (question, docs, info)
+    pieces = stream_answer(question, info, docs, g.session_id)
+    try:
+        # 1er fragment lu ici : une saturation devient un vrai 503 (avant l'envoi des en-têtes)
+        first = next(pieces, None)
+    except Saturated as e:
+        return busy(e)
+    except RateLimited as e:
+        return rate_limited(e)
+    except (FlightTimeout, DeadlineExceeded):
+        return timeout_error()
+    except LLMNotConfigured:
+        return not_configured()
+    except Exception:
+        return internal_error()
+
+    # réponse lancée : journalisée à la fin du flux (durée complète), plus par end_trace
+    g.pop("query")
+    t0 = g.t0
+    status = 499  # client parti avant la fin du flux
+
+    def generate():
+        nonlocal status
+        try:
+            if first is not None:
+                yield sse("token", {"delta": first})
+            for piece in pieces:
+                yield sse("token", {"delta": piece})
+            status = 200
+            yield sse("done", {"ok": True, **public(info)})
+        except Exception:
+            status = 500
+            ERRORS.inc("stream")
+            print(f"❌ trace_id={info['trace_id']}")
+            traceback.print_exc()
+            yield sse("error", {"ok": False, "error": "Erreur interne.", "trace_id": info["trace_id"]})
+        finally:
+            pieces.close()
+            log_query(question, docs, info, status, time.perf_counter() - t0)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+STARTUP["ready_ms"] = round((time.perf_counter() - T_START) * 1000, 1)
+print(f"⏱️  Démarrage : imports {STARTUP['imports_ms']} ms, corpus {STARTUP['corpus_ms']} ms "
+      f"(instantané : {STARTUP['snapshot']}), prêt en {STARTUP['ready_ms']} ms")
+# imports lourds (langchain, openai, SQLAlchemy) chargés en tâche de fond après le démarrage ;
+# WARMUP=0 : au premier usage (serve.py les charge lui-même, avant ou après le fork)
+if os.getenv("WARMUP", "1") == "1":
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    PREWARM.trigger("démarrage")
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    app.run(debug=True, threaded=True)
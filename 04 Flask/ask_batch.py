@@ -0,0 +1,84 @@
+# ask_batch.py
+# Client en ligne de commande de POST /chatbot/batch : questions depuis un fichier JSON
+# (liste) ou JSONL (une question par ligne), réponses écrites en JSONL au fil de l'eau.
+#
+# Usage (le serveur Flask doit tourner) :
+#   python ask_batch.py questions.jsonl -o reponses.jsonl
+#   python ask_batch.py questions.json --order completed --doc landon-hk
+# Chaque ligne d'entrée est une chaîne ou un objet {"question": ..., ...} ; les autres champs
+# (id, réponse attendue…) sont recopiés dans la sortie.
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+
+def load_questions(path: Path) -> List[Dict]:
+    raw = path.read_text(encoding="utf-8")
+    if raw.lstrip().startswith("["):
+        items = json.loads(raw)
+    else:
+        items = [json.loads(ln) for ln in raw.splitlines() if ln.strip()]
+    return [it if isinstance(it, dict) else {"question": str(it)} for it in items]
+
+
+def run(url: str, records: List[Dict], out, batch_size: int, order: str, doc, timeout: float) -> int:
+    errors = 0
+    t0 = time.perf_counter()
+    with httpx.Client(timeout=timeout) as client:
+        for offset in range(0, len(records), batch_size):
+            part = records[offset:offset + batch_size]
+            body = {"questions": [r["question"] for r in part], "order": order}
+            if doc:
+                body["doc"] = doc
+            with client.stream("POST", url.rstrip("/") + "/chatbot/batch", json=body) as resp:
+                if resp.status_code != 200:
+                    resp.read()
+                    raise SystemExit(f"❌ HTTP {resp.status_code} : {resp.text}")
+                for line in resp.iter_lines():
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    if "index" not in item:
+                        if not item.get("done"):
+                            raise SystemExit(f"❌ Lot interrompu : {item.get('error')}")
+                        continue
+                    rec = {**part[item["index"]], **{k: v for k, v in item.items() if k != "index"}}
+                    errors += not item["ok"]
+                    out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    out.flush()
+            done = offset + len(part)
+            print(f"… {done}/{len(records)} ({time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+    return errors
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Pose un lot de questions au chatbot (POST /chatbot/batch).")
+    ap.add_argument("input", type=Path, help="fichier .json (liste) ou .jsonl")
+    ap.add_argument("-o", "--out", type=Path, help="fichier JSONL de sortie (défaut : stdout)")
+    ap.add_argument("--url", default="http://127.0.0.1:5000")
+    ap.add_argument("--order", choices=["input", "completed"], default="input")
+    ap.add_argument("--doc", action="append", help="limiter à un document (répétable)")
+    ap.add_argument("--batch-size", type=int, default=500, help="questions par requête HTTP")
+    ap.add_argument("--timeout", type=float, default=600)
+    args = ap.parse_args()
+
+    records = load_questions(args.input)
+    if not records:
+        raise SystemExit("❌ Aucune question.")
+    out = args.out.open("w", encoding="utf-8") if args.out else sys.stdout
+    t0 = time.perf_counter()
+    try:
+        errors = run(args.url, records, out, max(1, args.batch_size), args.order, args.doc, args.timeout)
+    finally:
+        if args.out:
+            out.close()
+    print(f"✅ {len(records)} questions en {time.perf_counter() - t0:.1f}s — {errors} erreur(s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
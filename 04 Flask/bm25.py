@@ -0,0 +1,170 @@
+# bm25.py
+# Index inversé BM25 (100% local) : découpage en chunks + scoring vectorisé NumPy.
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sections import is_toc_block
+from textnorm import tokenize
+
+
+@dataclass
+class Chunk:
+    id: int
+    doc: str          # identifiant du document source
+    start: int        # offsets dans le texte du document
+    end: int
+    title: str        # première ligne de la page (titre de section en pratique)
+    text: str
+
+
+def chunk_text(text: str, doc: str = "", max_chars: int = 1200) -> List[Chunk]:
+    """Découpe par page logique (ligne vide), puis par lignes jusqu'à max_chars."""
+    chunks: List[Chunk] = []
+    pos = 0
+    for page in text.split("\n\n"):
+        page_start = pos
+        pos += len(page) + 2
+        if is_toc_block(page):
+            continue  # sommaire : jamais un bon passage de contexte
+        lines = page.splitlines(keepends=True)
+        title = next((ln.strip() for ln in lines if ln.strip()), "")
+        buf_start = page_start
+        buf_len = 0
+        cursor = page_start
+        for ln in lines:
+            if buf_len and buf_len + len(ln) > max_chars:
+                body = text[buf_start:cursor]
+                if body.strip():
+                    chunks.append(Chunk(len(chunks), doc, buf_start, cursor, title, body.strip()))
+                buf_start, buf_len = cursor, 0
+            buf_len += len(ln)
+            cursor += len(ln)
+        body = text[buf_start:cursor]
+        if body.strip():
+            chunks.append(Chunk(len(chunks), doc, buf_start, cursor, title, body.strip()))
+    return chunks
+
+
+class BM25Index:
+    """Postings stockés en CSR (term → [chunks], [poids BM25 précalculés])."""
+
+    def __init__(self, chunks: Iterable[Chunk], k1: float = 1.5, b: float = 0.75):
+        self.chunks: List[Chunk] = list(chunks)
+        self.k1, self.b = k1, b
+        n = len(self.chunks)
+
+        vocab = {}
+        term_ids, doc_ids, tfs = [], [], []
+        lengths = np.zeros(n, dtype=np.float32)
+        for i, ch in enumerate(self.chunks):
+            # le titre de la page est ré-indexé dans chaque chunk : il porte le sujet
+            body = ch.text if ch.text.startswith(ch.title) else ch.title + "\n" + ch.text
+            counts = Counter(tokenize(body))
+            lengths[i] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(i)
+                tfs.append(tf)
+        self.vocab = vocab
+        self.doc_names = sorted({ch.doc for ch in self.chunks})
+        doc_pos = {name: i for i, name in enumerate(self.doc_names)}
+        self.chunk_docs = np.asarray([doc_pos[ch.doc] for ch in self.chunks], dtype=np.int32)
+
+        t = np.asarray(term_ids, dtype=np.int32)
+        d = np.asarray(doc_ids, dtype=np.int32)
+        tf = np.asarray(tfs, dtype=np.float32)
+        order = np.argsort(t, kind="stable")
+        t, d, tf = t[order], d[order], tf[order]
+
+        df = np.bincount(t, minlength=len(vocab)).astype(np.float32)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        avgdl = float(lengths.mean()) if n else 1.0
+        norm = k1 * (1.0 - b + b * lengths[d] / max(avgdl, 1e-9))
+
+        self.post_docs = d
+        self.post_weights = (idf[t] * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32)
+        self.offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df.astype(np.int64), out=self.offsets[1:])
+
+    @classmethod
+    def from_text(cls, text: str, doc: str = "", max_chars: int = 1200, **kw) -> "BM25Index":
+        return cls(chunk_text(text, doc=doc, max_chars=max_chars), **kw)
+
+    @classmethod
+    def from_docs(cls, docs: Dict[str, str], max_chars: int = 1200, **kw) -> "BM25Index":
+        """Un seul index pour tout le corpus (doc_id → texte)."""
+        chunks: List[Chunk] = []
+        for doc_id, text in docs.items():
+            for ch in chunk_text(text, doc=doc_id, max_chars=max_chars):
+                ch.id = len(chunks)
+                chunks.append(ch)
+        return cls(chunks, **kw)
+
+    def scores(self, query: str, docs: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Score BM25 de chaque chunk pour la requête (vecteur de taille N), filtrable par document."""
+        ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not ids:
+            return np.zeros(len(self.chunks), dtype=np.float32)
+        post = np.concatenate([self.post_docs[self.offsets[i]:self.offsets[i + 1]] for i in ids])
+        weights = np.concatenate([self.post_weights[self.offsets[i]:self.offsets[i + 1]] for i in ids])
+        s = np.bincount(post, weights=weights, minlength=len(self.chunks)).astype(np.float32)
+        if docs is not None:
+            wanted = set(docs)
+            keep = [i for i, name in enumerate(self.doc_names) if name in wanted]
+            s[~np.isin(self.chunk_docs, keep)] = 0.0
+        return s
+
+    def scores_batch(self, queries: Sequence[str], docs: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Matrice (Q × N) des scores : toutes les postings des requêtes en un seul bincount."""
+        n = len(self.chunks)
+        rows, ids = [], []
+        for qi, query in enumerate(queries):
+            for t in sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab}):
+                rows.append(qi)
+                ids.append(t)
+        if not ids:
+            return np.zeros((len(queries), n), dtype=np.float32)
+        ids_a = np.asarray(ids, dtype=np.int64)
+        starts = self.offsets[ids_a]
+        lens = self.offsets[ids_a + 1] - starts
+        # positions de toutes les postings concernées, sans boucle Python
+        pos = np.repeat(starts - np.cumsum(lens) + lens, lens) + np.arange(int(lens.sum()))
+        cells = np.repeat(np.asarray(rows, dtype=np.int64), lens) * n + self.post_docs[pos]
+        s = np.bincount(cells, weights=self.post_weights[pos], minlength=len(queries) * n)
+        s = s.reshape(len(queries), n).astype(np.float32)
+        if docs is not None:
+            wanted = set(docs)
+            keep = [i for i, name in enumerate(self.doc_names) if name in wanted]
+            s[:, ~np.isin(self.chunk_docs, keep)] = 0.0
+        return s
+
+    def _top_k(self, s: np.ndarray, k: int) -> List[Tuple[Chunk, float]]:
+        k = min(k, int((s > 0).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-s, k - 1)[:k]
+        top = top[np.argsort(-s[top], kind="stable")]
+        return [(self.chunks[i], float(s[i])) for i in top]
+
+    def search(self, query: str, k: int = 5, docs: Optional[Iterable[str]] = None) -> List[Tuple[Chunk, float]]:
+        return self._top_k(self.scores(query, docs), k)
+
+    def search_batch(self, queries: Sequence[str], k: int = 5,
+                     docs: Optional[Iterable[str]] = None) -> List[List[Tuple[Chunk, float]]]:
+        scores = self.scores_batch(queries, docs)
+        return [self._top_k(scores[j], k) for j in range(len(queries))]
+
+    def select(self, query: str, k: int = 8, max_chars: int = 6000,
+               hits: Optional[List[Tuple[Chunk, float]]] = None) -> List[Chunk]:
+        """Top-k chunks qui tiennent dans le budget, remis dans l'ordre du document."""
+        picked: List[Chunk] = []
+        total = 0
+        for ch, _ in (hits if hits is not None else self.search(query, k=k)):
+            if total + len(ch.text) > max_chars:
+                continue
+            picked.append(ch)
+            total += len(ch.text)
+        return sorted(picked, key=lambda c: (c.doc, c.start))
@@ -0,0 +1,182 @@
+# boilerplate.py
+# Nettoyage du texte extrait du PDF avant indexation (étape du pipeline « 01 Collecte ») :
+#  - en-têtes / pieds de page répétés d'une page à l'autre (« B R A N D  G U I D E L I N E S », n° de page),
+#  - texte espacé lettre par lettre recollé (« L O G O  S Y S T E M » → « LOGO SYSTEM »),
+#  - césures et retours à la ligne de mise en page recollés en paragraphes,
+#  - sommaires (CONTENTS / IN THIS SECTION) retirés des pages et regroupés dans un seul bloc,
+#    que SectionIndex lit pour les titres mais qui n'entre jamais dans le contexte.
+# La dernière ligne de chaque page (n° de sous-section ou de page) est conservée : SectionIndex
+# s'en sert pour découper les sections. Les pages restent séparées par une ligne vide.
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from sections import FOOTER_PAGE_RE, FOOTER_SUB_RE, TOC_HEADER
+
+TOC_MARKERS = ("CONTENTS:", "IN THIS SECTION:")
+# une entrée de sommaire : « 01  BRAND FOUNDATION // 3 », « 1.1 » seul (titre à la ligne suivante)
+TOC_ENTRY_RE = re.compile(r"^(?:0\d|\d\.\d)(?:\s+[^/]+?\s*//\s*\d+)?$")
+# titre coupé sur 2 lignes : « 3.2  LOGO COMPONENTS » puis « & CONSTRUCTION // 15 »
+TOC_HEAD_RE = re.compile(r"^(?:0\d|\d\.\d)\s+[^/]+$")
+TOC_TAIL_RE = re.compile(r"^[^/]+?\s*//\s*\d+$")
+BULLET_RE = re.compile(r"^(?:[•\-–*]|[A-Z]\.|\d+[.)])\s")
+SPACES_RE = re.compile(r"[ \t ]+")
+SENTENCE_END = (".", ":", "!", "?", "…", "»", "”", '"')
+
+
+@dataclass
+class CleanReport:
+    pages: int = 0
+    pages_dropped: int = 0          # pages vides une fois le mobilier et le sommaire retirés
+    furniture_lines: int = 0        # en-têtes / pieds répétés
+    toc_entries: int = 0
+    letter_spaced: int = 0
+    joined_lines: int = 0
+
+
+def clean_line(line: str) -> str:
+    """Caractères de contrôle retirés (le PDF en glisse dans les en-têtes : « \\x08 »)."""
+    line = unicodedata.normalize("NFC", line)
+    return "".join(ch for ch in line if ch.isprintable() or ch == "\t").rstrip()
+
+
+def collapse_letter_spacing(line: str) -> Tuple[str, bool]:
+    """« T H E  L A N D O N » → « THE LANDON » (lettres séparées par 1 espace, mots par 2+)."""
+    words = re.split(r" {2,}", line.strip())
+    letters = [w.split(" ") for w in words]
+    if sum(len(ls) for ls in letters) < 4 or not all(len(c) == 1 for ls in letters for c in ls):
+        return line, False
+    return " ".join("".join(ls) for ls in letters), True
+
+
+def furniture_key(line: str) -> str:
+    """Clé de comparaison entre pages : espacement recollé, chiffres neutralisés (n° de page)."""
+    return re.sub(r"\d", "#", " ".join(collapse_letter_spacing(line)[0].split()).upper())
+
+
+def is_footer(line: str) -> bool:
+    return bool(FOOTER_SUB_RE.match(line) or FOOTER_PAGE_RE.match(line))
+
+
+class BoilerplateCleaner:
+    def __init__(self, repeat_min: int = 3, repeat_ratio: float = 0.3, zone: int = 4):
+        # une ligne est du mobilier si elle revient dans les `zone` premières / dernières lignes de
+        # plusieurs pages : ≥ repeat_min pages si elle est espacée ou purement numérique (en-tête
+        # typographique, n° de page), sinon ≥ repeat_ratio des pages (texte ordinaire répété)
+        self.repeat_min = repeat_min
+        self.repeat_ratio = repeat_ratio
+        self.zone = zone
+
+    @staticmethod
+    def _split_footer(page: List[str]) -> Tuple[List[str], Optional[str]]:
+        """(lignes, marqueur de fin de page) : « 4.2 » ou « 22 », gardé pour SectionIndex."""
+        if page and is_footer(page[-1].strip()):
+            return page[:-1], page[-1].strip()
+        return page, None
+
+    def _in_zone(self, i: int, n: int) -> bool:
+        return i < self.zone or i >= n - self.zone
+
+    # --- Sommaire ---
+    @staticmethod
+    def _is_toc_entry(lines: List[str], i: int) -> bool:
+        line = lines[i].strip()
+        if TOC_ENTRY_RE.match(line):
+            return True
+        return bool(TOC_HEAD_RE.match(line) and i + 1 < len(lines) and TOC_TAIL_RE.match(lines[i + 1].strip()))
+
+    @staticmethod
+    def _pull_toc(lines: List[str], entries: List[str]) -> List[str]:
+        """Retire chaque liste CONTENTS / IN THIS SECTION (et ses entrées) ; les entrées vont dans `entries`."""
+        out, i = [], 0
+        while i < len(lines):
+            if lines[i].strip() not in TOC_MARKERS:
+                out.append(lines[i])
+                i += 1
+                continue
+            i += 1
+            while i < len(lines) and BoilerplateCleaner._is_toc_entry(lines, i):
+                entry = " ".join(lines[i].split())
+                # « 1.1 » seul ou titre coupé : la suite est sur la ligne suivante
+                if "//" not in entry and i + 1 < len(lines) and TOC_TAIL_RE.match(lines[i + 1].strip()):
+                    i += 1
+                    entry += " " + " ".join(lines[i].split())
+                if "//" in entry:
+                    num, rest = entry.split(" ", 1)
+                    entries.append(f"{num}\t {rest.replace(' // ', '  //  ')}")
+                i += 1
+        return out
+
+    # --- Paragraphes ---
+    @staticmethod
+    def _join(raw: List[str], report: CleanReport) -> List[str]:
+        """Recolle les lignes coupées par la mise en page (césure, ligne pleine, minuscule qui suit)."""
+        out: List[str] = []
+        prev_raw = ""
+        for line in raw:
+            text = SPACES_RE.sub(" ", line).strip()
+            if not text:
+                continue
+            if out and not BULLET_RE.match(text):
+                last = out[-1]
+                if last.endswith("-") and text[0].islower():
+                    out[-1] = last + text                         # « ever-\nevolving »
+                    report.joined_lines += 1
+                    prev_raw = line
+                    continue
+                # le PDF laisse une espace en fin de ligne quand le paragraphe continue
+                wrapped = prev_raw.endswith((" ", "\t")) and not last.endswith(SENTENCE_END)
+                if wrapped or text[0].islower():
+                    out[-1] = last + " " + text
+                    report.joined_lines += 1
+                    prev_raw = line
+                    continue
+            out.append(text)
+            prev_raw = line
+        return out
+
+    # --- Document ---
+    def clean(self, text: str) -> Tuple[str, CleanReport]:
+        report = CleanReport()
+        pages = [[clean_line(ln) for ln in part.splitlines()] for part in text.split("\n\n")]
+        pages = [[ln for ln in p if ln.strip()] for p in pages]
+        pages = [p for p in pages if p]
+        report.pages = len(pages)
+
+        entries: List[str] = []
+        pages = [self._pull_toc(p, entries) for p in pages]
+        report.toc_entries = len(entries)
+
+        split = [self._split_footer(p) for p in pages]
+        seen = Counter(k for body, _ in split
+                       for k in {furniture_key(ln) for i, ln in enumerate(body) if self._in_zone(i, len(body))})
+        common = max(self.repeat_min, self.repeat_ratio * len(pages))
+        out_pages = []
+        for body, footer in split:
+            kept = []
+            for i, ln in enumerate(body):
+                collapsed, spaced = collapse_letter_spacing(ln)
+                if self._in_zone(i, len(body)):
+                    key = furniture_key(ln)
+                    typographic = spaced or not key.strip("# ")
+                    if seen[key] >= (self.repeat_min if typographic else common):
+                        report.furniture_lines += 1
+                        continue
+                report.letter_spaced += spaced
+                kept.append(collapsed)
+            lines = self._join(kept, report)
+            if not lines:
+                report.pages_dropped += 1
+                continue
+            out_pages.append("\n".join(lines + ([footer] if footer else [])))
+
+        if entries:
+            # un seul bloc de sommaire, en tête : SectionIndex y lit les titres et pages
+            out_pages.insert(0, "\n".join([TOC_HEADER] + list(dict.fromkeys(entries))))
+        return "\n\n".join(out_pages) + "\n", report
+
+
+def strip_boilerplate(text: str, **kw) -> Tuple[str, CleanReport]:
+    return BoilerplateCleaner(**kw).clean(text)
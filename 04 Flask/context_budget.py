@@ -0,0 +1,95 @@
+# context_budget.py
+# Assemblage du contexte sous budget de tokens (tiktoken) : fusion des intervalles
+# qui se chevauchent, remplissage par pertinence, coupe aux frontières de paragraphe.
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, List, Mapping, Sequence, Tuple
+
+# fin de paragraphe : ligne vide (page/section) ou saut de ligne après une fin de phrase
+PARAGRAPH_END_RE = re.compile(r"\n\s*\n|(?<=[.!?:;”»])[ \t]*\n")
+SEPARATOR = "\n\n---\n\n"
+
+# (doc_id, start, end, score)
+Span = Tuple[str, int, int, float]
+
+
+@lru_cache(maxsize=8)
+def get_counter(model: str = "gpt-4o-mini") -> Callable[[str], int]:
+    """Compteur de tokens exact (tiktoken) ; ≈ 4 caractères/token si l'encodage est indisponible."""
+    try:
+        import tiktoken
+        try:
+            enc = tiktoken.encoding_for_model(model)
+        except KeyError:
+            enc = tiktoken.get_encoding("o200k_base")
+        return lambda s: len(enc.encode(s, disallowed_special=()))
+    except Exception:
+        # tiktoken télécharge ses tables au 1er usage : hors-ligne, on garde une estimation
+        return lambda s: (len(s) + 3) // 4
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    return get_counter(model)(text)
+
+
+def merge_spans(spans: Sequence[Span], gap: int = 0) -> List[Span]:
+    """Fusionne les intervalles d'un même document qui se chevauchent (ou se touchent) ; deux pages
+    ou sections voisines, séparées par une ligne vide, restent distinctes (chacune son score)."""
+    merged: List[List] = []
+    for doc, start, end, score in sorted(spans):
+        if merged and merged[-1][0] == doc and start <= merged[-1][2] + gap:
+            merged[-1][2] = max(merged[-1][2], end)
+            merged[-1][3] = max(merged[-1][3], score)
+        else:
+            merged.append([doc, start, end, score])
+    return [tuple(m) for m in merged]
+
+
+def paragraphs(text: str, start: int, end: int) -> List[Tuple[int, int]]:
+    """Découpe [start, end) en paragraphes (offsets absolus)."""
+    out, cur = [], start
+    for m in PARAGRAPH_END_RE.finditer(text, start, end):
+        if m.end() > cur:
+            out.append((cur, m.end()))
+            cur = m.end()
+    if cur < end:
+        out.append((cur, end))
+    return out
+
+
+@dataclass
+class Assembled:
+    text: str
+    tokens: int
+    spans: List[Tuple[str, int, int]] = field(default_factory=list)
+    dropped: int = 0          # intervalles (ou paragraphes) écartés faute de budget
+
+
+def assemble(texts: Mapping[str, str], spans: Sequence[Span], budget: int,
+             model: str = "gpt-4o-mini") -> Assembled:
+    """Remplit `budget` tokens avec les intervalles (doc, start, end, score) les plus pertinents."""
+    count = get_counter(model)
+    sep_cost = count(SEPARATOR)
+    used, picked, dropped = 0, [], 0
+    for doc, start, end, _ in sorted(merge_spans(spans), key=lambda s: -s[3]):
+        text = texts[doc]
+        cost = count(text[start:end].strip()) + (sep_cost if picked else 0)
+        if used + cost <= budget:
+            picked.append((doc, start, end))
+            used += cost
+            continue
+        # trop long : on prend les premiers paragraphes entiers qui tiennent encore
+        kept_end = start
+        for p_start, p_end in paragraphs(text, start, end):
+            c = count(text[start:p_end].strip()) + (sep_cost if picked else 0)
+            if used + c > budget:
+                break
+            kept_end = p_end
+        if kept_end > start:
+            picked.append((doc, start, kept_end))
+            used += count(text[start:kept_end].strip()) + (sep_cost if len(picked) > 1 else 0)
+        dropped += 1
+    picked.sort()
+    body = SEPARATOR.join(texts[d][s:e].strip() for d, s, e in picked)
+    return Assembled(text=body, tokens=count(body) if body else 0, spans=picked, dropped=dropped)
@@ -0,0 +1,131 @@
+# corpus.py
+# Corpus multi-documents (un .txt extrait par brand book) avec rechargement à chaud :
+# un thread surveille les fichiers, reconstruit les index en arrière-plan, puis remplace
+# la référence `current` d'un seul coup. Les requêtes en cours gardent l'ancien index.
+import hashlib
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+import snapshot as snap
+
+T = TypeVar("T")
+
+
+class CorpusManager(Generic[T]):
+    def __init__(self, sources: Iterable[Path], build: Callable[[Dict[str, str]], T],
+                 pattern: str = "*.txt", poll_interval: float = 2.0,
+                 snapshot: Optional[Path] = None, snapshot_version: str = ""):
+        self.sources = [Path(s) for s in sources]
+        # instantané binaire de l'index construit (snapshot.py), invalidé si fichiers ou code changent
+        self.snapshot = Path(snapshot) if snapshot else None
+        self.snapshot_version = snapshot_version
+        self.snapshot_status = "off"   # hit | saved | off | error
+        self.build = build
+        self.pattern = pattern
+        self.poll_interval = poll_interval
+        self.version = 0
+        self.reloads = 0
+        self.failures = 0
+        self.loaded_at = 0.0
+        self.doc_ids: List[str] = []
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._fingerprint: Tuple = ()
+        self.listeners: List[Callable[[], None]] = []   # appelés après chaque rechargement à chaud
+        self.current: T = None  # type: ignore[assignment]
+        if not self.reload(force=True):
+            raise FileNotFoundError("Corpus vide : " + ", ".join(str(s) for s in self.sources))
+
+    # --- Fichiers ---
+    def files(self) -> Dict[str, Path]:
+        """doc_id (nom de fichier sans extension) → chemin ; le 1er trouvé l'emporte."""
+        out: Dict[str, Path] = {}
+        for src in self.sources:
+            paths = sorted(src.glob(self.pattern)) if src.is_dir() else [src] if src.exists() else []
+            for p in paths:
+                out.setdefault(p.stem, p)
+        return out
+
+    @staticmethod
+    def fingerprint(files: Dict[str, Path]) -> Tuple:
+        sig = []
+        for doc_id, p in sorted(files.items()):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            sig.append((doc_id, str(p), st.st_mtime_ns, st.st_size))
+        return tuple(sig)
+
+    # --- Rechargement ---
+    def reload(self, force: bool = False) -> bool:
+        """Reconstruit si les fichiers ont changé ; True si un nouvel index a été publié."""
+        with self._reload_lock:
+            files = self.files()
+            fp = self.fingerprint(files)
+            if not fp or (fp == self._fingerprint and not force):
+                return False
+            key = hashlib.sha256(repr((self.snapshot_version, fp)).encode()).hexdigest()
+            loaded = snap.load(self.snapshot, key) if self.snapshot else None
+            if loaded is not None:
+                doc_ids, built = loaded
+                self.snapshot_status = "hit"
+            else:
+                docs = {doc_id: p.read_text(encoding="utf-8") for doc_id, p in files.items()}
+                built, doc_ids = self.build(docs), sorted(docs)
+                self._save_snapshot(key, (doc_ids, built))
+            # publication atomique : une seule affectation de référence
+            self.current = built
+            self._fingerprint = fp
+            self.doc_ids = doc_ids
+            self.version += 1
+            self.loaded_at = time.time()
+            if self.version > 1:
+                self.reloads += 1
+            return True
+
+    def _save_snapshot(self, key: str, obj) -> None:
+        if self.snapshot is None:
+            return
+        try:
+            snap.save(self.snapshot, key, obj)
+            self.snapshot_status = "saved"
+        except Exception as e:
+            # lecture seule, disque plein… : on démarre quand même, sans instantané
+            self.snapshot_status = "error"
+            print(f"⚠️  Instantané non écrit ({self.snapshot}) : {e}")
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self.reload():
+                    print(f"🔄 Corpus rechargé (v{self.version}) : {', '.join(self.doc_ids)}")
+                    for listener in self.listeners:
+                        listener()
+            except Exception:
+                # on garde l'index précédent ; nouvel essai au prochain tour
+                self.failures += 1
+                traceback.print_exc()
+
+    def start(self) -> "CorpusManager[T]":
+        if self.poll_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="corpus-watch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "docs": self.doc_ids,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "loaded_at": self.loaded_at,
+            "snapshot": self.snapshot_status,
+        }
@@ -0,0 +1,143 @@
+# intents.py
+# Routeur d'intentions local (sans appel LLM) : salutations, remerciements, au revoir et
+# questions manifestement hors sujet (lexique explicite), en français et en anglais. Réponses tirées de gabarits
+# au ton de « Mr. Landon » ; les sujets proposés viennent de l'index des sections.
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from keyword_matcher import KeywordMatcher
+from textnorm import PUNCT_RE, fold, tokenize
+
+# formules (repliées : minuscules, sans accents), les plus longues d'abord
+GREETINGS = ["good morning", "good afternoon", "good evening", "bonjour", "bonsoir", "salut",
+             "coucou", "hello", "hey", "hi", "hola", "yo"]
+THANKS = ["merci beaucoup", "merci bien", "thank you", "thanks", "merci", "thx", "cheers"]
+FAREWELLS = ["au revoir", "a bientot", "bonne journee", "bonne soiree", "goodbye", "see you", "bye"]
+# mots qui accompagnent une formule sans en faire une vraie question
+FILLERS = {
+    "mr", "monsieur", "landon", "ca", "va", "comment", "allez", "vous", "tu", "toi", "et", "bien",
+    "tres", "beaucoup", "encore", "a", "tous", "toutes", "le", "la", "les", "pour", "tout", "votre",
+    "aide", "there", "how", "are", "you", "so", "much", "a", "lot", "again", "and", "for", "your",
+    "help", "all", "everyone", "very", "the", "info", "infos", "reponse", "answer", "cool", "super",
+    "parfait", "ok", "okay", "great", "nice", "top", "ah", "oh", "bon", "alors", "oui", "yes",
+}
+FR_MARKERS = {"bonjour", "bonsoir", "salut", "coucou", "merci", "revoir", "bientot", "journee",
+              "soiree", "vous", "est", "les", "des", "quel", "quelle", "quels", "quelles", "comment",
+              "pourquoi", "ou", "le", "la", "une", "je", "ca", "et", "sur", "pour", "monsieur"}
+EN_MARKERS = {"hello", "hi", "hey", "thanks", "thank", "bye", "goodbye", "good", "morning", "evening",
+              "the", "what", "which", "how", "why", "where", "is", "are", "you", "your", "and", "of"}
+# hors sujet = sujet clairement étranger à l'hôtel (météo, heure, actualité, culture générale…) ;
+# une question qui n'est simplement pas dans le brand book (sport, animaux, parking…) va au LLM
+OFF_TOPIC = KeywordMatcher([[
+    "quel temps", "meteo", "weather", "forecast", "quelle heure", "what time is it", "horoscope",
+    "recette", "recipe", "blague", "joke", "poeme", "poem", "bitcoin", "crypto*", "bourse", "stock market",
+    "election*", "president", "politique", "politic*", "football", "who won", "qui a gagne", "capitale",
+    "capital of", "python", "javascript", "programmation", "programming", "equation", "devoirs", "homework",
+    "film", "movie", "netflix",
+]])
+# racines propres à l'hôtel : une question qui en contient reste dans le sujet, même avec un mot
+# du lexique hors sujet (« à quelle heure est le petit-déjeuner ? »)
+SCOPE_HINTS = {"hotel", "landon", "chambre", "accueil", "reservation", "sejour", "personnel", "equipe",
+               "marque", "charte", "identite", "graphique", "image", "restaurant", "spa",
+               "client", "logo", "couleur", "police", "typo", "photo", "service", "prix", "tarif",
+               "petit", "dejeuner", "breakfast", "horaire", "room", "suite", "lit", "bar", "menu",
+               "wifi", "parking", "piscine", "pool", "reception", "concierge", "conciergerie", "navette",
+               "check", "arrivee", "depart", "annulation", "booking", "animaux", "pet", "staff"}
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class Intent:
+    name: str        # greeting | thanks | farewell | out_of_scope
+    lang: str        # fr | en
+    reply: str
+
+
+def phrase_re(phrases: Sequence[str]) -> "re.Pattern":
+    return re.compile(r"\b(?:" + "|".join(re.escape(p) for p in phrases) + r")\b")
+
+
+GREETING_RE = phrase_re(GREETINGS)
+THANKS_RE = phrase_re(THANKS)
+FAREWELL_RE = phrase_re(FAREWELLS)
+
+
+def detect_lang(text: str) -> str:
+    """fr / en d'après quelques mots-outils ; français par défaut (public principal)."""
+    words = WORD_RE.findall(fold(text))
+    fr = sum(w in FR_MARKERS for w in words) + 2 * any(ch in text for ch in "éèêàçùôî")
+    en = sum(w in EN_MARKERS for w in words)
+    return "en" if en > fr else "fr"
+
+
+def pretty(title: str) -> str:
+    """"OUR SERVICES & AMENITIES" → "Our Services & Amenities"."""
+    return " ".join(w.capitalize() if any(ch.isalpha() for ch in w) else w for w in title.split())
+
+
+class IntentRouter:
+    def __init__(self, topics: Sequence[str], themes: Optional[KeywordMatcher] = None):
+        self.topics = [pretty(t) for t in topics] or ["Our Services & Amenities", "Our Colors", "Our Logo"]
+        self.themes = themes  # mots-clés des thèmes de routage : une question qui en contient est dans le sujet
+        self._turn = 0  # rotation des suggestions (un entier : l'objet reste picklable pour l'instantané)
+
+    # --- Classification ---
+    def classify(self, question: str) -> Optional[Intent]:
+        text = " ".join(PUNCT_RE.sub(" ", fold(question)).split())
+        if not text:
+            return None
+        for name, pattern in (("greeting", GREETING_RE), ("thanks", THANKS_RE), ("farewell", FAREWELL_RE)):
+            if pattern.search(text) and self._only_small_talk(text):
+                return self._reply(name, question)
+        if self._out_of_scope(question):
+            return self._reply("out_of_scope", question)
+        return None
+
+    @staticmethod
+    def _only_small_talk(text: str) -> bool:
+        """Rien d'autre qu'une formule de politesse (« bonjour, quelles couleurs ? » → non)."""
+        for pattern in (GREETING_RE, THANKS_RE, FAREWELL_RE):
+            text = pattern.sub(" ", text)
+        return all(w in FILLERS for w in text.split())
+
+    def _out_of_scope(self, question: str) -> bool:
+        """Un mot du lexique hors sujet, et rien qui rattache la question à l'hôtel ni à un thème.
+        Dans le doute, la question va au LLM (qui sait renvoyer vers la conciergerie)."""
+        if not OFF_TOPIC.scores(question):
+            return False
+        if any(t in SCOPE_HINTS for t in tokenize(question)):
+            return False
+        return not (self.themes is not None and self.themes.scores(question))
+
+    # --- Gabarits ---
+    def suggestions(self, n: int = 3) -> List[str]:
+        """n sujets espacés dans la table des matières (donc de chapitres différents), en rotation."""
+        start, step = self._turn, max(1, len(self.topics) // n)
+        self._turn += 1
+        return [self.topics[(start + i * step) % len(self.topics)] for i in range(min(n, len(self.topics)))]
+
+    def _reply(self, name: str, question: str) -> Intent:
+        lang = detect_lang(question)
+        bullets = "\n".join(f"- {t}" for t in self.suggestions())
+        if lang == "fr":
+            reply = {
+                "greeting": "Bonjour et bienvenue au Landon Hotel ! Je suis Mr. Landon, ravi de vous aider.\n"
+                            f"Je peux vous renseigner par exemple sur :\n{bullets}\nQue souhaitez-vous savoir ?",
+                "thanks": "Avec grand plaisir ! Si vous avez d'autres questions, je peux aussi vous parler de :\n"
+                          f"{bullets}",
+                "farewell": "Merci de votre visite et à très bientôt au Landon Hotel !",
+                "out_of_scope": "Je ne suis pas certain que votre question concerne le Landon Hotel. "
+                                f"Souhaitiez-vous plutôt en savoir plus sur l'un de ces sujets ?\n{bullets}",
+            }[name]
+        else:
+            reply = {
+                "greeting": "Hello and welcome to the Landon Hotel! I'm Mr. Landon, happy to help.\n"
+                            f"I can tell you about, for example:\n{bullets}\nWhat would you like to know?",
+                "thanks": f"My pleasure! If you have more questions, I can also tell you about:\n{bullets}",
+                "farewell": "Thank you for stopping by — we hope to see you soon at the Landon Hotel!",
+                "out_of_scope": "I'm not sure your question is about the Landon Hotel. "
+                                f"Were you perhaps interested in one of these topics?\n{bullets}",
+            }[name]
+        return Intent(name=name, lang=lang, reply=reply)
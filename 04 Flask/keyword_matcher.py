@@ -0,0 +1,105 @@
+# keyword_matcher.py
+# Automate d'Aho-Corasick compilé une fois pour toutes les listes de mots-clés (thèmes) :
+# une seule passe sur la question, repliement casse/accents, racinisation, frontières de mots.
+#
+# Syntaxe des clés : "couleur" (mot entier, pluriel compris), "photograph*" (préfixe),
+# "se trouve" (expression de plusieurs mots).
+from collections import deque
+from typing import Dict, List, Sequence, Tuple
+
+from textnorm import TOKEN_RE, fold, stem
+
+
+def normalize(text: str) -> str:
+    """" Où se trouvent les Hôtels ?" → " ou se trouvent le hotel " (mots séparés par un espace)."""
+    return " " + " ".join(stem(t) for t in TOKEN_RE.findall(fold(text))) + " "
+
+
+class KeywordMatcher:
+    """Groupes de clés (un par thème) → score de chaque groupe pour une question."""
+
+    def __init__(self, groups: Sequence[Sequence[str]]):
+        self.groups = [list(keys) for keys in groups]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # par état : (groupe, id de clé, poids) des clés qui se terminent ici
+        self._out: List[List[Tuple[int, int, float]]] = [[]]
+        self.keys: List[str] = []
+        self.weights: List[float] = []
+        for g, keys in enumerate(self.groups):
+            for key in keys:
+                pattern, weight = self.compile_key(key)
+                if pattern.strip():
+                    self._add(pattern, (g, len(self.keys), weight))
+                    self.keys.append(key)
+                    self.weights.append(weight)
+        self._link()
+
+    @staticmethod
+    def compile_key(key: str) -> Tuple[str, float]:
+        """Clé → motif borné par des espaces ; poids = nombre de mots (une expression est plus précise)."""
+        prefix = key.endswith("*")
+        words = normalize(key.rstrip("*")).split()
+        if prefix and words:
+            # préfixe : on ne racinise pas le dernier mot ("typograph*" reste "typograph")
+            words[-1] = TOKEN_RE.findall(fold(key.rstrip("*")))[-1]
+        body = " " + " ".join(words)
+        return (body if prefix else body + " "), float(len(words))
+
+    def _add(self, pattern: str, item: Tuple[int, int, float]) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(item)
+
+    def _link(self) -> None:
+        """Liens d'échec en largeur ; les sorties des suffixes sont fusionnées dans chaque état."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    # --- Recherche ---
+    def _scan(self, text: str) -> List[Tuple[int, int]]:
+        """(groupe, id de clé) de chaque clé présente dans le texte, une fois chacune."""
+        seen, found = set(), []
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in normalize(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for g, kid, _ in out[state]:
+                if kid not in seen:
+                    seen.add(kid)
+                    found.append((g, kid))
+        return found
+
+    def find(self, text: str) -> List[Tuple[int, str]]:
+        """(groupe, clé) trouvés, dans l'ordre d'apparition."""
+        return [(g, self.keys[kid]) for g, kid in self._scan(text)]
+
+    def scores(self, text: str) -> Dict[int, float]:
+        """groupe → somme des poids des clés distinctes trouvées (absents = 0)."""
+        out: Dict[int, float] = {}
+        for g, kid in self._scan(text):
+            out[g] = out.get(g, 0.0) + self.weights[kid]
+        return out
+
+    def ranked(self, text: str) -> List[Tuple[int, float]]:
+        """Groupes trouvés, du meilleur score au moins bon (à égalité : ordre de la table)."""
+        return sorted(self.scores(text).items(), key=lambda gs: (-gs[1], gs[0]))
@@ -0,0 +1,135 @@
+# llm_runtime.py
+# Boucle asyncio dédiée (thread de fond) pour les appels LLM : un seul client HTTP poolé,
+# un sémaphore sur les appels en vol et un contrôle d'admission (503 + Retry-After).
+import asyncio
+import queue
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+_DONE = object()
+
+
+class Saturated(Exception):
+    """File d'attente pleine (ou attente trop longue) : le client doit réessayer plus tard."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"LLM saturé, réessayer dans {retry_after}s")
+        self.retry_after = retry_after
+
+
+class LLMRuntime:
+    def __init__(self, max_inflight: int = 32, max_queue: int = 256,
+                 queue_timeout: float = 30.0, retry_after: int = 5):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._start()
+
+    def _start(self) -> None:
+        self._lock = threading.Lock()
+        self._pending = 0          # en vol + en attente du sémaphore
+        self._inflight = 0
+        self.rejected = 0
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="llm-loop", daemon=True)
+        self._thread.start()
+        self._sem = asyncio.run_coroutine_threadsafe(self._make_sem(), self.loop).result()
+
+    def after_fork(self) -> None:
+        """Dans un processus forké le thread de la boucle n'existe plus : boucle neuve."""
+        self._start()
+
+    async def _make_sem(self) -> asyncio.Semaphore:
+        return asyncio.Semaphore(self.max_inflight)
+
+    # --- Admission ---
+    def _admit(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_inflight + self.max_queue:
+                self.rejected += 1
+                raise Saturated(self.retry_after)
+            self._pending += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def _acquire(self) -> None:
+        try:
+            await asyncio.wait_for(self._sem.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.rejected += 1
+            raise Saturated(self.retry_after)
+        with self._lock:
+            self._inflight += 1
+
+    def _release_slot(self) -> None:
+        self._sem.release()
+        with self._lock:
+            self._inflight -= 1
+
+    async def _guarded(self, factory: Callable[[], Awaitable[T]]) -> T:
+        await self._acquire()
+        try:
+            return await factory()
+        finally:
+            self._release_slot()
+
+    # --- API synchrone (appelée depuis les handlers Flask) ---
+    def run(self, factory: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """Exécute factory() sur la boucle partagée et attend le résultat."""
+        self._admit()
+        try:
+            fut = asyncio.run_coroutine_threadsafe(self._guarded(factory), self.loop)
+            try:
+                return fut.result(timeout)
+            except BaseException:
+                fut.cancel()
+                raise
+        finally:
+            self._release()
+
+    def iterate(self, factory: Callable[[], AsyncIterator[T]]) -> Iterator[T]:
+        """Consomme un générateur async sur la boucle partagée et le rend itérable en synchrone."""
+        self._admit()
+        out: "queue.Queue" = queue.Queue()
+
+        async def pump():
+            await self._acquire()
+            try:
+                async for item in factory():
+                    out.put(item)
+            finally:
+                self._release_slot()
+
+        def on_done(f):
+            exc = None if f.cancelled() else f.exception()
+            out.put(exc if exc is not None else _DONE)
+
+        fut = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        fut.add_done_callback(on_done)
+        try:
+            while True:
+                item = out.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # client parti en cours de route : on annule l'appel amont
+            fut.cancel()
+            self._release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "inflight": self._inflight,
+                "queued": self._pending - self._inflight,
+                "max_inflight": self.max_inflight,
+                "max_queue": self.max_queue,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,149 @@
+# metrics.py
+# Instrumentation légère (sans dépendance) : compteurs, histogrammes et jauges lues à la
+# collecte, rendus au format texte Prometheus pour GET /metrics.
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# secondes : de 100 µs (sélection du contexte) à 30 s (appel LLM lent)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 1500, 2000, 4000, 8000)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, n: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + n
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        out += [f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_value(v)}" for k, v in items]
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # par jeu de labels : [compte par bucket (non cumulé, +Inf en dernier), somme, total]
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            s[0][i] += 1
+            s[1] += value
+            s[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, *labels)
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._series.items())
+        for k, (counts, total, n) in items:
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                le_s = "+Inf" if le == float("inf") else _fmt_value(le)
+                labels = _fmt_labels(self.labels, k, f'le="{le_s}"')
+                out.append(f"{self.name}_bucket{labels} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, k)} {_fmt_value(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, k)} {n}")
+        return out
+
+
+class GaugeSet:
+    """Jauges lues à la collecte depuis un stats() existant (cache, runtime LLM, corpus…)."""
+
+    def __init__(self, prefix: str, help: str, read: Callable[[], Dict]):
+        self.prefix, self.help, self.read = prefix, help, read
+
+    def render(self) -> List[str]:
+        out = []
+        for key, value in sorted(self.read().items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{self.prefix}_{key}"
+            out += [f"# HELP {name} {self.help} ({key})", f"# TYPE {name} gauge", f"{name} {_fmt_value(value)}"]
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauges(self, prefix: str, help: str, read: Callable[[], Dict]) -> GaugeSet:
+        return self.register(GaugeSet(prefix, help, read))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            try:
+                lines += m.render()
+            except Exception as e:  # une source en panne ne doit pas casser /metrics
+                lines.append(f"# {getattr(m, 'name', getattr(m, 'prefix', '?'))}: erreur de collecte {e!r}")
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def usage_of(message) -> Optional[Tuple[int, int]]:
+    """(prompt, completion) tokens d'une réponse LangChain (usage_metadata ou response_metadata)."""
+    um = getattr(message, "usage_metadata", None)
+    if um:
+        return int(um.get("input_tokens", 0)), int(um.get("output_tokens", 0))
+    tu = (getattr(message, "response_metadata", None) or {}).get("token_usage")
+    if tu:
+        return int(tu.get("prompt_tokens", 0)), int(tu.get("completion_tokens", 0))
+    return None
@@ -0,0 +1,320 @@
+# query_log.py
+# Journal des questions posées (SQLite) et pré-calcul des réponses les plus demandées :
+#  - log() ne fait qu'empiler dans une file bornée (jamais bloquant : file pleine → entrée perdue,
+#    comptée) ; un thread écrivain insère par lots (une transaction pour ≤ batch_size lignes),
+#  - log_shadow() : même file, table retrieval_shadow (stratégies de contexte comparées, retrievers.py),
+#  - Prewarmer relit le journal (top N des questions normalisées) et remplit le cache de réponses
+#    en tâche de fond, une question à la fois, après un déploiement ou un changement de corpus.
+# SQLAlchemy n'est importé que par le thread écrivain (ou à la première lecture).
+#
+# Usage :
+#   python query_log.py --top 20          # questions les plus fréquentes (7 derniers jours)
+#   python query_log.py --prewarm         # pré-calcule leurs réponses maintenant
+#   python query_log.py --retrievers      # comparaison des stratégies de contexte (mode shadow)
+import argparse
+import atexit
+import os
+import queue
+import threading
+import time
+import traceback
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from textnorm import normalize_question
+
+_STOP = object()
+
+
+@lru_cache(maxsize=1)
+def schema():
+    """(module sqlalchemy, métadonnées, table queries, table retrieval_shadow)."""
+    import sqlalchemy as sa
+
+    metadata = sa.MetaData()
+    queries = sa.Table(
+        "queries",
+        metadata,
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("ts", sa.Float, nullable=False, index=True),
+        sa.Column("question", sa.Text, nullable=False),
+        sa.Column("normalized", sa.Text, nullable=False, index=True),
+        sa.Column("docs", sa.Text),                    # périmètre demandé ("a,b"), NULL = tout le corpus
+        sa.Column("sections", sa.Text),                # sections du contexte ("doc:3.2,doc:04")
+        sa.Column("source", sa.String(16)),            # llm | cache | shared | intent | error
+        sa.Column("status", sa.Integer),
+        sa.Column("latency_ms", sa.Float),
+        sa.Column("context_tokens", sa.Integer),
+        sa.Column("history_tokens", sa.Integer),
+        sa.Column("prompt_tokens", sa.Integer),
+        sa.Column("completion_tokens", sa.Integer),
+        sa.Column("trace_id", sa.String(64)),
+    )
+    shadow = sa.Table(
+        "retrieval_shadow",
+        metadata,
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column("ts", sa.Float, nullable=False, index=True),
+        sa.Column("question", sa.Text, nullable=False),
+        sa.Column("trace_id", sa.String(64)),
+        sa.Column("strategy", sa.String(32), nullable=False, index=True),
+        sa.Column("primary_strategy", sa.String(32), nullable=False),
+        sa.Column("latency_ms", sa.Float),
+        sa.Column("context_tokens", sa.Integer),
+        sa.Column("overlap", sa.Float),     # Jaccard (caractères) avec le contexte servi
+        sa.Column("recall", sa.Float),      # part du contexte servi que la stratégie retrouve
+    )
+    return sa, metadata, queries, shadow
+
+
+class QueryLog:
+    def __init__(self, db_url: str, batch_size: int = 200, flush_interval: float = 1.0,
+                 max_queue: int = 10_000):
+        self.db_url = db_url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval     # délai max avant écriture d'un lot incomplet
+        self.max_queue = max_queue
+        self._engine = None
+        self._engine_lock = threading.Lock()
+        self._start()
+
+    def _start(self) -> None:
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.counters = {"logged": 0, "written": 0, "batches": 0, "dropped": 0, "errors": 0}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def after_fork(self) -> None:
+        """Processus forké : thread écrivain et connexions SQL du parent inutilisables."""
+        if self._engine is not None:
+            self._engine.dispose(close=False)
+        self._engine_lock = threading.Lock()
+        self._start()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    sa, metadata, *_ = schema()
+                    engine = sa.create_engine(self.db_url, future=True)
+                    metadata.create_all(engine)
+                    if engine.dialect.name == "sqlite":
+                        # plusieurs workers écrivent, le pré-calcul lit : WAL évite de bloquer les lecteurs
+                        with engine.begin() as conn:
+                            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+                    self._engine = engine
+        return self._engine
+
+    # --- Écriture (chemin de la requête : O(1), sans E/S) ---
+    def log(self, **row) -> None:
+        self._put("queries", row)
+
+    def log_shadow(self, **row) -> None:
+        self._put("retrieval_shadow", row)
+
+    def _put(self, table: str, row: dict) -> None:
+        row.setdefault("ts", time.time())
+        try:
+            self._queue.put_nowait((table, row))
+        except queue.Full:
+            self._count("dropped")
+            return
+        self._count("logged")
+        if self._thread is None:
+            self._ensure_writer()
+
+    def _ensure_writer(self) -> None:
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-log", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch, stop = [], item is _STOP
+            if not stop:
+                batch.append(item)
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch: List[Tuple[str, dict]]) -> None:
+        tables: Dict[str, List[dict]] = {}
+        for table, row in batch:
+            if table == "queries":
+                row["normalized"] = normalize_question(row["question"])
+            tables.setdefault(table, []).append(row)
+        try:
+            _, metadata, *_ = schema()
+            with self.engine.begin() as conn:
+                for table, rows in tables.items():
+                    conn.execute(metadata.tables[table].insert(), rows)
+            self._count("written", len(batch))
+            self._count("batches")
+        except Exception:
+            # base verrouillée, disque plein… : le lot est perdu, le service continue
+            self._count("errors")
+            traceback.print_exc()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attend que tout ce qui est en file soit écrit ; False si le délai est dépassé."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Vide la file puis arrête l'écrivain (arrêt du processus)."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    # --- Lecture ---
+    def top_questions(self, n: int = 50, since: Optional[float] = None) -> List[Tuple[str, int]]:
+        """(question, occurrences) les plus fréquentes (forme normalisée), sur tout le corpus,
+        hors politesses et erreurs."""
+        sa, _, queries, _ = schema()
+        q = queries.c
+        stmt = (sa.select(sa.func.max(q.question), sa.func.count().label("n"))
+                .where(q.status == 200, q.source != "intent", q.docs.is_(None))
+                .group_by(q.normalized).order_by(sa.desc("n")).limit(n))
+        if since is not None:
+            stmt = stmt.where(q.ts >= since)
+        with self.engine.connect() as conn:
+            return [(question, count) for question, count in conn.execute(stmt)]
+
+    def retriever_report(self, since: Optional[float] = None) -> List[Dict]:
+        """Par stratégie : questions, durée moyenne / max, tokens et recouvrement moyens."""
+        sa, _, _, shadow = schema()
+        c = shadow.c
+        stmt = (sa.select(c.strategy, sa.func.count().label("questions"),
+                          sa.func.avg(c.latency_ms).label("latency_ms"), sa.func.max(c.latency_ms).label("max_ms"),
+                          sa.func.avg(c.context_tokens).label("context_tokens"),
+                          sa.func.avg(c.overlap).label("overlap"), sa.func.avg(c.recall).label("recall"))
+                .group_by(c.strategy).order_by(sa.func.avg(c.latency_ms)))
+        if since is not None:
+            stmt = stmt.where(c.ts >= since)
+        with self.engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(stmt)]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self.counters)
+        out["queued"] = self._queue.qsize()
+        return out
+
+
+class Prewarmer:
+    """Rejoue les questions les plus fréquentes du journal via `warm(question)` (True = réponse
+    calculée, False = déjà en cache) ; un seul passage à la fois, en tâche de fond."""
+
+    def __init__(self, log: QueryLog, warm: Callable[[str], bool], top: int = 50, window: float = 7 * 86400):
+        self.log = log
+        self.warm = warm
+        self.top = top
+        self.window = window
+        self._lock = threading.Lock()
+        self._running = False
+        self._again: Optional[str] = None
+        self.last: Dict = {}
+
+    def trigger(self, reason: str) -> None:
+        """Lance un passage ; si un passage est en cours, un autre suivra (corpus changé entre-temps)."""
+        if self.top <= 0:
+            return
+        with self._lock:
+            if self._running:
+                self._again = reason
+                return
+            self._running = True
+        threading.Thread(target=self._loop, args=(reason,), name="prewarm", daemon=True).start()
+
+    def _loop(self, reason: str) -> None:
+        while True:
+            try:
+                self.run(reason)
+            except Exception:
+                traceback.print_exc()
+            with self._lock:
+                reason, self._again = self._again, None
+                if reason is None:
+                    self._running = False
+                    return
+
+    def run(self, reason: str = "manuel") -> Dict:
+        t0 = time.perf_counter()
+        top = self.log.top_questions(self.top, since=time.time() - self.window)
+        out = {"reason": reason, "questions": len(top), "warmed": 0, "cached": 0, "failed": 0}
+        for question, _ in top:
+            try:
+                out["warmed" if self.warm(question) else "cached"] += 1
+            except Exception as e:
+                out["failed"] += 1
+                out["error"] = f"{type(e).__name__}: {e}"
+        out["elapsed_s"] = round(time.perf_counter() - t0, 2)
+        out["finished_at"] = time.time()
+        self.last = out
+        if top:
+            print(f"🔥 Pré-calcul ({reason}) : {out['warmed']} réponses calculées, {out['cached']} déjà en cache, "
+                  f"{out['failed']} échecs sur {len(top)} questions fréquentes ({out['elapsed_s']}s)")
+        return out
+
+    def stats(self) -> Dict:
+        return {"top": self.top, "running": self._running, **{k: v for k, v in self.last.items()
+                                                               if isinstance(v, (int, float))}}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Journal des questions : top des questions, pré-calcul.")
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--days", type=float, default=7)
+    ap.add_argument("--prewarm", action="store_true", help="pré-calcule les réponses du top maintenant")
+    ap.add_argument("--retrievers", action="store_true", help="comparaison des stratégies (mode shadow)")
+    args = ap.parse_args()
+    os.environ.setdefault("CORPUS_POLL", "0")
+    os.environ["WARMUP"] = "0"
+    import app
+
+    if args.prewarm:
+        app.PREWARM.top = args.top
+        app.PREWARM.window = args.days * 86400
+        app.PREWARM.run("manuel")
+        return
+    if args.retrievers:
+        print(f"{'stratégie':<16} {'questions':>9} {'ms moy':>8} {'ms max':>8} {'tokens':>7} {'Jaccard':>8} {'rappel':>7}")
+        for row in app.QUERY_LOG.retriever_report(since=time.time() - args.days * 86400):
+            print(f"{row['strategy']:<16} {row['questions']:>9} {row['latency_ms']:>8.2f} {row['max_ms']:>8.2f} "
+                  f"{row['context_tokens']:>7.0f} {row['overlap']:>8.3f} {row['recall']:>7.3f}")
+        return
+    for question, count in app.QUERY_LOG.top_questions(args.top, since=time.time() - args.days * 86400):
+        print(f"{count:>6}  {question}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# retrieval.py
+# Index d'une version du corpus (Retrieval) et tables de routage par thèmes. Module sans effet de bord :
+# l'instantané (snapshot.py) contient des objets Retrieval picklés ; les relire ne doit ni importer app.py
+# ni dépendre du module lancé en __main__.
+from dataclasses import dataclass
+from typing import Dict
+
+from bm25 import BM25Index
+from intents import IntentRouter
+from keyword_matcher import KeywordMatcher
+from sections import SectionIndex
+
+# Clés des thèmes (KeywordMatcher) : mot entier pluriel compris, "préfixe*", ou expression ;
+# casse et accents ignorés. Les mots ambigus ("où", "ton") ne valent qu'en expression.
+TYPO_KEYS = ["typograph*", "police", "font", "typo"]
+TYPO_ANCHORS = [
+    "TYPOGRAPHY SYSTEM","OUR PRIMARY TYPEFACE","BRANDON GROTESQUE",
+    "OUR ACCENT TYPEFACE","ESSONNES","TYPOGRAPHY USAGE",
+]
+FALLBACK_ANCHORS = ["BRANDON GROTESQUE","OUR COLORS","OUR SERVICES","PHOTOGRAPHY"]
+
+THEMES = [
+    # 1. Services & équipements
+    (["service","commodit*","amenit*","équipement"],
+     ["OUR SERVICES & AMENITIES","OUR SERVICES","AMENITIES"]),
+    
+    # 2. Logo / identité visuelle
+    (["logo","logotype","logomark","marque"],
+     ["LOGO SYSTEM","OUR LOGO","LOGOTYPE","OUR LOGOTYPE",
+      "LOGOMARK","OUR LOGOMARK","LOGO LOCK-UP","LOGO USAGE",
+      "SECONDARY SUBMARKS","LOGO COMPONENTS & CONSTRUCTION"]),
+    
+    # 3. Couleurs
+    (["couleur","color"],
+     ["COLOR SYSTEM","OUR COLORS","COLOR CODES","BACKGROUND COLORS",
+      "WEB ACCESSIBLE COLORS","COLOR USAGE"]),
+    
+    # 4. Graphiques / icônes / motifs / bannières
+    (["graphique","icône","icone","pattern","motif","bannière","banniere"],
+     ["SUPPORTING GRAPHICS","OUR ICONS","OUR PATTERNS","BANNER GRAPHIC"]),
+     
+     # 5. Photographie
+    (["photo","photograph*"],["PHOTOGRAPHY","STYLE","COMPOSITION","LIGHTING","COLOR"]),
+    
+    # 6. Valeurs / mission / vision / slogan
+    (["valeur","mission","vision","slogan","purpose"],
+     ["OUR VALUES","MISSION STATEMENT","VISION STATEMENT","OUR SLOGAN","BRAND FOUNDATION"]),
+    
+     # 7. Matériel imprimé / documents
+    (["papier","facture","newsletter","sales sheet","stationery","devis","invoice"],
+     ["BRANDED MATERIALS","STATIONERY","NEWSLETTER","INVOICE","SALES SHEET"]),
+    
+    # 8. Typographie
+    (["typographie", "typo", "font", "fonts", "police", "polices"],
+    ["TYPOGRAPHY SYSTEM", "OUR PRIMARY TYPEFACE", "OUR ACCENT TYPEFACE", "TYPOGRAPHY USAGE"]),
+
+    # 9. Personnalité de marque
+    (["personnalité", "personnalite", "brand personality", "personality"],
+    ["OUR BRAND PERSONALITY", "BRAND CHARACTERISTICS"]),
+
+    # 10. Voix & ton
+    (["voix", "le ton", "quel ton", "ton de", "tone", "voice", "style verbal", "style d'écriture", "style ecriture"],
+    ["OUR VOICE & TONE", "OUR VERBAL STYLE"]),
+
+    # 11. Style visuel (look & feel)
+    (["look", "feel", "style visuel", "visuel", "apparence"],
+    ["OUR LOOK & FEEL", "OUR VISUAL STYLE"]),
+
+    # 12. Clients / cible
+    (["client", "clients", "customer", "customers", "cible", "audience"],
+    ["OUR CUSTOMERS"]),
+
+    # 13. Localisation
+    (["localisation", "emplacement", "où est", "où se", "où sont", "situé", "adresse", "quartier",
+    "lieu", "location", "située", "se trouve", "where is", "where are"],
+    ["WEST END, LONDON", "The Landon Hotel – West End", "123 Oxford Street", "LOCAL SIGHTS"]),
+
+    # 14. Tarification / prix
+    (["tarif*", "prix", "coût", "frais",
+    "combien", "price", "prices", "pricing", "rate", "rates", "fee", "fees"],
+    ["INVOICE", "NEWSLETTER & INVOICE", "Room Charge", "Room Tax", "Occupancy Tax"]),
+]
+
+
+# typographie en tête : à score égal, elle passe avant les autres thèmes
+ROUTES = [(TYPO_KEYS, TYPO_ANCHORS)] + THEMES
+THEME_MATCHER = KeywordMatcher([keys for keys, _ in ROUTES])
+
+
+def route_themes(question: str):
+    """Thèmes (indices dans ROUTES) trouvés dans la question, du plus au moins pertinent."""
+    return [g for g, _ in THEME_MATCHER.ranked(question or "")]
+
+
+def resolve_anchors(index: SectionIndex, anchors):
+    """Ancres → ids de sections (sans doublons, ordre conservé)."""
+    out = []
+    for a in anchors:
+        sid = index.resolve(a)
+        if sid and sid not in out:
+            out.append(sid)
+    return out
+
+
+@dataclass
+class Retrieval:
+    """Tous les index d'une version du corpus ; remplacé d'un bloc au rechargement."""
+    docs: Dict[str, str]
+    bm25: BM25Index
+    sections: Dict[str, SectionIndex]
+    # doc → ([sections de chaque thème de ROUTES], sections de repli), résolus au build
+    routes: Dict[str, tuple]
+    intents: IntentRouter
+
+
+def build_retrieval(docs: Dict[str, str]) -> Retrieval:
+    sections, routes = {}, {}
+    for doc_id, text in docs.items():
+        index = SectionIndex.from_text(text)
+        sections[doc_id] = index
+        routes[doc_id] = (
+            [resolve_anchors(index, anchors) for _, anchors in ROUTES],
+            resolve_anchors(index, FALLBACK_ANCHORS)[:1],
+        )
+    bm25 = BM25Index.from_docs(docs)
+    # sujets proposés par le routeur d'intentions : les sous-sections de tous les documents
+    topics = list(dict.fromkeys(s.title for index in sections.values() for s in index.toc() if s.chapter))
+    return Retrieval(docs=docs, bm25=bm25, sections=sections, routes=routes,
+                     intents=IntentRouter(topics, THEME_MATCHER))
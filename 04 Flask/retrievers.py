@@ -0,0 +1,271 @@
+# retrievers.py
+# Stratégies de sélection du contexte, interchangeables (CONTEXT_RETRIEVER) et comparables sur le
+# trafic réel (mode « shadow ») : la stratégie principale sert la requête ; les autres sont rejouées
+# sur la même question dans un thread de fond, hors du chemin de la requête, et l'on relève pour
+# chacune la durée, les tokens de contexte et le recouvrement avec le contexte servi.
+#
+# Le sélecteur par fenêtre des scripts 02 / 03 (WindowRetriever, window_context) vit ici aussi :
+# une seule implémentation ; chaque script garde ses thèmes et sa taille de fenêtre (WINDOW_02 / WINDOW_03).
+import random
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from context_budget import SEPARATOR, Assembled, Span, assemble
+
+# (r, question, docs) → intervalles candidats ; r = index d'une version du corpus (retrieval.Retrieval)
+SpanFn = Callable[[Any, str, Optional[List[str]]], List[Span]]
+BatchFn = Callable[[Any, List[str], Optional[List[str]]], List[List[Span]]]
+
+
+class Retriever:
+    """Intervalles candidats (doc, start, end, score), puis remplissage du budget de tokens par
+    pertinence ; `fallback` prend le relais quand la stratégie ne trouve rien."""
+
+    def __init__(self, name: str, spans: SpanFn, batch: Optional[BatchFn] = None,
+                 fallback: Optional["Retriever"] = None):
+        self.name = name
+        self._spans = spans
+        self._batch = batch
+        self.fallback = fallback
+
+    def search(self, r, question: str, docs: Optional[List[str]] = None) -> Tuple[str, List[Span]]:
+        """(stratégie effective, intervalles) : "bm25_fallback" si le repli (ici BM25) a servi."""
+        return self._or_fallback(r, question, docs, self._spans(r, question, docs))
+
+    def search_batch(self, r, questions: List[str],
+                     docs: Optional[List[str]] = None) -> List[Tuple[str, List[Span]]]:
+        batch = self._batch(r, questions, docs) if self._batch else [self._spans(r, q, docs) for q in questions]
+        return [self._or_fallback(r, q, docs, spans) for q, spans in zip(questions, batch)]
+
+    def _or_fallback(self, r, question: str, docs, spans: List[Span]) -> Tuple[str, List[Span]]:
+        if spans or self.fallback is None:
+            return self.name, spans
+        return f"{self.fallback.name}_fallback", self.fallback.search(r, question, docs)[1]
+
+    def fill(self, r, spans: List[Span], budget: int, model: str = "gpt-4o-mini") -> Assembled:
+        return assemble(r.docs, spans, budget, model=model)
+
+    def retrieve(self, r, question: str, budget: int, docs: Optional[List[str]] = None,
+                 model: str = "gpt-4o-mini") -> Assembled:
+        return self.fill(r, self.search(r, question, docs)[1], budget, model)
+
+
+# --- Ancien sélecteur par fenêtre (scripts 02 / 03) ---
+@dataclass
+class WindowThemes:
+    """Règles d'un sélecteur par fenêtre : thèmes (mots-clés en sous-chaîne → ancres), fenêtre
+    autour de l'ancre (fractions de max_chars), replis, et thème « multi » à une fenêtre par ancre."""
+    themes: List[Tuple[List[str], List[str]]]
+    fallbacks: List[str] = field(default_factory=list)
+    before: float = 0.25
+    after: float = 0.5
+    multi_keys: List[str] = field(default_factory=list)
+    multi_anchors: List[str] = field(default_factory=list)
+    multi_window: Tuple[int, int] = (1500, 4500)
+
+
+# Script 02 (OpenAI direct) : 5 thèmes, 1re ancre trouvée, sinon le début du document
+WINDOW_02 = WindowThemes(themes=[
+    (["service", "équipement", "amenit"], ["OUR SERVICES", "AMENITIES"]),
+    (["logo"], ["LOGO SYSTEM", "OUR LOGO", "LOGO"]),
+    (["couleur", "color"], ["COLOR SYSTEM", "OUR COLORS"]),
+    (["typograph", "police", "font"], ["TYPOGRAPHY SYSTEM", "OUR PRIMARY TYPEFACE", "OUR ACCENT TYPEFACE"]),
+    (["valeur", "slogan", "mission", "vision"], ["OUR VALUES", "OUR SLOGAN", "MISSION STATEMENT", "VISION STATEMENT"]),
+])
+
+# Script 03 (LangChain) : typographie en plusieurs blocs, 7 thèmes, ancres de repli
+WINDOW_03 = WindowThemes(
+    themes=[
+        (["service", "commodit", "amenit", "équipement"],
+         ["OUR SERVICES & AMENITIES", "OUR SERVICES", "AMENITIES"]),
+        (["logo", "logotype", "logomark", "marque"],
+         ["LOGO SYSTEM", "OUR LOGO", "LOGOTYPE", "OUR LOGOTYPE", "LOGOMARK", "OUR LOGOMARK", "LOGO LOCK-UP",
+          "LOGO USAGE", "SECONDARY SUBMARKS", "LOGO COMPONENTS & CONSTRUCTION"]),
+        (["couleur", "color"],
+         ["COLOR SYSTEM", "OUR COLORS", "COLOR CODES", "BACKGROUND COLORS", "WEB ACCESSIBLE COLORS", "COLOR USAGE"]),
+        (["graphique", "icône", "icone", "pattern", "motif", "bannière", "banniere"],
+         ["SUPPORTING GRAPHICS", "OUR ICONS", "OUR PATTERNS", "BANNER GRAPHIC"]),
+        (["photo", "photograph"], ["PHOTOGRAPHY", "STYLE", "COMPOSITION", "LIGHTING", "COLOR"]),
+        (["valeur", "mission", "vision", "slogan", "purpose"],
+         ["OUR VALUES", "MISSION STATEMENT", "VISION STATEMENT", "OUR SLOGAN", "BRAND FOUNDATION"]),
+        (["papier", "facture", "newsletter", "sales sheet", "stationery", "devis", "invoice"],
+         ["BRANDED MATERIALS", "STATIONERY", "NEWSLETTER", "INVOICE", "SALES SHEET"]),
+    ],
+    fallbacks=["BRANDON GROTESQUE", "OUR COLORS", "OUR SERVICES", "PHOTOGRAPHY"],
+    multi_keys=["typograph", "police", "font", "typo"],
+    multi_anchors=["TYPOGRAPHY SYSTEM", "OUR PRIMARY TYPEFACE", "BRANDON GROTESQUE",
+                   "OUR ACCENT TYPEFACE", "ESSONNES", "TYPOGRAPHY USAGE"],
+)
+
+
+def window_slices(text: str, question: str, max_chars: int,
+                  rules: WindowThemes = WINDOW_03) -> List[Tuple[int, int]]:
+    """Fenêtre(s) de caractères autour de la 1re ancre du thème reconnu ; thème « multi » : une
+    fenêtre par ancre. Au plus max_chars au total (séparateurs compris)."""
+    q = (question or "").lower()
+    up = text.upper()
+    before, after = int(max_chars * rules.before), int(max_chars * rules.after)
+
+    def around(anchor: str, before: int, after: int) -> Optional[Tuple[int, int]]:
+        i = up.find(anchor.upper())
+        return None if i < 0 else (max(0, i - before), min(len(text), i + after))
+
+    if any(k in q for k in rules.multi_keys):
+        parts = [s for s in (around(a, *rules.multi_window) for a in rules.multi_anchors) if s]
+        out, room = [], max_chars
+        for start, end in parts:
+            if room <= 0:
+                break
+            out.append((start, min(end, start + room)))
+            room -= out[-1][1] - start + len(SEPARATOR)
+        if out:
+            return out
+    for keys, anchors in rules.themes:
+        if any(k in q for k in keys):
+            for a in anchors:
+                s = around(a, before, after)
+                if s:
+                    return [s]
+    for a in rules.fallbacks:
+        s = around(a, before, after)
+        if s:
+            return [s]
+    return [(0, min(len(text), max_chars))]
+
+
+def window_context(text: str, question: str, max_chars: int, rules: WindowThemes = WINDOW_03) -> str:
+    return SEPARATOR.join(text[s:e] for s, e in window_slices(text, question, max_chars, rules))
+
+
+class WindowRetriever(Retriever):
+    """Fenêtres fixes de max_chars caractères, sans budget de tokens (comportement des scripts)."""
+
+    def __init__(self, name: str, max_chars: int, rules: WindowThemes = WINDOW_03):
+        super().__init__(name, self._windows)
+        self.max_chars = max_chars
+        self.rules = rules
+
+    def _windows(self, r, question: str, docs: Optional[List[str]] = None) -> List[Span]:
+        out, room = [], self.max_chars
+        for doc in (docs or sorted(r.docs)):
+            if room <= 0:
+                break
+            slices = window_slices(r.docs[doc], question, room, self.rules)
+            room -= sum(e - s for s, e in slices)
+            out += [(doc, s, e, float(-i)) for i, (s, e) in enumerate(slices)]
+        return out
+
+    def fill(self, r, spans: List[Span], budget: int, model: str = "gpt-4o-mini") -> Assembled:
+        return assemble(r.docs, spans, sys.maxsize, model=model)
+
+
+# --- Recouvrement entre deux contextes (en caractères) ---
+def _intervals(spans) -> Dict[str, List[Tuple[int, int]]]:
+    out: Dict[str, List[Tuple[int, int]]] = {}
+    for doc, start, end, *_ in sorted(spans):
+        ivs = out.setdefault(doc, [])
+        if ivs and start <= ivs[-1][1]:
+            ivs[-1] = (ivs[-1][0], max(ivs[-1][1], end))
+        else:
+            ivs.append((start, end))
+    return out
+
+
+def overlap(primary, other) -> Tuple[float, float]:
+    """(Jaccard, rappel) : part commune / union, et part du contexte principal que l'autre couvre."""
+    a, b = _intervals(primary), _intervals(other)
+    common = 0
+    for doc, ivs in a.items():
+        others, j = b.get(doc, []), 0
+        for start, end in ivs:
+            while j < len(others) and others[j][1] <= start:
+                j += 1
+            k = j
+            while k < len(others) and others[k][0] < end:
+                common += min(end, others[k][1]) - max(start, others[k][0])
+                k += 1
+    size_a = sum(e - s for ivs in a.values() for s, e in ivs)
+    size_b = sum(e - s for ivs in b.values() for s, e in ivs)
+    union = size_a + size_b - common
+    return (common / union if union else 1.0), (common / size_a if size_a else 1.0)
+
+
+# --- Mode shadow ---
+class ShadowEvaluator:
+    """Rejoue les stratégies candidates sur un échantillon de questions, dans un thread de fond.
+    Toutes (principale comprise) sont mesurées dans ce même thread : durées comparables entre elles.
+    `record(row)` reçoit une ligne par stratégie et par question."""
+
+    def __init__(self, candidates: Dict[str, Retriever], record: Callable[[dict], None],
+                 budget: int, model: str = "gpt-4o-mini", sample: float = 1.0, max_pending: int = 64):
+        self.candidates = candidates
+        self.record = record
+        self.budget = budget
+        self.model = model
+        self.sample = sample
+        self.max_pending = max_pending     # au-delà : question ignorée (le shadow ne s'accumule pas)
+        self._start()
+
+    def _start(self) -> None:
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self.counters = {"submitted": 0, "sampled_out": 0, "dropped": 0, "errors": 0}
+
+    def after_fork(self) -> None:
+        self._start()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.candidates) and self.sample > 0
+
+    def submit(self, r, question: str, docs: Optional[List[str]], primary: Retriever, served: Assembled,
+               trace_id: Optional[str] = None) -> bool:
+        """Appelé sur le chemin de la requête : tirage, compteur, mise en file ; rien d'autre."""
+        if not self.enabled:
+            return False
+        with self._lock:
+            if random.random() >= self.sample:
+                self.counters["sampled_out"] += 1
+                return False
+            if self._pending >= self.max_pending:
+                self.counters["dropped"] += 1
+                return False
+            self._pending += 1
+            self.counters["submitted"] += 1
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._pool.submit(self._run, r, question, docs, primary, served, trace_id)
+        return True
+
+    def _run(self, r, question, docs, primary: Retriever, served: Assembled, trace_id) -> None:
+        try:
+            for name, retriever in [(primary.name, primary)] + [
+                    (n, c) for n, c in self.candidates.items() if n != primary.name]:
+                t0 = time.perf_counter()
+                built = retriever.retrieve(r, question, self.budget, docs, self.model)
+                elapsed = time.perf_counter() - t0
+                jaccard, recall = overlap(served.spans, built.spans)
+                self.record({"question": question, "trace_id": trace_id, "strategy": name,
+                             "primary_strategy": primary.name, "latency_ms": round(elapsed * 1000, 3),
+                             "context_tokens": built.tokens, "overlap": round(jaccard, 4),
+                             "recall": round(recall, 4)})
+        except Exception:
+            with self._lock:
+                self.counters["errors"] += 1
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            out = dict(self.counters)
+            out["pending"] = self._pending
+        out["sample"] = self.sample
+        return out
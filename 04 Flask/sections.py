@@ -0,0 +1,137 @@
+# sections.py
+# Index des sections du PDF extrait (pdf_text.txt), construit UNE fois au démarrage.
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# --- Motifs du sommaire ---
+# "01\t BRAND FOUNDATION  //  3"  (CONTENTS)
+CHAPTER_RE = re.compile(r"^(0\d)\s+([^/\n]+?)\s*//\s*(\d+)", re.M)
+# "1.1\t OUR SERVICES & AMENITIES  //  4"  (IN THIS SECTION, parfois sur 2 lignes)
+SUBSECTION_RE = re.compile(r"(\d\.\d)\s+[\x07\x08]?([^/\n]+(?:\n[^/\n]+)?)\s*//\s*(\d+)")
+# Pied de page : numéro de sous-section ("4.2") ou numéro de page ("22")
+FOOTER_SUB_RE = re.compile(r"^\d\.\d$")
+FOOTER_PAGE_RE = re.compile(r"^\d{1,3}$")
+# Bloc de sommaire regroupé par le nettoyage (boilerplate.py) : lu pour les titres, hors sections
+TOC_HEADER = "CONTENTS:"
+
+
+def is_toc_block(part: str) -> bool:
+    return part.lstrip().startswith(TOC_HEADER + "\n")
+
+
+def clean_title(s: str) -> str:
+    """Titre normalisé (majuscules, espaces simples, sans caractères de contrôle)."""
+    s = unicodedata.normalize("NFKC", s)
+    s = "".join(ch for ch in s if ch.isprintable() or ch.isspace())
+    return " ".join(s.split()).upper()
+
+
+@dataclass
+class Section:
+    id: str                      # "03" (chapitre), "3.2" (sous-section), "intro"
+    title: str
+    page: Optional[int]
+    start: int                   # offsets dans le texte complet
+    end: int
+    chapter: Optional[str] = None
+    children: List[str] = field(default_factory=list)
+
+
+class SectionIndex:
+    """Découpe le texte en sections (chapitres + sous-sections) avec offsets, titre et page."""
+
+    def __init__(self, text: str, sections: List[Section]):
+        self.text = text
+        self.sections: Dict[str, Section] = {s.id: s for s in sections}
+        self.order: List[str] = [s.id for s in sections]
+        self.by_title: Dict[str, str] = {clean_title(s.title): s.id for s in sections}
+        self._upper = text.upper()
+
+    # --- Construction ---
+    @classmethod
+    def from_text(cls, text: str) -> "SectionIndex":
+        chapters = {num: (clean_title(t), int(p)) for num, t, p in CHAPTER_RE.findall(text)}
+        subs = {num: (clean_title(t), int(p)) for num, t, p in SUBSECTION_RE.findall(text)}
+        chapter_by_page = {p: num for num, (_, p) in chapters.items()}
+
+        # Blocs = pages logiques (l'extraction sépare les pages par une ligne vide)
+        blocks = []
+        pos = 0
+        for part in text.split("\n\n"):
+            blocks.append((pos, pos + len(part), part))
+            pos += len(part) + 2
+
+        sections: List[Section] = []
+        current_chapter: Optional[Section] = None
+        for start, end, part in blocks:
+            lines = [ln.strip() for ln in part.strip().splitlines() if ln.strip()]
+            if not lines or is_toc_block(part):
+                continue
+            footer = lines[-1]
+            sec = None
+            if FOOTER_SUB_RE.match(footer) and footer in subs:
+                title, page = subs[footer]
+                chap = "0" + footer.split(".")[0]
+                sec = Section(id=footer, title=title, page=page, start=start, end=end, chapter=chap)
+                if current_chapter is not None and current_chapter.id == chap:
+                    current_chapter.children.append(sec.id)
+            elif FOOTER_PAGE_RE.match(footer) and int(footer) in chapter_by_page:
+                num = chapter_by_page[int(footer)]
+                title, page = chapters[num]
+                sec = Section(id=num, title=title, page=page, start=start, end=end)
+                current_chapter = sec
+            elif not sections:
+                page = int(footer) if FOOTER_PAGE_RE.match(footer) else None
+                sec = Section(id="intro", title="INTRODUCTION", page=page, start=start, end=end)
+            else:
+                # bloc non reconnu : rattaché à la section précédente
+                sections[-1].end = end
+                continue
+            sections.append(sec)
+        return cls(text, sections)
+
+    # --- Accès ---
+    def get(self, sid: str) -> Optional[Section]:
+        return self.sections.get(sid)
+
+    def containing(self, offset: int) -> Optional[Section]:
+        """Sous-section (la plus fine) qui contient l'offset donné."""
+        best = None
+        for sid in self.order:
+            s = self.sections[sid]
+            if s.start <= offset < s.end and (best is None or s.end - s.start < best.end - best.start):
+                best = s
+        return best
+
+    def overlapping(self, start: int, end: int) -> List[Section]:
+        """Sections qui recouvrent [start, end), dans l'ordre du document."""
+        return [s for s in (self.sections[sid] for sid in self.order) if s.start < end and start < s.end]
+
+    def resolve(self, anchor: str) -> Optional[str]:
+        """Ancre → id de section : titre exact d'abord, sinon section qui contient l'ancre."""
+        key = clean_title(anchor)
+        if key in self.by_title:
+            return self.by_title[key]
+        i = self._upper.find(anchor.upper())
+        if i == -1:
+            return None
+        s = self.containing(i)
+        return s.id if s else None
+
+    def spans(self, sids: List[str]) -> List[Tuple[int, int]]:
+        """Offsets (start, end) des sections, un chapitre étant développé en intro + sous-sections."""
+        out: List[Tuple[int, int]] = []
+        for sid in sids:
+            s = self.sections.get(sid)
+            if s is None:
+                continue
+            for cid in [sid] + s.children:
+                c = self.sections[cid]
+                if (c.start, c.end) not in out:
+                    out.append((c.start, c.end))
+        return out
+
+    def toc(self) -> List[Section]:
+        return [self.sections[sid] for sid in self.order]
@@ -0,0 +1,212 @@
+# serve.py
+# Démarrage « production » multi-processus (Linux / macOS ; sous Windows : un seul processus) :
+#  - le maître importe app.py UNE fois (corpus, index BM25 / vectoriel, sections, prompt, client LLM),
+#  - puis forke N workers qui partagent ces données en copy-on-write ; gc.freeze() évite que le
+#    ramasse-miettes ne réécrive (et donc ne duplique) les pages héritées,
+#  - redémarrage progressif, un worker à la fois, sur SIGHUP ou quand le corpus change sur disque
+#    (le maître recharge le corpus, les nouveaux workers en héritent),
+#  - arrêt propre sur SIGTERM / Ctrl-C : les requêtes en cours se terminent (GRACEFUL_TIMEOUT).
+#  - imports lourds (langchain, openai, SQLAlchemy) chargés par le maître avant le fork (partagés) ;
+#    --fast-start : fork immédiat, chaque worker les charge en tâche de fond (/health répond aussitôt).
+#
+# Usage :
+#   python serve.py --workers 4 --port 8000
+#   python serve.py --workers 2 --fast-start
+#   kill -HUP <pid du maître>     # rechargement sans coupure
+#   kill -USR1 <pid du maître>    # mémoire de chaque worker (RSS / PSS)
+import argparse
+import gc
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# le maître surveille le corpus lui-même : pas de thread de surveillance dans app.py
+CORPUS_POLL = float(os.getenv("CORPUS_POLL", "2"))
+os.environ["CORPUS_POLL"] = "0"
+os.environ["WARMUP"] = "0"   # préchauffage piloté ici (avant le fork, ou dans chaque worker)
+
+
+def memory_mb(pid: int) -> Optional[Tuple[float, float]]:
+    """(RSS, PSS) en Mo d'après /proc (Linux) ; PSS compte les pages partagées au prorata."""
+    try:
+        text = Path(f"/proc/{pid}/smaps_rollup").read_text()
+    except OSError:
+        return None
+    kb = {ln.split(":")[0]: int(ln.split()[1]) for ln in text.splitlines()[1:] if ln.split()[1:2]}
+    return kb.get("Rss", 0) / 1024, kb.get("Pss", 0) / 1024
+
+
+# --- Worker (processus enfant) ---
+def run_worker(flask_app, server, worker: int, workers: int, warm: bool = False) -> int:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # Ctrl-C : c'est le maître qui arrête tout le monde
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    # shutdown() attend la fin de serve_forever : à lancer hors du gestionnaire de signal
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    flask_app.post_fork(worker, workers)
+    if warm:
+        threading.Thread(target=flask_app.warm_up, name="warm-up", daemon=True).start()
+    server.daemon_threads = False   # server_close() attend les requêtes en cours
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        flask_app.QUERY_LOG.close()   # os._exit() saute atexit : on vide le journal ici
+    return 0
+
+
+# --- Maître ---
+class Master:
+    def __init__(self, flask_app, server, workers: int, graceful_timeout: float, poll: float,
+                 fast_start: bool = False):
+        self.app = flask_app
+        self.server = server
+        self.n = workers
+        self.graceful_timeout = graceful_timeout
+        self.poll = poll
+        self.fast_start = fast_start          # préchauffage dans les workers plutôt que dans le maître
+        self.workers: Dict[int, int] = {}     # pid → n° de worker
+        self.retiring: Dict[int, int] = {}    # pid → n° (arrêt demandé, ne pas relancer)
+        self._signal: Optional[int] = None
+
+    def spawn(self, worker: int) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = run_worker(self.app, self.server, worker, self.n, warm=self.fast_start)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        self.workers[pid] = worker
+        return pid
+
+    def freeze(self) -> None:
+        """Tout ce qui existe avant le fork passe en génération permanente (pages jamais réécrites par le GC)."""
+        gc.collect()
+        gc.freeze()
+
+    def reap(self, block: bool = False) -> None:
+        while self.workers or self.retiring:
+            try:
+                pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.retiring.pop(pid, None) is not None:
+                continue
+            worker = self.workers.pop(pid, None)
+            if worker is not None:
+                print(f"❌ worker {worker} (pid {pid}) arrêté (statut {status}), relance")
+                time.sleep(0.5)   # évite une boucle de relance trop rapide si le worker plante au démarrage
+                self.spawn(worker)
+
+    def retire(self, pid: int) -> None:
+        """SIGTERM, attente de la fin des requêtes en cours, SIGKILL au-delà du délai."""
+        self.retiring[pid] = self.workers.pop(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + self.graceful_timeout
+        while pid in self.retiring and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        if pid in self.retiring:
+            print(f"⚠️  worker pid {pid} toujours actif après {self.graceful_timeout:.0f}s : SIGKILL")
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.retiring.pop(pid, None)
+
+    def rolling_restart(self) -> None:
+        """Un worker à la fois : le remplaçant démarre avant l'arrêt de l'ancien (capacité constante)."""
+        self.freeze()
+        for pid, worker in list(self.workers.items()):
+            self.spawn(worker)
+            self.retire(pid)
+        print(f"🔄 {self.n} workers redémarrés (corpus v{self.app.CORPUS.version})")
+
+    def report_memory(self) -> None:
+        rows = [("maître", os.getpid())] + [(f"worker {w}", pid) for pid, w in sorted(self.workers.items())]
+        for name, pid in rows:
+            mem = memory_mb(pid)
+            if mem:
+                print(f"   {name:<10} pid {pid:<7} RSS {mem[0]:7.1f} Mo   PSS {mem[1]:7.1f} Mo")
+
+    def _on_signal(self, signum, _frame) -> None:
+        self._signal = signum
+
+    def run(self) -> None:
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGUSR1):
+            signal.signal(sig, self._on_signal)
+        self.freeze()
+        for worker in range(self.n):
+            self.spawn(worker)
+        host, port = self.server.server_address[:2]
+        print(f"✅ http://{host}:{port} — maître pid {os.getpid()}, {self.n} workers")
+
+        next_poll = time.monotonic() + self.poll
+        while True:
+            time.sleep(0.2)
+            sig, self._signal = self._signal, None
+            if sig in (signal.SIGTERM, signal.SIGINT):
+                break
+            if sig == signal.SIGUSR1:
+                self.report_memory()
+            check = sig == signal.SIGHUP
+            if self.poll > 0 and time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + self.poll
+                check = True
+            # SIGHUP : redémarrage même si le corpus n'a pas changé
+            if check and (self.app.CORPUS.reload() or sig == signal.SIGHUP):
+                self.rolling_restart()
+            self.reap()
+
+        print("⏹️  arrêt : fin des requêtes en cours…")
+        for pid in list(self.workers):
+            self.retiring[pid] = self.workers.pop(pid)
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.retiring and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in list(self.retiring):
+            os.kill(pid, signal.SIGKILL)
+        self.reap(block=True)
+        self.server.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serveur multi-processus (préchargement + fork).")
+    ap.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    ap.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", str(os.cpu_count() or 2))))
+    ap.add_argument("--graceful-timeout", type=float, default=float(os.getenv("GRACEFUL_TIMEOUT", "30")))
+    ap.add_argument("--fast-start", action="store_true",
+                    help="forker sans attendre les imports lourds (chaque worker les charge en tâche de fond)")
+    args = ap.parse_args()
+
+    import app as flask_app
+    from werkzeug.serving import make_server
+
+    if not args.fast_start:
+        flask_app.warm_up()
+        print(f"⏱️  Préchauffage : {flask_app.STARTUP['warm_up_ms']} ms")
+
+    if not hasattr(os, "fork"):
+        print("⚠️  fork indisponible (Windows) : un seul processus")
+        flask_app.app.run(host=args.host, port=args.port, threaded=True)
+        return
+    server = make_server(args.host, args.port, flask_app.app, threaded=True)
+    Master(flask_app, server, max(1, args.workers), args.graceful_timeout, CORPUS_POLL, args.fast_start).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
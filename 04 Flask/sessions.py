@@ -0,0 +1,150 @@
+# sessions.py
+# Mémoire de conversation bornée, par session (cookie / id) :
+#  - enregistrements compacts (__slots__), éviction LRU + TTL + plafond mémoire global,
+#  - au-delà d'un budget de tokens, les plus anciens échanges sont condensés dans un résumé
+#    glissant (extractif, local : pas d'appel LLM), lui-même plafonné.
+# La taille de l'historique injecté dans le prompt reste donc constante, quelle que soit
+# la longueur de la conversation.
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Optional, Tuple
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+class _Turn:
+    __slots__ = ("question", "answer", "tokens")
+
+    def __init__(self, question: str, answer: str, tokens: int):
+        self.question = question
+        self.answer = answer
+        self.tokens = tokens
+
+
+class _Session:
+    __slots__ = ("turns", "summary", "summary_tokens", "turn_tokens", "chars", "touched")
+
+    def __init__(self, now: float):
+        self.turns: deque = deque()
+        self.summary: deque = deque()    # lignes du résumé glissant (les plus anciennes d'abord)
+        self.summary_tokens = 0
+        self.turn_tokens = 0
+        self.chars = 0
+        self.touched = now
+
+
+def gist(question: str, answer: str, max_chars: int = 160) -> str:
+    """Une ligne de résumé : la question et la 1re phrase de la réponse."""
+    first = SENTENCE_END_RE.split(" ".join(answer.split()), maxsplit=1)[0]
+    line = f"- {' '.join(question.split())} → {first}"
+    return line if len(line) <= max_chars else line[:max_chars - 1] + "…"
+
+
+class ConversationStore:
+    def __init__(self, count_tokens: Callable[[str], int], ttl: float = 1800.0,
+                 max_sessions: int = 10_000, max_chars: int = 20_000_000,
+                 history_budget: int = 600, summary_budget: int = 250, answer_chars: int = 1200):
+        self.count = count_tokens
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_chars = max_chars                # plafond global (≈ octets) de toutes les sessions
+        self.history_budget = history_budget      # tokens des derniers échanges gardés tels quels
+        self.summary_budget = summary_budget      # tokens du résumé glissant
+        self.answer_chars = answer_chars          # réponse tronquée à l'enregistrement
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._chars = 0
+        self.counters = {"created": 0, "evicted_lru": 0, "evicted_ttl": 0, "summarized_turns": 0}
+
+    @staticmethod
+    def new_id() -> str:
+        return secrets.token_urlsafe(16)
+
+    # --- Lecture ---
+    def history(self, sid: str) -> Tuple[str, Optional[str]]:
+        """(historique à injecter dans le prompt, dernière question) ; ("", None) si rien."""
+        now = time.time()
+        with self._lock:
+            s = self._sessions.get(sid)
+            if s is None or s.touched + self.ttl < now:
+                return "", None
+            self._sessions.move_to_end(sid)
+            s.touched = now
+            parts = []
+            if s.summary:
+                parts.append("Résumé des échanges précédents :\n" + "\n".join(s.summary))
+            if s.turns:
+                parts.append("Derniers échanges :\n" + "\n".join(
+                    f"Utilisateur : {t.question}\nMr. Landon : {t.answer}" for t in s.turns))
+            return "\n\n".join(parts), (s.turns[-1].question if s.turns else None)
+
+    # --- Écriture ---
+    def record(self, sid: str, question: str, answer: str) -> None:
+        answer = answer if len(answer) <= self.answer_chars else answer[:self.answer_chars] + "…"
+        tokens = self.count(question) + self.count(answer) + 8
+        now = time.time()
+        with self._lock:
+            s = self._sessions.get(sid)
+            if s is None or s.touched + self.ttl < now:
+                if s is not None:
+                    self._drop(sid)
+                s = self._sessions[sid] = _Session(now)
+                self.counters["created"] += 1
+            self._sessions.move_to_end(sid)
+            s.touched = now
+            s.turns.append(_Turn(question, answer, tokens))
+            s.turn_tokens += tokens
+            self._resize(s, len(question) + len(answer))
+            self._compress(s)
+            self._evict(now)
+
+    def reset(self, sid: str) -> None:
+        with self._lock:
+            if sid in self._sessions:
+                self._drop(sid)
+
+    # --- Interne (verrou tenu) ---
+    def _resize(self, s: _Session, delta: int) -> None:
+        s.chars += delta
+        self._chars += delta
+
+    def _compress(self, s: _Session) -> None:
+        """Échanges au-delà du budget → lignes de résumé ; résumé au-delà du sien → lignes oubliées."""
+        while s.turn_tokens > self.history_budget and len(s.turns) > 1:
+            t = s.turns.popleft()
+            s.turn_tokens -= t.tokens
+            line = gist(t.question, t.answer)
+            s.summary.append(line)
+            s.summary_tokens += self.count(line)
+            self._resize(s, len(line) - len(t.question) - len(t.answer))
+            self.counters["summarized_turns"] += 1
+        while s.summary_tokens > self.summary_budget and s.summary:
+            line = s.summary.popleft()
+            s.summary_tokens -= self.count(line)
+            self._resize(s, -len(line))
+
+    def _drop(self, sid: str) -> None:
+        s = self._sessions.pop(sid)
+        self._chars -= s.chars
+
+    def _evict(self, now: float) -> None:
+        # les plus anciennes sont en tête : on s'arrête à la première session encore valide
+        while self._sessions:
+            sid, s = next(iter(self._sessions.items()))
+            if s.touched + self.ttl < now:
+                self._drop(sid)
+                self.counters["evicted_ttl"] += 1
+            elif len(self._sessions) > self.max_sessions or self._chars > self.max_chars:
+                self._drop(sid)
+                self.counters["evicted_lru"] += 1
+            else:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self.counters)
+            out.update(sessions=len(self._sessions), chars=self._chars, max_sessions=self.max_sessions)
+        return out
@@ -0,0 +1,136 @@
+# singleflight.py
+# Coalescence des requêtes identiques en vol : un seul appel amont par clé,
+# les doublons concurrents attendent et partagent le résultat (ou l'erreur).
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class FlightTimeout(TimeoutError):
+    """L'appel partagé n'a pas répondu dans le délai du suiveur."""
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class _Stream:
+    __slots__ = ("cond", "chunks", "done", "error", "subscribers")
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks: List = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+
+
+class SingleFlight:
+    def __init__(self, timeout: Optional[float] = 60.0):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Stream] = {}
+        self.leaders = 0
+        self.joined = 0
+
+    # --- Appel simple (réponse complète) ---
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.joined += 1
+
+        if leader:
+            try:
+                call.result = fn()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.event.set()
+
+        if not call.event.wait(self.timeout):
+            raise FlightTimeout(f"single-flight: pas de réponse après {self.timeout}s")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    # --- Flux (streaming) ---
+    def stream(self, key: str, factory: Callable[[], Iterator[T]]) -> Iterator[T]:
+        """Les arrivants tardifs reçoivent d'abord le préfixe déjà généré, puis suivent le flux."""
+        with self._lock:
+            st = self._streams.get(key)
+            if st is None:
+                st = self._streams[key] = _Stream()
+                st.subscribers = 1
+                self.leaders += 1
+                threading.Thread(target=self._produce, args=(key, st, factory),
+                                 name="singleflight-stream", daemon=True).start()
+            else:
+                with st.cond:
+                    st.subscribers += 1
+                self.joined += 1
+
+        i = 0
+        try:
+            while True:
+                with st.cond:
+                    while i >= len(st.chunks) and not st.done:
+                        if not st.cond.wait(self.timeout):
+                            raise FlightTimeout(f"single-flight: flux muet depuis {self.timeout}s")
+                    batch = st.chunks[i:]
+                    i += len(batch)
+                    if not batch and st.done:
+                        if st.error is not None:
+                            raise st.error
+                        return
+                yield from batch
+        finally:
+            with st.cond:
+                st.subscribers -= 1
+
+    def _produce(self, key: str, st: _Stream, factory: Callable[[], Iterator[T]]) -> None:
+        gen = factory()
+        try:
+            for item in gen:
+                with st.cond:
+                    st.chunks.append(item)
+                    st.cond.notify_all()
+                    if st.subscribers == 0:
+                        # plus personne n'écoute : on interrompt l'appel amont
+                        st.error = RuntimeError("single-flight: flux abandonné par ses clients")
+                        break
+        except BaseException as e:
+            st.error = e
+        finally:
+            close = getattr(gen, "close", None)
+            if close is not None:
+                close()
+            with self._lock:
+                self._streams.pop(key, None)
+            with st.cond:
+                st.done = True
+                st.cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "joined": self.joined,
+                "inflight_calls": len(self._calls),
+                "inflight_streams": len(self._streams),
+            }
@@ -0,0 +1,37 @@
+# conftest.py
+# L'app est importée une fois, sans effets de bord sur les fichiers du dépôt : cache de réponses
+# et journal des questions dans un dossier temporaire, pas d'instantané du corpus, pas de rechargement.
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+FLASK_DIR = Path(__file__).resolve().parents[1]
+TMP = Path(tempfile.mkdtemp(prefix="landon-tests-"))
+
+os.environ.update(
+    ANSWER_CACHE_URL=f"sqlite:///{TMP / 'answer_cache.sqlite3'}",
+    QUERY_LOG="0",
+    QUERY_LOG_URL=f"sqlite:///{TMP / 'query_log.sqlite3'}",
+    CORPUS_SNAPSHOT="off",
+    CORPUS_POLL="0",
+    WARMUP="0",
+)
+sys.path.insert(0, str(FLASK_DIR))
+
+
+@pytest.fixture(scope="session")
+def app():
+    import app as flask_app
+    return flask_app
+
+
+@pytest.fixture(scope="session")
+def labels(app):
+    """Intervalles → ids des sections qu'ils recouvrent."""
+    def run(spans):
+        index = app.CORPUS.current.sections
+        return {s.id for doc, start, end, *_ in spans for s in index[doc].overlapping(start, end)}
+    return run
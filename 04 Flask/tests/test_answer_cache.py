@@ -0,0 +1,63 @@
+from answer_cache import AnswerCache
+
+
+def test_row_cap_without_count_on_every_write(tmp_path):
+    import sqlalchemy as sa
+
+    cache = AnswerCache(f"sqlite:///{tmp_path / 'cache.sqlite3'}", max_memory=4, max_rows=50)
+    counts = []
+    sa.event.listen(cache.engine, "before_cursor_execute",
+                    lambda conn, cursor, sql, *a: counts.append(sql) if "count(" in sql.lower() else None)
+    for i in range(200):
+        cache.put(f"k{i}", "réponse")
+    with cache.engine.connect() as conn:
+        rows = conn.execute(sa.text("SELECT COUNT(*) FROM answers")).scalar_one()
+    assert rows <= 50
+    assert len(counts) < 200 // 4
+    assert cache.get("k199") == "réponse"
+
+
+def make(tmp_path, **kw):
+    return AnswerCache(f"sqlite:///{tmp_path / 'cache.sqlite3'}", **kw)
+
+
+def rows(cache):
+    import sqlalchemy as sa
+
+    with cache.engine.connect() as conn:
+        return set(conn.execute(sa.text("SELECT key FROM answers")).scalars())
+
+
+def test_ttl_expiry_in_memory_and_on_disk(tmp_path):
+    import time
+
+    cache = make(tmp_path, ttl=0.05)
+    cache.put("k", "réponse")
+    assert cache.get("k") == "réponse"
+    time.sleep(0.1)
+    assert cache.get("k") is None            # mémoire puis SQLite : expirée des deux côtés
+    assert rows(cache) == set()
+    cache.put("a", "x")
+    time.sleep(0.1)
+    assert cache.purge_expired() == 1 and rows(cache) == set()
+
+
+def test_memory_lru_keeps_most_recent(tmp_path):
+    cache = make(tmp_path, max_memory=2)
+    for k in ("a", "b"):
+        cache.put(k, k)
+    cache.get("a")                           # "a" redevient la plus récente
+    cache.put("c", "c")
+    assert list(cache._mem) == ["a", "c"]
+    assert cache.get("b") == "b"             # toujours servie par SQLite
+    assert cache.stats()["hits_db"] == 1
+
+
+def test_disk_lru_evicts_least_recently_served(tmp_path):
+    cache = make(tmp_path, max_memory=1, max_rows=10)
+    for i in range(10):
+        cache.put(f"k{i}", "x")
+    assert cache.get("k0") == "x"            # servie par SQLite : last_hit rafraîchi
+    cache.put("new", "x")
+    kept = rows(cache)
+    assert len(kept) <= 10 and {"k0", "new"} <= kept and "k1" not in kept
@@ -0,0 +1,25 @@
+import re
+from pathlib import Path
+
+from boilerplate import strip_boilerplate
+from sections import TOC_HEADER, is_toc_block
+
+PDF_TEXT = Path(__file__).resolve().parents[2] / "01 Collecte et préparation des données PDF" / "pdf_text.txt"
+TOC_LINE_RE = re.compile(r"//\s*\d+\s*$", re.M)
+
+
+def test_wrapped_toc_title_is_pulled():
+    raw = ("LOGO SYSTEM\nIN THIS SECTION:\n3.1\t OUR LOGO // 14\n3.2\t LOGO COMPONENTS \n"
+           "& CONSTRUCTION // 15\n3.3\t OUR LOGOMARK // 16\nActing as the single most recognizable identifier.\n13\n")
+    text, report = strip_boilerplate(raw)
+    toc, body = text.split("\n\n", 1)
+    assert toc.startswith(TOC_HEADER)
+    assert "3.2\t LOGO COMPONENTS & CONSTRUCTION  //  15" in toc
+    assert report.toc_entries == 3
+    assert not TOC_LINE_RE.search(body)
+
+
+def test_no_toc_line_outside_contents_block():
+    parts = PDF_TEXT.read_text(encoding="utf-8").split("\n\n")
+    leftovers = [m for part in parts if not is_toc_block(part) for m in TOC_LINE_RE.findall(part)]
+    assert leftovers == []
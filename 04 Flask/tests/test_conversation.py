@@ -0,0 +1,46 @@
+# Relances : une question courte ouverte par un connecteur (« Et pour… ») ou sans sujet propre
+# reprend la question précédente ; les autres partent sans historique.
+import pytest
+
+STANDALONE = ["Quelles sont vos couleurs ?", "Parle-moi de la typographie"]
+
+
+@pytest.fixture
+def after_logo(app):
+    sid = app.MEMORY.new_id()
+    app.MEMORY.record(sid, "Parle-moi du logo", "Notre logo associe un logotype et un logomark.")
+    yield sid
+    app.MEMORY.reset(sid)
+
+
+@pytest.mark.parametrize("question", STANDALONE)
+def test_standalone_question_is_not_a_followup(app, labels, after_logo, question):
+    history, query = app.conversation(after_logo, question)
+    assert (history, query) == ("", None)
+    ctx, key = app.prepare(question, None, None, history, query)
+    alone = app.build_context(question)
+    assert ctx == alone.text
+    # même clé qu'un 1er message : cache, single-flight et réponses pré-calculées servent
+    assert key == app.AnswerCache.make_key(question, alone.text, app.MODEL_NAME, app.system_rules)
+
+
+def test_short_followup_reuses_previous_question(app, after_logo):
+    history, query = app.conversation(after_logo, "Et en anglais ?")
+    assert "Parle-moi du logo" in history
+    assert query == "Parle-moi du logo Et en anglais ?"
+
+
+def test_themed_followup_carries_history(app):
+    sid = app.MEMORY.new_id()
+    app.MEMORY.record(sid, "Quelles sont vos couleurs ?", "Bleu marine et or.")
+    try:
+        question = "Et pour le logo ?"
+        history, query = app.conversation(sid, question)
+        assert "Quelles sont vos couleurs ?" in history
+        assert query == "Quelles sont vos couleurs ? Et pour le logo ?"
+        # l'historique injecté entre dans la clé : pas de réponse partagée avec un 1er message
+        ctx, key = app.prepare(question, None, None, history, query)
+        first = app.prepare(question, None, None, "", None)[1]
+        assert key != first
+    finally:
+        app.MEMORY.reset(sid)
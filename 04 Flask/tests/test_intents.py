@@ -0,0 +1,40 @@
+# Routeur d'intentions : seul le clairement hors sujet est refusé localement.
+import pytest
+
+IN_SCOPE = [
+    "Avez-vous une salle de sport ?",
+    "Peut-on venir avec un chien ?",
+    "Puis-je garer ma voiture ?",
+    "Est-ce que le musée est loin ?",
+    "À quelle heure est le petit-déjeuner ?",
+    "Quel est le code couleur du logo ?",
+    "Bonjour, quelles sont vos couleurs ?",
+]
+OFF_TOPIC = [
+    "Quelle heure est-il ?",
+    "Quel temps fait-il à Londres ?",
+    "What's the weather like today?",
+    "Quelle est la capitale de l'Australie ?",
+    "Raconte-moi une blague",
+]
+
+
+@pytest.fixture
+def router(app):
+    return app.CORPUS.current.intents
+
+
+@pytest.mark.parametrize("question", IN_SCOPE)
+def test_in_scope_questions_reach_the_llm(app, router, question):
+    assert router.classify(question) is None
+    assert app.route_intent(question) is None
+
+
+@pytest.mark.parametrize("question", OFF_TOPIC)
+def test_clearly_off_topic_questions_are_answered_locally(router, question):
+    assert router.classify(question).name == "out_of_scope"
+
+
+def test_small_talk(router):
+    assert router.classify("Bonjour !").name == "greeting"
+    assert router.classify("Merci beaucoup").name == "thanks"
@@ -0,0 +1,122 @@
+# Boucle LLM partagée : admission (503 + Retry-After), délais, propagation des erreurs ; faux LLM.
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from llm_runtime import LLMRuntime, Saturated
+
+
+def blocker(runtime: LLMRuntime):
+    """Occupe une place de la boucle jusqu'à release.set() ; renvoie (release, thread)."""
+    release, started = threading.Event(), threading.Event()
+
+    async def slow():
+        started.set()
+        while not release.is_set():
+            await asyncio.sleep(0.005)
+        return "lent"
+
+    t = threading.Thread(target=runtime.run, args=(slow,), daemon=True)
+    t.start()
+    assert started.wait(2)
+    return release, t
+
+
+async def answer(text="ok"):
+    return text
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    rt = LLMRuntime(max_inflight=1, max_queue=0, retry_after=7)
+    release, t = blocker(rt)
+    with pytest.raises(Saturated) as e:
+        rt.run(answer)
+    assert e.value.retry_after == 7 and rt.stats()["rejected"] == 1
+    release.set(); t.join(2)
+    assert rt.run(answer) == "ok"
+
+
+def test_waiting_too_long_for_a_slot_is_rejected():
+    rt = LLMRuntime(max_inflight=1, max_queue=1, queue_timeout=0.05)
+    release, t = blocker(rt)
+    with pytest.raises(Saturated):
+        rt.run(answer)
+    release.set(); t.join(2)
+    assert rt.stats()["queued"] == 0
+
+
+def test_timeout_cancels_the_call_and_frees_the_slot():
+    rt = LLMRuntime(max_inflight=1, max_queue=0)
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        rt.run(hang, timeout=0.05)
+    assert cancelled.wait(2)
+    assert rt.run(answer) == "ok"            # la place est rendue
+
+
+def test_errors_propagate_to_the_caller():
+    rt = LLMRuntime()
+
+    async def boom():
+        raise ValueError("amont")
+
+    async def stream():
+        yield "a"
+        raise ValueError("coupé")
+
+    with pytest.raises(ValueError, match="amont"):
+        rt.run(boom)
+    it = rt.iterate(stream)
+    assert next(it) == "a"
+    with pytest.raises(ValueError, match="coupé"):
+        next(it)
+    stats = rt.stats()
+    assert (stats["inflight"], stats["queued"]) == (0, 0)
+
+
+# --- Côté HTTP : faux LLM branché à la place d'OpenAI ---
+@pytest.fixture
+def fake_llm(app, monkeypatch):
+    monkeypatch.setattr(app, "get_llm", lambda: None)
+    app.ANSWER_CACHE.clear()
+
+    def use(fn):
+        monkeypatch.setattr(app, "invoke_llm", fn)
+    return use
+
+
+def test_saturated_runtime_answers_503_with_retry_after(app, fake_llm, monkeypatch):
+    rt = LLMRuntime(max_inflight=1, max_queue=0, retry_after=3)
+    monkeypatch.setattr(app, "RUNTIME", rt)
+    release, t = blocker(rt)
+    try:
+        resp = app.app.test_client().post("/chatbot", json={"question": "Quelles sont vos couleurs ?"})
+    finally:
+        release.set(); t.join(2)
+    assert resp.status_code == 503 and resp.headers["Retry-After"] == "3"
+
+
+def test_deadline_and_errors_map_to_http_statuses(app, fake_llm):
+    client = app.app.test_client()
+
+    async def late(messages, est):
+        raise app.DeadlineExceeded("trop long")
+
+    async def broken(messages, est):
+        raise RuntimeError("panne")
+
+    fake_llm(late)
+    assert client.post("/chatbot", json={"question": "Quelles sont vos couleurs ?"}).status_code == 504
+    fake_llm(broken)
+    resp = client.post("/chatbot", json={"question": "Parle-moi du logo"})
+    assert resp.status_code == 500 and resp.get_json()["trace_id"]
@@ -0,0 +1,61 @@
+# Questions de référence : question → section attendue dans le contexte du retriever par défaut.
+import pytest
+
+GOLDEN = [
+    ("Quelles sont vos couleurs ?", "4.1"),
+    ("Quel ton utilisez-vous ?", "2.2"),
+    ("Parle-moi de la typographie", "5.1"),
+    ("Parle-moi du logo", "3.1"),
+    ("Où se trouve l'hôtel ?", "8.1"),
+    ("Quels services proposez-vous ?", "1.1"),
+    ("Qui sont vos clients ?", "1.2"),
+]
+
+
+@pytest.mark.parametrize("question,expected", GOLDEN)
+def test_golden_sections(app, labels, question, expected):
+    assert expected in labels(app.build_context(question).spans)
+
+
+def test_colors_stay_in_color_chapter(app, labels):
+    assert {s.split(".")[0] for s in labels(app.build_context("Quelles sont vos couleurs ?").spans)} <= {"04", "4"}
+
+
+def test_tone_is_one_section(app, labels):
+    assert labels(app.build_context("Quel ton utilisez-vous ?").spans) == {"2.2"}
+
+
+def test_two_themes_share_the_budget(app, labels):
+    # logo (ch. 3) et couleurs (ch. 4) sont voisins : ni fusionnés en un bloc, ni l'un évincé par l'autre
+    chapters = {s.split(".")[0].lstrip("0") for s in labels(app.build_context("Parle-moi du logo et des couleurs").spans)}
+    assert {"3", "4"} <= chapters
+
+
+def test_adjacent_sections_are_not_merged():
+    from context_budget import merge_spans
+
+    spans = [("d", 0, 10, 1.0), ("d", 12, 20, 2.0), ("d", 20, 30, 0.5), ("d", 25, 40, 0.0)]
+    assert merge_spans(spans) == [("d", 0, 10, 1.0), ("d", 12, 40, 2.0)]
+
+
+def test_question_without_theme_falls_back_to_bm25(app):
+    used, spans = app.SECTIONS.search(app.CORPUS.current, "Quels sont les horaires du spa ?")
+    assert used == "bm25_fallback" and spans
+
+
+def test_matched_sections_lists_every_overlapped_section(app):
+    index = app.CORPUS.current.sections["pdf_text"]
+    chapter, sub = index.get("01"), index.get("1.1")
+    assert app.matched_sections([("pdf_text", chapter.start, sub.end)]) == ["pdf_text:01", "pdf_text:1.1"]
+
+
+def test_script_window_rules_stay_distinct():
+    from retrievers import WINDOW_02, WINDOW_03, window_slices
+
+    text = "INTRO " * 2000 + "TYPOGRAPHY SYSTEM " + "x " * 2000 + "BRANDON GROTESQUE " + "y " * 2000
+    # script 02 : une seule fenêtre autour de la 1re ancre, pas de repli
+    assert len(window_slices(text, "Quelle police ?", 4000, WINDOW_02)) == 1
+    assert window_slices(text, "Bonjour", 4000, WINDOW_02) == [(0, 4000)]
+    # script 03 : un bloc par ancre typographique, repli sur BRANDON GROTESQUE
+    assert len(window_slices(text, "Quelle police ?", 15000, WINDOW_03)) == 2
+    assert window_slices(text, "Bonjour", 15000, WINDOW_03)[0][0] > 0
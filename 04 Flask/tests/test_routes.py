@@ -0,0 +1,35 @@
+# Validation des corps JSON : 400 explicite, jamais une 500.
+import pytest
+
+
+@pytest.fixture
+def client(app):
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize("route", ["/chatbot", "/chatbot/stream"])
+@pytest.mark.parametrize("question", [123, ["a"], {"q": "x"}, None, "   "])
+def test_invalid_question_is_400(client, route, question):
+    resp = client.post(route, json={"question": question})
+    assert resp.status_code == 400
+    assert resp.get_json()["ok"] is False
+
+
+@pytest.mark.parametrize("route", ["/chatbot", "/chatbot/stream", "/chatbot/batch"])
+@pytest.mark.parametrize("doc", [5, {"pdf_text": 1}, ["pdf_text", 3], True])
+def test_invalid_doc_scope_is_400(client, route, doc):
+    body = {"questions": ["Quelles sont vos couleurs ?"]} if route.endswith("batch") else {"question": "Bonjour"}
+    resp = client.post(route, json={**body, "doc": doc})
+    assert resp.status_code == 400
+    assert "doc" in resp.get_json()["error"]
+
+
+def test_unknown_doc_is_400(client):
+    resp = client.post("/chatbot", json={"question": "Bonjour", "doc": ["inconnu"]})
+    assert resp.status_code == 400 and resp.get_json()["error"] == "Document inconnu."
+
+
+def test_batch_rejects_non_string_items(client):
+    resp = client.post("/chatbot/batch", json={"questions": ["Quelles sont vos couleurs ?", {"a": 1}, 3, " "]})
+    assert resp.status_code == 400
+    assert resp.get_json()["indexes"] == [1, 2, 3]
@@ -0,0 +1,95 @@
+# Single-flight : un seul appel amont par clé, erreur partagée, flux rejoué aux arrivants tardifs.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import FlightTimeout, SingleFlight
+
+
+def test_concurrent_duplicates_share_one_call():
+    sf, gate, calls = SingleFlight(timeout=5), threading.Event(), []
+
+    def fn():
+        calls.append(1)
+        gate.wait(5)
+        return "réponse"
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(sf.do, "k", fn) for _ in range(8)]
+        while sf.stats()["joined"] < 7:
+            time.sleep(0.001)
+        gate.set()
+        assert [f.result() for f in futures] == ["réponse"] * 8
+    assert len(calls) == 1
+    assert sf.stats() == {"leaders": 1, "joined": 7, "inflight_calls": 0, "inflight_streams": 0}
+    assert sf.do("k", lambda: "nouvel appel") == "nouvel appel"   # la clé est libérée après l'appel
+
+
+def test_leader_error_reaches_every_waiter():
+    sf, gate = SingleFlight(timeout=5), threading.Event()
+
+    def fn():
+        gate.wait(5)
+        raise ValueError("amont")
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(sf.do, "k", fn) for _ in range(4)]
+        while sf.stats()["joined"] < 3:
+            time.sleep(0.001)
+        gate.set()
+        for f in futures:
+            with pytest.raises(ValueError, match="amont"):
+                f.result()
+
+
+def test_follower_times_out():
+    sf, gate = SingleFlight(timeout=0.05), threading.Event()
+    leader = threading.Thread(target=sf.do, args=("k", lambda: gate.wait(5)), daemon=True)
+    leader.start()
+    while sf.stats()["inflight_calls"] == 0:
+        time.sleep(0.001)
+    with pytest.raises(FlightTimeout):
+        sf.do("k", lambda: "jamais appelé")
+    gate.set()
+    leader.join(2)
+
+
+def test_late_joiner_gets_prefix_then_follows_stream():
+    sf, step, calls = SingleFlight(timeout=5), threading.Semaphore(0), []
+
+    def factory():
+        calls.append(1)
+        for piece in ("a", "b", "c"):
+            step.acquire()
+            yield piece
+
+    first = sf.stream("k", factory)
+    step.release()
+    assert next(first) == "a"
+    step.release()
+    assert next(first) == "b"
+    late = sf.stream("k", factory)          # arrive après "a" et "b"
+    assert [next(late), next(late)] == ["a", "b"]
+    step.release()
+    assert list(first) == ["c"] and list(late) == ["c"]
+    assert len(calls) == 1
+
+
+def test_stream_error_reaches_every_subscriber():
+    sf, step = SingleFlight(timeout=5), threading.Event()
+
+    def factory():
+        yield "a"
+        step.wait(5)
+        raise ValueError("coupé")
+
+    first = sf.stream("k", factory)
+    assert next(first) == "a"
+    late = sf.stream("k", factory)
+    assert next(late) == "a"
+    step.set()
+    for it in (first, late):
+        with pytest.raises(ValueError, match="coupé"):
+            next(it)
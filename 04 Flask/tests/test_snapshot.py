@@ -0,0 +1,33 @@
+# Instantané du corpus : écrit puis relu dans un processus neuf, sans importer app.py.
+import subprocess
+import sys
+from pathlib import Path
+
+import snapshot
+from retrieval import build_retrieval
+
+FLASK_DIR = Path(__file__).resolve().parents[1]
+
+DOCS = {"doc": "01 OUR LOGO\n\n1.1 LOGO SYSTEM\nNotre logo associe un logotype et un logomark.\n\n"
+               "1.2 OUR COLORS\nBleu marine et or.\n"}
+
+LOAD = """
+import sys
+import snapshot
+r = snapshot.load(sys.argv[1], "k")
+assert r is not None, "instantané illisible"
+assert "app" not in sys.modules and "__main__" not in type(r).__module__
+print(type(r).__module__, sorted(r.docs), r.bm25.search("logo", k=1)[0][0].start)
+"""
+
+
+def test_snapshot_loads_without_app(tmp_path):
+    built = build_retrieval(DOCS)
+    path = tmp_path / "corpus.snapshot"
+    snapshot.save(path, "k", built)
+    assert snapshot.load(path, "other") is None
+    out = subprocess.run([sys.executable, "-c", LOAD, str(path)], cwd=FLASK_DIR,
+                         capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    hit = built.bm25.search("logo", k=1)[0][0].start
+    assert out.stdout.split() == ["retrieval", "['doc']", str(hit)]
@@ -0,0 +1,20 @@
+import asyncio
+
+from traffic import TrafficController
+
+
+def test_stream_first_fragments_do_not_lower_hedge_threshold():
+    tc = TrafficController(hedge=True, hedge_min_samples=5)
+    tc.latencies.extend([2.0] * 5)
+
+    async def fragments():
+        yield "a"
+        yield "b"
+
+    async def consume():
+        for _ in range(50):
+            assert [x async for x in tc.stream(fragments, 10)] == ["a", "b"]
+
+    asyncio.run(consume())
+    assert len(tc.first_fragment) == 50
+    assert tc.hedge_after() == 2.0
@@ -0,0 +1,48 @@
+# textnorm.py
+# Normalisation de texte FR/EN partagée (repliement accents/casse, tokenisation).
+import re
+import unicodedata
+from typing import List
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+PUNCT_RE = re.compile(r"[^\w\s]+")
+
+STOPWORDS = {
+    # français
+    "le", "la", "les", "un", "une", "des", "du", "de", "d", "l", "et", "ou", "a", "au", "aux",
+    "en", "dans", "sur", "pour", "par", "avec", "sans", "ce", "ces", "cet", "cette", "se", "sa",
+    "son", "ses", "vos", "votre", "nos", "notre", "je", "tu", "il", "elle", "on", "nous", "vous",
+    "ils", "elles", "me", "moi", "te", "toi", "qui", "que", "quoi", "quel", "quels", "quelle",
+    "quelles", "est", "sont", "etre", "ai", "as", "avez", "ont", "y", "ne", "pas", "plus", "c",
+    "s", "qu", "j", "m", "t", "n", "parle", "parlez", "dis", "dites",
+    # anglais
+    "the", "an", "and", "or", "of", "to", "in", "on", "for", "with", "by", "at", "from", "is",
+    "are", "be", "it", "its", "this", "that", "these", "those", "our", "your", "we", "you",
+    "what", "which", "who", "how", "do", "does", "can", "me", "my", "tell", "about",
+}
+
+
+def fold(s: str) -> str:
+    """Minuscules + suppression des accents ("Équipé" → "equipe")."""
+    s = unicodedata.normalize("NFKD", s or "")
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return s.casefold()
+
+
+def stem(tok: str) -> str:
+    """Racinisation minimale : pluriels FR/EN ("couleurs" → "couleur", "colors" → "color")."""
+    if len(tok) > 4 and tok.endswith("ies"):
+        return tok[:-3] + "y"
+    if len(tok) > 3 and tok[-1] in "sx" and not tok.endswith("ss"):
+        return tok[:-1]
+    return tok
+
+
+def tokenize(s: str) -> List[str]:
+    """Tokens repliés, sans mots vides, racinisés."""
+    return [stem(t) for t in TOKEN_RE.findall(fold(s)) if t not in STOPWORDS and len(t) > 1]
+
+
+def normalize_question(q: str) -> str:
+    """Forme canonique d'une question (clé de cache) : casse, accents, ponctuation, espaces."""
+    return " ".join(PUNCT_RE.sub(" ", fold(q)).split())
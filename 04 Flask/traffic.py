@@ -0,0 +1,284 @@
+# traffic.py
+# Contrôle du trafic vers OpenAI (côté client), exécuté sur la boucle asyncio du LLMRuntime :
+#  - seaux à jetons requêtes/min et tokens/min, recalés sur les en-têtes x-ratelimit-*,
+#  - nouvelles tentatives avec gigue sur 429 / 5xx / coupures réseau (Retry-After respecté),
+#  - échéance par requête (deadline) couvrant attente + tentatives,
+#  - hedging optionnel : si l'appel dépasse le p95 observé, une 2e requête part en parallèle.
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Dict, Mapping, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+@lru_cache(maxsize=1)
+def retryable() -> Tuple[type, ...]:
+    """Erreurs à retenter ; le SDK openai (lourd) n'est importé qu'au premier appel."""
+    import openai
+    return openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError
+
+
+def is_rate_limit(error: Exception) -> bool:
+    return isinstance(error, retryable()[0])
+
+
+class RateLimited(Exception):
+    """Quota OpenAI épuisé pour toute la durée de l'échéance : réessayer après `retry_after`."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"quota OpenAI atteint, réessayer dans {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """L'échéance de la requête est dépassée (attente du quota + tentatives comprises)."""
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """"1s", "6m0s", "20ms", "2" → secondes."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_RE.findall(value)
+    return sum(float(n) * UNITS[u] for n, u in parts) if parts else None
+
+
+class TokenBucket:
+    """Seau à jetons : `per_minute` jetons rechargés en continu, capacité d'une minute."""
+
+    def __init__(self, per_minute: float, share: float = 1.0):
+        self.share = share          # part du quota réservée à ce processus (plusieurs workers)
+        self.per_minute = per_minute * share
+        self.level = self.per_minute
+        self.blocked_until = 0.0
+        self._t = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.per_minute, self.level + (now - self._t) * self.per_minute / 60.0)
+        self._t = now
+
+    def delay(self, n: float, now: float) -> float:
+        """Secondes d'attente avant de pouvoir prélever n jetons (0 = tout de suite)."""
+        self._refill(now)
+        n = min(n, self.per_minute)
+        wait = max(0.0, self.blocked_until - now)
+        if self.level < n:
+            wait = max(wait, (n - self.level) * 60.0 / self.per_minute)
+        return wait
+
+    def take(self, n: float) -> None:
+        self.level -= n  # peut devenir négatif (ajustement après coup) : le seau se rembourse
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], now: float) -> None:
+        """Recalage sur les en-têtes du serveur (quota réel, jetons restants)."""
+        self._refill(now)
+        if limit:
+            self.per_minute = limit * self.share
+        if remaining is not None:
+            self.level = min(self.level, remaining * self.share)
+
+    def block(self, seconds: float, now: float) -> None:
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class TrafficController:
+    def __init__(self, rpm: float = 500, tpm: float = 200_000, deadline: float = 30.0,
+                 max_retries: int = 4, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 hedge: bool = False, hedge_min_samples: int = 20, hedge_quantile: float = 0.95):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_quantile = hedge_quantile
+        # fenêtres séparées : la durée d'un appel complet (seule base du hedging) n'a rien à voir
+        # avec le délai du premier fragment d'un flux
+        self.latencies: deque = deque(maxlen=256)
+        self.first_fragment: deque = deque(maxlen=256)
+        self.counters = {"calls": 0, "retries": 0, "rate_limited": 0, "server_errors": 0,
+                         "throttled_waits": 0, "deadline_exceeded": 0, "hedges": 0, "hedge_wins": 0}
+
+    def share(self, fraction: float) -> None:
+        """Ne garder qu'une part du quota (N workers forkés se partagent la même clé API)."""
+        for bucket in (self.requests, self.tokens):
+            bucket.per_minute = bucket.per_minute / bucket.share * fraction
+            bucket.level = min(bucket.level, bucket.per_minute)
+            bucket.share = fraction
+
+    # --- Quota ---
+    async def _acquire(self, tokens: int, deadline: float) -> None:
+        while True:
+            now = time.monotonic()
+            wait = max(self.requests.delay(1, now), self.tokens.delay(tokens, now))
+            if wait <= 0:
+                # pas d'await entre la vérification et le prélèvement : sûr sur une seule boucle
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                return
+            if now + wait > deadline:
+                self.counters["deadline_exceeded"] += 1
+                raise RateLimited(max(1, round(wait)))
+            self.counters["throttled_waits"] += 1
+            await asyncio.sleep(wait)
+
+    def observe_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        if not headers:
+            return
+        h = {k.lower(): v for k, v in headers.items()}
+
+        def num(name):
+            try:
+                return float(h[name])
+            except (KeyError, ValueError):
+                return None
+
+        now = time.monotonic()
+        self.requests.sync(num("x-ratelimit-limit-requests"), num("x-ratelimit-remaining-requests"), now)
+        self.tokens.sync(num("x-ratelimit-limit-tokens"), num("x-ratelimit-remaining-tokens"), now)
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Corrige le seau de tokens avec l'usage réel renvoyé par l'API."""
+        if actual is not None:
+            self.tokens.take(actual - estimated)
+
+    # --- Tentatives ---
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        retry_after = parse_duration(response.headers.get("retry-after")) if response is not None else None
+        if is_rate_limit(error):
+            self.counters["rate_limited"] += 1
+            if response is not None:
+                self.observe_headers(response.headers)
+            if retry_after:
+                # tout le monde se cale sur le Retry-After, pas seulement cet appel
+                self.requests.block(retry_after, time.monotonic())
+        else:
+            self.counters["server_errors"] += 1
+        # gigue « full jitter » : évite que les clients réessaient tous en même temps
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    async def _with_retries(self, attempt_fn: Callable[[], Awaitable[T]], tokens: int, deadline: float) -> T:
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(tokens, deadline)
+            remaining = deadline - time.monotonic()
+            try:
+                return await asyncio.wait_for(attempt_fn(), remaining)
+            except asyncio.TimeoutError:
+                self.counters["deadline_exceeded"] += 1
+                raise DeadlineExceeded(f"pas de réponse d'OpenAI avant l'échéance ({self.deadline}s)")
+            except retryable() as e:
+                delay = self._backoff(attempt, e)
+                if attempt == self.max_retries or time.monotonic() + delay > deadline:
+                    if is_rate_limit(e):
+                        raise RateLimited(max(1, round(delay))) from e
+                    raise
+                self.counters["retries"] += 1
+                await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def quantile(self, samples: deque) -> Optional[float]:
+        if len(samples) < self.hedge_min_samples:
+            return None
+        xs = sorted(samples)
+        return xs[min(len(xs) - 1, int(len(xs) * self.hedge_quantile))]
+
+    def hedge_after(self) -> Optional[float]:
+        """Seuil de hedging de call() : quantile des durées d'appels complets uniquement."""
+        return self.quantile(self.latencies)
+
+    # --- API (coroutines, à lancer sur la boucle du LLMRuntime) ---
+    async def call(self, factory: Callable[[], Awaitable[T]], tokens: int,
+                   deadline: Optional[float] = None) -> T:
+        """Appel complet : quota, tentatives, échéance et hedging éventuel."""
+        self.counters["calls"] += 1
+        t0 = time.monotonic()
+        end = t0 + (deadline or self.deadline)
+        first = asyncio.ensure_future(self._with_retries(factory, tokens, end))
+        threshold = self.hedge_after() if self.hedge else None
+        started, tasks = [first], {first}
+        try:
+            if threshold is not None:
+                done, _ = await asyncio.wait(tasks, timeout=threshold)
+                if not done and self.requests.delay(1, time.monotonic()) == 0:
+                    # lent : une 2e requête identique, on garde la première qui répond
+                    self.counters["hedges"] += 1
+                    second = asyncio.ensure_future(self._with_retries(factory, tokens, end))
+                    started.append(second)
+                    tasks.add(second)
+            winner = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                ok = [t for t in done if t.exception() is None]
+                if ok:
+                    winner = ok[0]
+                    break
+                if not tasks:
+                    # toutes les tentatives ont échoué : on remonte l'erreur de la dernière
+                    raise done.pop().exception()
+            if winner is not first:
+                self.counters["hedge_wins"] += 1
+            self.latencies.append(time.monotonic() - t0)
+            return winner.result()
+        finally:
+            for t in started:
+                if not t.done():
+                    t.cancel()
+
+    async def stream(self, factory: Callable[[], AsyncIterator[T]], tokens: int,
+                     deadline: Optional[float] = None) -> AsyncIterator[T]:
+        """Flux : tentatives possibles tant qu'aucun fragment n'a été transmis ; l'échéance
+        porte sur le premier fragment (le reste peut être long, on ne le coupe pas)."""
+        self.counters["calls"] += 1
+        t0 = time.monotonic()
+        end = t0 + (deadline or self.deadline)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(tokens, end)
+            agen = factory().__aiter__()
+            try:
+                first = await asyncio.wait_for(agen.__anext__(), end - time.monotonic())
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                self.counters["deadline_exceeded"] += 1
+                await agen.aclose()
+                raise DeadlineExceeded(f"pas de premier fragment avant l'échéance ({self.deadline}s)")
+            except retryable() as e:
+                await agen.aclose()
+                delay = self._backoff(attempt, e)
+                if attempt == self.max_retries or time.monotonic() + delay > end:
+                    if is_rate_limit(e):
+                        raise RateLimited(max(1, round(delay))) from e
+                    raise
+                self.counters["retries"] += 1
+                await asyncio.sleep(delay)
+                continue
+            self.first_fragment.append(time.monotonic() - t0)
+            yield first
+            async for item in agen:
+                yield item
+            return
+
+    def stats(self) -> Dict[str, float]:
+        out = dict(self.counters)
+        out.update({
+            "rpm": self.requests.per_minute,
+            "tpm": self.tokens.per_minute,
+            "requests_available": round(self.requests.level, 1),
+            "tokens_available": round(self.tokens.level),
+            "latency_p95_s": round(self.hedge_after() or 0.0, 3),
+            "first_fragment_p95_s": round(self.quantile(self.first_fragment) or 0.0, 3),
+        })
+        return out
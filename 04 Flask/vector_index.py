@@ -0,0 +1,113 @@
+# vector_index.py
+# Index vectoriel dense 100% local : embeddings par hachage de n-grammes de caractères,
+# matrice .npy mémoire-mappée (partagée entre workers) + recherche cosinus top-k NumPy.
+import json
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from textnorm import tokenize
+
+VECTORS_FILE = "vectors.npy"
+META_FILE = "vectors_meta.json"
+
+
+class HashingEmbedder:
+    """Vecteur signé de n-grammes de caractères (3..5) + mots, normalisé L2. Aucun réseau."""
+
+    def __init__(self, dim: int = 256, ngram_min: int = 3, ngram_max: int = 5):
+        self.dim = dim
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+
+    def params(self) -> Dict:
+        return {"dim": self.dim, "ngram_min": self.ngram_min, "ngram_max": self.ngram_max}
+
+    def _features(self, text: str) -> List[str]:
+        feats = []
+        for tok in tokenize(text):
+            feats.append("w:" + tok)
+            padded = f" {tok} "
+            for n in range(self.ngram_min, self.ngram_max + 1):
+                feats.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return feats
+
+    def embed(self, text: str) -> np.ndarray:
+        feats = self._features(text)
+        vec = np.zeros(self.dim, dtype=np.float32)
+        if not feats:
+            return vec
+        h = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in feats), dtype=np.uint32, count=len(feats))
+        idx = (h % self.dim).astype(np.int64)
+        sign = np.where((h >> 31) & 1, -1.0, 1.0).astype(np.float32)
+        np.add.at(vec, idx, sign)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            out[i] = self.embed(t)
+        return out
+
+
+def build_vector_index(chunks, out_dir: Path, embedder: Optional[HashingEmbedder] = None) -> Path:
+    """Calcule les embeddings des chunks et écrit vectors.npy + vectors_meta.json."""
+    embedder = embedder or HashingEmbedder()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # même règle que BM25 : le titre de page est ajouté aux chunks qui ne le contiennent pas
+    texts = [c.text if c.text.startswith(c.title) else c.title + "\n" + c.text for c in chunks]
+    matrix = embedder.embed_many(texts)
+    np.save(out_dir / VECTORS_FILE, matrix)
+    meta = {
+        "embedder": embedder.params(),
+        "chunks": [
+            {"doc": c.doc, "start": c.start, "end": c.end, "title": c.title, "text": c.text}
+            for c in chunks
+        ],
+    }
+    (out_dir / META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    return out_dir
+
+
+class VectorIndex:
+    """Matrice N×D ouverte en mmap (lecture seule) : les pages sont partagées par l'OS."""
+
+    def __init__(self, matrix: np.ndarray, chunks: List[Dict], embedder: HashingEmbedder):
+        self.matrix = matrix
+        self.chunks = chunks
+        self.embedder = embedder
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "VectorIndex":
+        index_dir = Path(index_dir)
+        meta = json.loads((index_dir / META_FILE).read_text(encoding="utf-8"))
+        matrix = np.load(index_dir / VECTORS_FILE, mmap_mode="r")
+        return cls(matrix, meta["chunks"], HashingEmbedder(**meta["embedder"]))
+
+    @staticmethod
+    def exists(index_dir: Path) -> bool:
+        index_dir = Path(index_dir)
+        return (index_dir / VECTORS_FILE).exists() and (index_dir / META_FILE).exists()
+
+    def _top_k(self, scores: np.ndarray, k: int) -> List[Tuple[Dict, float]]:
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.chunks[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[Dict, float]]:
+        # vecteurs déjà normalisés : produit scalaire = cosinus
+        return self._top_k(self.matrix @ self.embedder.embed(query), k)
+
+    def search_batch(self, queries: Sequence[str], k: int = 5) -> List[List[Tuple[Dict, float]]]:
+        """Une seule multiplication matrice × (D×Q) pour toutes les requêtes."""
+        if not queries:
+            return []
+        scores = self.matrix @ self.embedder.embed_many(queries).T
+        return [self._top_k(scores[:, j], k) for j in range(len(queries))]
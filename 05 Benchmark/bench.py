@@ -0,0 +1,307 @@
+# bench.py
+# Benchmark hors-ligne de /chatbot : faux serveur OpenAI local + questions de référence (FR/EN),
+# concurrence configurable. Mesure p50/p95/p99, débit, temps de sélection du contexte et
+# tokens de prompt ; sauvegarde un JSON par exécution (results/) pour comparer les commits.
+#
+# Usage :
+#   python bench.py                                   # 4 clients, 3 passes, 400 ms de latence LLM
+#   python bench.py -c 16 --repeat 5 --stream --rate-429 0.05
+#   python bench.py --compare results/<ancien>.json   # écarts vs une exécution précédente
+#   python bench.py --cold-start 5                    # + démarrage à froid : 1er 200 de /health
+import argparse
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from fake_openai import FakeConfig, serve
+
+ROOT = Path(__file__).resolve().parents[1]
+HERE = Path(__file__).resolve().parent
+RESULTS_DIR = HERE / "results"
+GOLDEN = HERE / "golden_questions.json"
+
+
+# --- Statistiques ---
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    k = (len(xs) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+def summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "mean": round(statistics.fmean(values), 3) if values else 0.0,
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(max(values), 3) if values else 0.0,
+    }
+
+
+def git_sha() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+# --- Application Flask (importée en local, pointée sur le faux OpenAI) ---
+def start_app(fake_url: str, cache_url: str):
+    os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY") or "sk-bench"
+    os.environ["OPENAI_API_BASE"] = fake_url       # lu par langchain_openai
+    os.environ["OPENAI_BASE_URL"] = fake_url       # lu par le SDK openai
+    os.environ["ANSWER_CACHE_URL"] = cache_url
+    # journal des questions à part : le benchmark ne doit pas fausser le top des questions réelles
+    os.environ["QUERY_LOG_URL"] = f"sqlite:///{Path(tempfile.mkdtemp(prefix='bench-log-')) / 'query_log.sqlite3'}"
+    os.environ.setdefault("CORPUS_POLL", "0")
+    os.environ["WARMUP"] = "0"
+    # questions indépendantes : le client httpx garde le cookie de session, la mémoire de
+    # conversation gonflerait les prompts et rendrait les runs incomparables entre eux
+    os.environ["CONVERSATION_MEMORY"] = "0"
+    sys.path.insert(0, str(ROOT / "04 Flask"))
+    import app as flask_app
+    from werkzeug.serving import make_server
+
+    flask_app.warm_up()   # imports lourds avant la mesure, pas pendant la 1re requête
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # pas une ligne par requête
+    server = make_server("127.0.0.1", 0, flask_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-flask", daemon=True).start()
+    return flask_app, server
+
+
+def cold_start(runs: int, timeout: float = 30) -> Dict:
+    """serve.py --fast-start sans OPENAI_API_KEY : délai entre le lancement et le 1er 200 de /health."""
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    env.update(CORPUS_POLL="0", PYTHONUNBUFFERED="1")
+    samples = []
+    for _ in range(runs):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "serve.py", "--workers", "1", "--fast-start", "--port", str(port)],
+                                cwd=ROOT / "04 Flask", env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while time.perf_counter() - t0 < timeout:
+                try:
+                    if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                        samples.append((time.perf_counter() - t0) * 1000)
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=timeout)
+    return {"runs": runs, "ms": summary(samples)}
+
+
+def context_micros(flask_app, questions: List[str], rounds: int) -> Dict:
+    """Sélection du contexte seule (retriever + budget), en µs par question."""
+    times, tokens = [], []
+    for _ in range(rounds):
+        for q in questions:
+            t0 = time.perf_counter()
+            built = flask_app.build_context(q)
+            times.append((time.perf_counter() - t0) * 1e6)
+            tokens.append(built.tokens)
+    return {"us": summary(times), "context_tokens": summary(tokens)}
+
+
+# --- Clients ---
+def ask(client: httpx.Client, url: str, question: str, stream: bool) -> Dict:
+    t0 = time.perf_counter()
+    ttft = None
+    body: Dict = {}
+    try:
+        if not stream:
+            r = client.post(url + "/chatbot", json={"question": question})
+            status = r.status_code
+            body = r.json() if r.headers.get("content-type", "").startswith("application/json") else {}
+        else:
+            with client.stream("POST", url + "/chatbot/stream", json={"question": question}) as r:
+                status = r.status_code
+                event = None
+                for line in r.iter_lines():
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        if event == "token" and ttft is None:
+                            ttft = time.perf_counter() - t0
+                        elif event == "done":
+                            body = json.loads(line[5:])
+                        elif event == "error":
+                            status = 599
+    except httpx.HTTPError:
+        status = 0
+    return {"status": status, "latency": time.perf_counter() - t0, "ttft": ttft,
+            "context_tokens": body.get("context_tokens")}
+
+
+def run_load(url: str, questions: List[str], concurrency: int, stream: bool, timeout: float) -> Dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    with httpx.Client(timeout=timeout, limits=limits) as client, ThreadPoolExecutor(concurrency) as pool:
+        t0 = time.perf_counter()
+        results = list(pool.map(lambda q: ask(client, url, q, stream), questions))
+        wall = time.perf_counter() - t0
+    ok = [r for r in results if r["status"] == 200]
+    ctx = [r["context_tokens"] for r in ok if r["context_tokens"] is not None]
+    out = {
+        "requests": len(results),
+        "wall_s": round(wall, 3),
+        "rps": round(len(results) / wall, 2) if wall else 0.0,
+        "status": dict(Counter(str(r["status"]) for r in results)),
+        "latency_ms": summary([r["latency"] * 1000 for r in ok]),
+        "context_tokens_mean": round(statistics.fmean(ctx), 1) if ctx else 0.0,
+    }
+    if stream:
+        out["ttft_ms"] = summary([r["ttft"] * 1000 for r in ok if r["ttft"] is not None])
+    return out
+
+
+# --- Comparaison ---
+def compare(current: Dict, previous: Dict) -> None:
+    def pick(d, path):
+        for k in path:
+            d = (d or {}).get(k)
+        return d
+
+    rows = [
+        ("latence p50 (ms)", ("load", "latency_ms", "p50")),
+        ("latence p95 (ms)", ("load", "latency_ms", "p95")),
+        ("latence p99 (ms)", ("load", "latency_ms", "p99")),
+        ("débit (req/s)", ("load", "rps")),
+        ("contexte p50 (µs)", ("context", "us", "p50")),
+        ("contexte p95 (µs)", ("context", "us", "p95")),
+        ("tokens de prompt / appel", ("llm", "prompt_tokens_per_call")),
+    ]
+    print(f"\n📊 Comparaison avec {previous.get('git_sha')} ({previous.get('timestamp')})")
+    for label, path in rows:
+        a, b = pick(previous, path), pick(current, path)
+        if a is None or b is None:
+            continue
+        delta = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+        print(f"  {label:<26} {a:>10} → {b:<10} ({delta})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark hors-ligne du chatbot (faux OpenAI local).")
+    ap.add_argument("-c", "--concurrency", type=int, default=4)
+    ap.add_argument("--repeat", type=int, default=3, help="passes sur les questions de référence")
+    ap.add_argument("--stream", action="store_true", help="mesure /chatbot/stream (avec TTFT)")
+    ap.add_argument("--latency-ms", type=float, default=400)
+    ap.add_argument("--tokens-per-sec", type=float, default=200)
+    ap.add_argument("--completion-tokens", type=int, default=80)
+    ap.add_argument("--rate-429", type=float, default=0.0)
+    ap.add_argument("--context-rounds", type=int, default=20)
+    ap.add_argument("--questions", type=Path, default=GOLDEN)
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--keep-cache", action="store_true",
+                    help="garde le cache de réponses entre les passes (par défaut : une base neuve)")
+    ap.add_argument("--compare", type=Path, help="JSON d'une exécution précédente")
+    ap.add_argument("--no-save", action="store_true")
+    ap.add_argument("--cold-start", type=int, default=0, metavar="N",
+                    help="mesure N démarrages à froid de serve.py (objectif : /health < 300 ms)")
+    args = ap.parse_args()
+
+    cold = cold_start(args.cold_start) if args.cold_start else None
+    if cold:
+        print(f"🧊 Démarrage à froid ({cold['runs']}×) : /health en p50 {cold['ms']['p50']:.0f} ms, "
+              f"max {cold['ms']['max']:.0f} ms")
+
+    golden = json.loads(args.questions.read_text(encoding="utf-8"))
+    questions = [g["question"] for g in golden]
+
+    cfg = FakeConfig(args.latency_ms, args.tokens_per_sec, args.rate_429, args.completion_tokens)
+    fake = serve(cfg)
+    fake_url = f"http://127.0.0.1:{fake.server_address[1]}/v1"
+
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    flask_app, server = start_app(fake_url, f"sqlite:///{Path(tmp) / 'answer_cache.sqlite3'}")
+    url = f"http://127.0.0.1:{server.server_port}"
+    print(f"🧪 Faux OpenAI {fake_url} — app {url} — retriever={flask_app.CONTEXT_RETRIEVER}")
+
+    context = context_micros(flask_app, questions, args.context_rounds)
+
+    load = []
+    for i in range(args.repeat):
+        if not args.keep_cache:
+            # sinon toutes les passes après la 1re ne mesurent que le cache
+            flask_app.ANSWER_CACHE.clear()
+        res = run_load(url, questions, args.concurrency, args.stream, args.timeout)
+        load.append(res)
+        print(f"  passe {i + 1}/{args.repeat} : {res['rps']} req/s, p95 {res['latency_ms']['p95']} ms, "
+              f"statuts {res['status']}")
+
+    all_lat = [p for r in load for p in [r["latency_ms"]]]
+    merged = {
+        "requests": sum(r["requests"] for r in load),
+        "rps": round(statistics.fmean(r["rps"] for r in load), 2),
+        "status": dict(sum((Counter(r["status"]) for r in load), Counter())),
+        # percentiles par passe, médiane des passes (robuste à une passe bruitée)
+        "latency_ms": {k: round(statistics.median(l[k] for l in all_lat), 3) for k in all_lat[0]},
+        "context_tokens_mean": round(statistics.fmean(r["context_tokens_mean"] for r in load), 1),
+        "passes": load,
+    }
+    if args.stream:
+        ttfts = [r["ttft_ms"] for r in load if r["ttft_ms"]["p50"]]
+        if ttfts:
+            merged["ttft_ms"] = {k: round(statistics.median(t[k] for t in ttfts), 3) for k in ttfts[0]}
+
+    counters = dict(cfg.counters)
+    calls = counters["requests"] - counters["rate_limited"]
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_sha": git_sha(),
+        "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+        "retriever": flask_app.CONTEXT_RETRIEVER,
+        "context_budget": flask_app.CONTEXT_TOKEN_BUDGET,
+        "context": context,
+        "load": merged,
+        "llm": {**counters, "prompt_tokens_per_call": round(counters["prompt_tokens"] / calls, 1) if calls else 0},
+        "app": {"cache": flask_app.ANSWER_CACHE.stats(), "singleflight": flask_app.FLIGHTS.stats(),
+                "startup": flask_app.STARTUP},
+    }
+    if cold:
+        report["cold_start"] = cold
+
+    print(f"\n⏱️  contexte : p50 {context['us']['p50']:.0f} µs, p95 {context['us']['p95']:.0f} µs, "
+          f"{context['context_tokens']['mean']:.0f} tokens")
+    print(f"🚀 {merged['requests']} requêtes : {merged['rps']} req/s — latence p50/p95/p99 "
+          f"{merged['latency_ms']['p50']}/{merged['latency_ms']['p95']}/{merged['latency_ms']['p99']} ms")
+    if "ttft_ms" in merged:
+        print(f"⚡ TTFT p50/p95 {merged['ttft_ms']['p50']}/{merged['ttft_ms']['p95']} ms")
+    print(f"🧾 LLM : {counters['requests']} appels ({counters['rate_limited']} en 429), "
+          f"{report['llm']['prompt_tokens_per_call']} tokens de prompt / appel")
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        out = RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{report['git_sha']}.json"
+        out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"💾 {out}")
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text(encoding="utf-8")))
+
+    server.shutdown()
+    fake.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# fake_openai.py
+# Serveur local compatible OpenAI (POST /v1/chat/completions), sans crédit ni réseau :
+# latence de base, débit de tokens et injection de 429 configurables.
+#
+# Usage autonome :
+#   python fake_openai.py --port 8099 --latency-ms 400 --tokens-per-sec 60 --rate-429 0.05
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+
+class FakeConfig:
+    def __init__(self, latency_ms: float = 400.0, tokens_per_sec: float = 80.0,
+                 rate_429: float = 0.0, completion_tokens: int = 120, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.rate_429 = rate_429
+        self.completion_tokens = completion_tokens
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "rate_limited": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def count(self, **kw) -> None:
+        with self.lock:
+            for k, v in kw.items():
+                self.counters[k] += v
+
+    def roll_429(self) -> bool:
+        with self.lock:
+            return self.rng.random() < self.rate_429
+
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    return sum(len(str(m.get("content", ""))) for m in messages) // 4 + 4 * len(messages)
+
+
+def fake_words(question: str, n: int) -> List[str]:
+    base = ("Mr. Landon vous répond : " + question + " ").split()
+    filler = "Landon Hotel offre un accueil chaleureux et des services attentionnés .".split()
+    words = (base + filler * (n // len(filler) + 1))[:n]
+    return [w + " " for w in words]
+
+
+def make_handler(cfg: FakeConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):  # silencieux
+            pass
+
+        def _json(self, status: int, body: Dict, headers: Dict = None) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._json(404, {"error": {"message": "not found"}})
+            cfg.count(requests=1)
+
+            if cfg.roll_429():
+                cfg.count(rate_limited=1)
+                return self._json(429, {"error": {"message": "Rate limit reached (fake)", "type": "requests",
+                                                  "code": "rate_limit_exceeded"}},
+                                  {"Retry-After": "1", "x-ratelimit-remaining-requests": "0"})
+
+            messages = payload.get("messages", [])
+            question = str(messages[-1].get("content", ""))[-80:] if messages else ""
+            prompt_tokens = estimate_tokens(messages)
+            words = fake_words(question.splitlines()[-1] if question else "", cfg.completion_tokens)
+            cfg.count(prompt_tokens=prompt_tokens, completion_tokens=len(words))
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                     "total_tokens": prompt_tokens + len(words)}
+            model = payload.get("model", "gpt-4o-mini")
+            cid = "chatcmpl-" + uuid.uuid4().hex[:12]
+            delay = 1.0 / cfg.tokens_per_sec if cfg.tokens_per_sec > 0 else 0.0
+
+            time.sleep(cfg.latency_ms / 1000.0)
+            if not payload.get("stream"):
+                time.sleep(delay * len(words))
+                return self._json(200, {
+                    "id": cid, "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "".join(words)}}],
+                    "usage": usage,
+                })
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def chunk(delta: Dict, finish=None, with_usage=False) -> None:
+                body = {"id": cid, "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+                if with_usage:
+                    body["usage"] = usage
+                self.wfile.write(f"data: {json.dumps(body)}\n\n".encode())
+                self.wfile.flush()
+
+            try:
+                chunk({"role": "assistant", "content": ""})
+                for w in words:
+                    time.sleep(delay)
+                    chunk({"content": w})
+                chunk({}, finish="stop",
+                      with_usage=bool((payload.get("stream_options") or {}).get("include_usage")))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            self.close_connection = True
+
+    return Handler
+
+
+def serve(cfg: FakeConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Démarre le serveur dans un thread ; port=0 → port libre (voir server.server_address)."""
+    server = ThreadingHTTPServer((host, port), make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Faux serveur OpenAI (chat/completions) pour les benchmarks.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--latency-ms", type=float, default=400)
+    ap.add_argument("--tokens-per-sec", type=float, default=80)
+    ap.add_argument("--completion-tokens", type=int, default=120)
+    ap.add_argument("--rate-429", type=float, default=0.0, help="probabilité de répondre 429")
+    args = ap.parse_args()
+    cfg = FakeConfig(args.latency_ms, args.tokens_per_sec, args.rate_429, args.completion_tokens)
+    server = serve(cfg, args.host, args.port)
+    print(f"🧪 Faux OpenAI sur http://{args.host}:{server.server_address[1]}/v1  (Ctrl+C pour arrêter)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()